@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import time
+import threading
+
+
+class ActuatorChannel(object):
+    """
+    Latest-wins mailbox drained by its own worker thread. control_loop post()s
+    the command for this tick and returns immediately; the worker sends the
+    newest pending command when the previous RPC is done, so a slow channel
+    (e.g. moveToward) never delays the others. A command replaced before it
+    was sent is counted as superseded.
+
+    fn(*args) performs the RPC(s) and returns recorder.ERR_* flags. It should
+    not raise; if it does, the error is counted and the worker carries on.
+    """
+    def __init__(self, name, fn):
+        self.name = name
+        self._fn = fn
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = None
+        self._stop = False
+        self._thread = None
+        self.flags = 0            # flags of the last completed call
+        self.posted = 0
+        self.sent = 0
+        self.superseded = 0
+        self.failed = 0
+        self.errors = 0           # fn raised
+        self.last_error = None
+        self.busy_s = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="actuator-%s" % self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def post(self, *args):
+        with self._cond:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = args
+            self.posted += 1
+            # no timeout on the worker's wait(): Py2 timed waits poll in 50 ms steps
+            self._cond.notify()
+
+    def stop(self, final=None, timeout=1.0):
+        """
+        Drops the pending command and ends the worker. final: args of one
+        last command, sent by the worker after any RPC still in progress,
+        so e.g. a stop cannot be overtaken by a late moveToward.
+        """
+        with self._cond:
+            if final is not None or not self._stop:
+                self._pending = final
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stop:
+                    self._cond.wait()
+                if self._pending is None:
+                    return  # stopped
+                args = self._pending
+                self._pending = None
+            t0 = time.time()
+            try:
+                flags = self._fn(*args)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print("[WARN] actuator %s: %s" % (self.name, e))
+                flags = 0
+            self.busy_s += time.time() - t0
+            self.flags = flags
+            self.sent += 1
+            if flags:
+                self.failed += 1
+
+    def stats(self):
+        return {"posted": self.posted, "sent": self.sent, "superseded": self.superseded,
+                "failed": self.failed, "errors": self.errors, "last_error": self.last_error,
+                "busy_s": self.busy_s,
+                "pending": self._pending is not None}
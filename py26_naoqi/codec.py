@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+JSON codec used by net.py, picked once at import time (fastest available):
+ujson, then simplejson with its C speedups, then the stdlib json module.
+config.JSON_CODEC can force one by name.
+
+Encoders are built once and reused (json.dumps with non-default options
+constructs a new JSONEncoder on every call), with compact separators.
+NaN / Infinity are sent as null: they are not JSON, and ujson refuses them.
+
+Run this file to benchmark every available codec:  python codec.py
+"""
+from __future__ import print_function
+import json
+import time
+import math
+
+try:
+    import config
+    _FORCED = getattr(config, "JSON_CODEC", None)
+except Exception:
+    _FORCED = None
+
+
+def _stdlib():
+    enc = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+    dec = json.JSONDecoder()
+    return ("json", enc.encode, dec.decode)
+
+
+def _simplejson():
+    import simplejson
+    from simplejson import _speedups  # noqa: F401 -- pure-Python simplejson is no gain
+    enc = simplejson.JSONEncoder(separators=(',', ':'), allow_nan=False)
+    dec = simplejson.JSONDecoder()
+    return ("simplejson", enc.encode, dec.decode)
+
+
+def _ujson():
+    import ujson
+    return ("ujson", ujson.dumps, ujson.loads)
+
+
+_PREFERENCE = (_ujson, _simplejson, _stdlib)
+
+
+def available():
+    """[(name, dumps, loads)] for every codec importable here, fastest first."""
+    out = []
+    for make in _PREFERENCE:
+        try:
+            out.append(make())
+        except Exception:
+            pass
+    return out
+
+
+def _select():
+    codecs = available()
+    if _FORCED:
+        for c in codecs:
+            if c[0] == _FORCED:
+                return c
+        print("[WARN] JSON_CODEC %r not available, using %s" % (_FORCED, codecs[0][0]))
+    return codecs[0]
+
+
+NAME, _dumps, loads = _select()
+
+
+def _finite(o):
+    # o with every NaN / Infinity float replaced by None
+    if isinstance(o, float):
+        if math.isnan(o) or math.isinf(o):
+            return None
+        return o
+    if isinstance(o, dict):
+        return dict((k, _finite(v)) for k, v in o.items())
+    if isinstance(o, (list, tuple)):
+        return [_finite(v) for v in o]
+    return o
+
+
+def dumps(obj):
+    try:
+        return _dumps(obj)
+    except (ValueError, OverflowError):
+        # non-finite float somewhere; rare, so only then walk the object
+        return _dumps(_finite(obj))
+
+try:
+    long  # noqa
+except NameError:
+    long = int
+
+
+def _num(v):
+    if v is True: return "true"
+    if v is False: return "false"
+    if v is None: return "null"
+    if isinstance(v, float):
+        if math.isnan(v) or math.isinf(v):
+            return "null"  # as dumps() does
+        return repr(v)
+    return str(int(v))
+
+
+def _rid(rid):
+    if rid is None: return "null"
+    if isinstance(rid, (int, long)) and not isinstance(rid, bool): return str(rid)
+    return dumps(rid)
+
+
+class FixedReply(object):
+    """
+    Pre-rendered {"ok":true,"rid":..,"data":{..}} reply for a fixed data
+    layout. data_fmt is the JSON of 'data' with a %s hole per numeric/bool
+    leaf; encode() only formats those leaves, no dict is built or walked.
+    """
+    def __init__(self, data_fmt):
+        self._fmt = '{"ok":true,"rid":%s,"data":' + data_fmt + '}'
+
+    def encode(self, rid, *values):
+        return self._fmt % ((_rid(rid),) + tuple(_num(v) for v in values))
+
+
+def _bench(n=20000):
+    msgs = [
+        {"cmd": "set_target", "seq": 1234, "ts": 1700000000.123456,
+         "args": {"vx_n": 0.4321, "vy_n": -0.1234, "vw_n": 0.0}},
+        {"cmd": "set_head", "seq": 1234, "ts": 1700000000.123456,
+         "args": {"yaw_n": 0.25, "pitch_n": -0.5}},
+        {"ok": True, "rid": 7, "data": {
+            "target": {"vx_n": 0.4321, "vy_n": -0.1234, "vw_n": 0.0},
+            "current": {"vx_n": 0.4, "vy_n": -0.1, "vw_n": 0.0},
+            "until_ts": 0.0, "last_update_ts": 1700000000.123456}},
+    ]
+    print("%-12s %12s %12s" % ("codec", "enc msg/s", "dec msg/s"))
+    for name, enc, dec in available():
+        lines = [enc(m) for m in msgs]
+        t0 = time.time()
+        for _ in range(n):
+            for m in msgs:
+                enc(m)
+        t_enc = time.time() - t0
+        t0 = time.time()
+        for _ in range(n):
+            for l in lines:
+                dec(l)
+        t_dec = time.time() - t0
+        k = float(n * len(msgs))
+        print("%-12s %12.0f %12.0f" % (name, k / t_enc, k / t_dec))
+    tpl = FixedReply('{"yaw_n":%s,"pitch_n":%s}')
+    t0 = time.time()
+    for i in range(n):
+        tpl.encode(i, 0.25, -0.5)
+    print("%-12s %12.0f %12s" % ("FixedReply", n / (time.time() - t0), "-"))
+    print("selected: %s" % NAME)
+
+
+if __name__ == "__main__":
+    _bench()
@@ -37,4 +37,88 @@ HEAD_MAX_YAW_RATE   = 1.5
 HEAD_MAX_PITCH_RATE = 1.0
 
 # How fast NAO should move to the setAngles target (fraction of max speed 0..1)
-HEAD_FRACTION_SPEED = 0.3
\ No newline at end of file
+HEAD_FRACTION_SPEED = 0.3
+
+# --- Metrics ---
+# Latency histograms are always on; query them with {"cmd":"metrics"}.
+# Set a path to also dump them periodically in Prometheus text format.
+METRICS_PROM_FILE = None          # e.g. "C:/dev/nao_metrics.prom"
+METRICS_PROM_INTERVAL_S = 10.0
+
+# --- Profiler (profile_start / profile_stop) ---
+PROFILE_OUT_DIR = "."             # where profile_*.txt stats are written
+PROFILE_MAX_S = 60.0              # hard cap on one profiling window
+
+# --- Stale frame rejection (set_target / set_head) ---
+# Frames carrying a 'ts' older than this are dropped unless they bring
+# their own 'max_age_s'. None = only drop out-of-order frames.
+STALE_MAX_AGE_S = None
+
+# --- JSON codec (codec.py) ---
+# None = fastest available (ujson > simplejson C speedups > json);
+# or force one of "ujson", "simplejson", "json".
+JSON_CODEC = None
+
+# --- NAOqi proxy supervisor (proxies.py) ---
+PROXY_FAIL_THRESHOLD = 3          # consecutive failed calls before reconnecting
+PROXY_BACKOFF_MIN_S = 0.5
+PROXY_BACKOFF_MAX_S = 10.0
+
+# --- Same-host shared-memory input (shm.py) ---
+# Path of the memory-mapped file also set in py3_control/config.py.
+# None = TCP only.
+LOCAL_SHM_PATH = None             # e.g. "C:/dev/nao_shm.bin"
+
+# --- Flight recorder (recorder.py) ---
+RECORDER_SECONDS = 300.0          # ring length in seconds of control ticks
+RECORDER_DIR = "."                # dump_recorder / crash / shutdown dumps
+
+# --- Simulated NAOqi (sim_naoqi.py), also enabled by 'server.py --sim' ---
+SIMULATE_NAOQI = False
+SIM_RPC_LATENCY_S = 0.002         # per RPC, plus uniform jitter below
+SIM_RPC_JITTER_S = 0.001
+SIM_POSTURE_S = 0.5               # duration of a simulated goToPosture
+
+# --- Actuator workers (actuators.py) ---
+# True: control_loop only posts moveToward / head setAngles to latest-wins
+# mailboxes drained by one thread per channel. False: RPCs inline per tick.
+ACTUATOR_WORKERS = True
+
+# --- Camera streaming (video.py) ---
+# Binary frames on their own port; each subscriber always gets the latest
+# frame and skips the ones it was too slow for.
+VIDEO_ENABLED = False
+VIDEO_PORT = 40101
+VIDEO_CAMERA = 0                  # 0 top, 1 bottom
+VIDEO_RESOLUTION = 1              # NAOqi ids: 0 QQVGA, 1 QVGA, 2 VGA
+VIDEO_COLORSPACE = 11             # kRGBColorSpace
+VIDEO_FPS = 15
+VIDEO_POOL = 4                    # reusable frame buffers
+VIDEO_SEND_TIMEOUT_S = 2.0        # a viewer blocking a send this long is disconnected
+
+# --- ALMemory event alerts (events.py) ---
+# Pushed to clients that sent 'subscribe_events'. Needs a local ALBroker,
+# so the robot must be able to connect back to this machine.
+EVENTS_ENABLED = False
+EVENTS = {
+    "robotHasFallen": "fall",
+    "LeftBumperPressed": "bumper",
+    "RightBumperPressed": "bumper",
+    "BatteryLowDetected": "battery",
+    "BatteryChargeChanged": "battery",
+}
+EVENTS_COALESCE_S = 1.0           # same event + same value within this: counted, not pushed
+EVENTS_MAX_PENDING = 32           # frames queued for one client before it is unsubscribed
+EVENTS_FALL_HOLD_S = 2.0          # after a fall, targets (TCP, shm, --split) are ignored this long
+
+# --- Process split (split.py), also enabled by 'server.py --split' ---
+# True: control_loop and its ALMotion proxy run in a child process, so
+# client traffic (JSON parsing, socket I/O) no longer shares its GIL.
+# profile_start/stop go to the control process ("process": "network" for
+# this one) and METRICS_PROM_FILE merges both processes' histograms.
+# The gain comes from the scheduler, not the split itself: on a single core
+# the split un-niced measured worse control jitter than one process (mean
+# 2.0 ms vs 1.2 ms), niced by 5 it measured 0.4-0.5 ms vs 1.4-1.8 ms.
+# Keep SPLIT_NETWORK_NICE > 0 whenever PROCESS_SPLIT is on.
+PROCESS_SPLIT = False
+SPLIT_NETWORK_NICE = 5            # lower the network process's priority (0 = leave as is, not advised)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import sys
+import time
+import threading
+
+
+class EventHub(object):
+    """
+    ALMemory events (fall, bumpers, battery) pushed to clients instead of
+    polled. NAOqi calls fire() on its own thread: the local reaction
+    (on_event, e.g. stop on a fall) runs right there, then a frame is queued
+    for the push thread, which hands it to push(frame). A repeat of an event
+    with the same value within coalesce_s is only counted; the count goes
+    out with the next frame for that event. A frame still waiting to be
+    pushed is replaced by a newer one for the same event.
+
+    events: {"robotHasFallen": "fall", ...} ALMemory key -> kind
+    """
+    def __init__(self, events, coalesce_s=1.0, on_event=None, push=None):
+        self.events = dict(events)
+        self.coalesce_s = float(coalesce_s)
+        self._on_event = on_event
+        self._push = push
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = []          # frames in arrival order
+        self._last = {}             # key -> (value, pushed_ts)
+        self._repeats = {}          # key -> repeats not yet reported
+        self._stop = False
+        self._broker = None
+        self._memory = None
+        self._module_name = None
+        self.received = 0
+        self.coalesced = 0
+        self.pushed = 0
+        self.attached = False
+        self.last_error = None
+
+    def fire(self, key, value):
+        now = time.time()
+        kind = self.events.get(key, "other")
+        if self._on_event is not None:
+            try:
+                self._on_event(key, kind, value)
+            except Exception as e:
+                print("[WARN] event reaction failed for %s: %s" % (key, e))
+        with self._cond:
+            self.received += 1
+            last = self._last.get(key)
+            if last is not None and last[0] == value and now - last[1] < self.coalesce_s:
+                self._repeats[key] = self._repeats.get(key, 0) + 1
+                self.coalesced += 1
+                return
+            self._last[key] = (value, now)
+            frame = {"event": key, "kind": kind, "value": value, "ts": now,
+                     "repeats": self._repeats.pop(key, 0)}
+            for i, f in enumerate(self._pending):
+                if f["event"] == key:
+                    frame["repeats"] += f["repeats"] + 1
+                    self.coalesced += 1
+                    del self._pending[i]
+                    break
+            self._pending.append(frame)
+            self._cond.notify()
+
+    def run_pusher(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                frames, self._pending = self._pending, []
+            for f in frames:
+                if self._push is not None:
+                    self._push(f)
+                self.pushed += 1
+
+    # ---- NAOqi subscription ----
+    def attach(self, ALBroker, ALModule, ALProxy, ip, port, module_name="NaoXboxEvents"):
+        """
+        Registers a callback module through a local broker and subscribes to
+        every key in events. Raises if NAOqi (or the robot) is not reachable.
+        """
+        hub = self
+        class _EventModule(ALModule):
+            def onEvent(self, key, value, message):
+                """ALMemory event callback."""
+                hub.fire(key, value)
+
+        self._broker = ALBroker(module_name + "Broker", "0.0.0.0", 0, ip, port)
+        mod = _EventModule(module_name)
+        # NAOqi finds Python modules by their global name in __main__
+        setattr(sys.modules["__main__"], module_name, mod)
+        self._memory = ALProxy("ALMemory", ip, port)
+        for key in self.events:
+            self._memory.subscribeToEvent(key, module_name, "onEvent")
+        self._module_name = module_name
+        self.attached = True
+
+    def attach_loop(self, ALBroker, ALModule, ALProxy, ip, port, stop_evt, backoff_s=(1.0, 30.0)):
+        # startup only: retries until attached (robot may still be booting)
+        delay = backoff_s[0]
+        while not stop_evt.is_set() and not self._stop:
+            try:
+                self.attach(ALBroker, ALModule, ALProxy, ip, port)
+                print("[INFO] subscribed to %d ALMemory events" % len(self.events))
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                self._shutdown_broker()
+            stop_evt.wait(delay)
+            delay = min(delay * 2.0, backoff_s[1])
+
+    def _shutdown_broker(self):
+        if self._broker is not None:
+            try: self._broker.shutdown()
+            except Exception: pass
+        self._broker = None
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self.attached and self._memory is not None:
+            for key in self.events:
+                try: self._memory.unsubscribeToEvent(key, self._module_name)
+                except Exception: pass
+        self.attached = False
+        self._shutdown_broker()
+
+    def stats(self):
+        return {"attached": self.attached, "received": self.received,
+                "coalesced": self.coalesced, "pushed": self.pushed,
+                "pending": len(self._pending), "last_error": self.last_error}
+
+
+class Subscriber(object):
+    """
+    Push side of one subscribed client: frames wait here for the client's
+    own sender thread, so a stalled socket only delays that client. More
+    than max_pending frames waiting means it stopped reading: offer()
+    then returns False and the caller drops the subscription.
+    """
+    def __init__(self, send, max_pending=32, name="event_sub"):
+        self._send = send
+        self.max_pending = int(max_pending)
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = []
+        self._closed = False
+        self.sent = 0
+        th = threading.Thread(target=self._run, name=name)
+        th.daemon = True
+        th.start()
+
+    def offer(self, frame):
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._pending) >= self.max_pending:
+                self._closed = True
+                self._cond.notify()
+                return False
+            self._pending.append(frame)
+            self._cond.notify()
+            return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                frames, self._pending = self._pending, []
+            for f in frames:
+                try:
+                    self._send(f)
+                except Exception:
+                    self.close()  # handle_conn notices the dead socket
+                    return
+                self.sent += 1
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency buckets; the last bucket is +Inf.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _quantile(buckets, counts, count, mx, q):
+    if count == 0:
+        return None
+    rank = q * count
+    acc = 0
+    for i, n in enumerate(counts):
+        acc += n
+        if acc >= rank and n:
+            if i < len(buckets):
+                return buckets[i]
+            return mx
+    return mx
+
+
+class LatencyHistogram(object):
+    """
+    Fixed-bucket latency histogram. observe() is a bisect plus a few adds,
+    cheap enough to leave on for every command and every RPC.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(float(b) for b in buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, dt):
+        i = bisect_left(self.buckets, dt)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += dt
+            if dt > self.max:
+                self.max = dt
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-quantile (None if empty)
+        with self._lock:
+            counts, count, mx = list(self.counts), self.count, self.max
+        return _quantile(self.buckets, counts, count, mx, q)
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            count, total, mx = self.count, self.total, self.max
+        # quantiles from the copy, so they agree with the counts reported
+        return {
+            "count": count,
+            "sum_s": total,
+            "mean_s": (total / count) if count else 0.0,
+            "max_s": mx,
+            "p50_s": _quantile(self.buckets, counts, count, mx, 0.5),
+            "p99_s": _quantile(self.buckets, counts, count, mx, 0.99),
+            "buckets": list(self.buckets),
+            "counts": counts
+        }
+
+
+def _label(v):
+    # Prometheus label value escaping
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics(object):
+    """
+    Latency histograms per command and per NAOqi method, plus per-connection
+    message / error / byte counters.
+
+    commands: the command names clients may send; any other name is counted
+    under "unknown", so clients cannot grow the tables without bound.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, commands=None):
+        self._buckets = buckets
+        self.commands = None if commands is None else frozenset(commands)
+        self._lock = threading.Lock()
+        self.started_ts = time.time()
+        self.cmd = {}
+        self.rpc = {}
+        self.rpc_errors = {}
+        self.oneway = {}
+        self.loop = {}
+        self.conns = {}
+        self.closed = {"msgs": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0, "conns": 0}
+
+    def _hist(self, table, name):
+        h = table.get(name)
+        if h is None:
+            with self._lock:
+                h = table.get(name)
+                if h is None:
+                    h = LatencyHistogram(self._buckets)
+                    table[name] = h
+        return h
+
+    def _cmd_key(self, name):
+        if self.commands is not None:
+            try:
+                if name not in self.commands:
+                    return "unknown"
+            except TypeError:  # unhashable, e.g. a JSON list
+                return "unknown"
+        return str(name)
+
+    def observe_cmd(self, name, dt):
+        self._hist(self.cmd, self._cmd_key(name)).observe(dt)
+
+    def observe_rpc(self, name, dt):
+        self._hist(self.rpc, name).observe(dt)
+
+    def observe_oneway(self, name, dt):
+        # client send -> server receive, from the command's 'ts' stamp
+        self._hist(self.oneway, self._cmd_key(name)).observe(dt)
+
+    def observe_loop(self, name, dt):
+        # control_loop timing: "tick_s" (work per tick), "jitter_s" (|period - dt|)
+        self._hist(self.loop, name).observe(dt)
+
+    def call(self, name, fn, *args):
+        """Run an RPC and record its latency under 'name' (errors too)."""
+        t0 = time.time()
+        try:
+            return fn(*args)
+        except Exception:
+            with self._lock:
+                self.rpc_errors[name] = self.rpc_errors.get(name, 0) + 1
+            raise
+        finally:
+            self._hist(self.rpc, name).observe(time.time() - t0)
+
+    # ---- per-connection counters ----
+    def conn_open(self, key, addr):
+        with self._lock:
+            self.conns[key] = {"addr": "%s:%s" % tuple(addr[:2]) if addr else "?",
+                               "since": time.time(),
+                               "msgs": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def conn_update(self, key, msgs=0, errors=0, bytes_in=0, bytes_out=0):
+        with self._lock:   # snapshot() copies these under the same lock
+            c = self.conns.get(key)
+            if c is None:
+                return
+            c["msgs"] += msgs
+            c["errors"] += errors
+            c["bytes_in"] += bytes_in
+            c["bytes_out"] += bytes_out
+
+    def conn_close(self, key):
+        with self._lock:
+            c = self.conns.pop(key, None)
+            if c is None:
+                return
+            for k in ("msgs", "errors", "bytes_in", "bytes_out"):
+                self.closed[k] += c[k]
+            self.closed["conns"] += 1
+
+    # ---- export ----
+    def snapshot(self):
+        with self._lock:
+            cmd = list(self.cmd.items())
+            rpc = list(self.rpc.items())
+            rpc_err = dict(self.rpc_errors)
+            oneway = list(self.oneway.items())
+            loop = list(self.loop.items())
+            conns = [dict(v) for v in self.conns.values()]
+            closed = dict(self.closed)
+        out_cmd = {}
+        for k, h in cmd:
+            out_cmd[k] = h.snapshot()
+        out_rpc = {}
+        for k, h in rpc:
+            out_rpc[k] = h.snapshot()
+            out_rpc[k]["errors"] = rpc_err.get(k, 0)
+        out_oneway = {}
+        for k, h in oneway:
+            out_oneway[k] = h.snapshot()
+        out_loop = {}
+        for k, h in loop:
+            out_loop[k] = h.snapshot()
+        return {
+            "uptime_s": time.time() - self.started_ts,
+            "cmd": out_cmd,
+            "rpc": out_rpc,
+            "oneway": out_oneway,
+            "loop": out_loop,
+            "connections": conns,
+            "closed_connections": closed
+        }
+
+    def reset(self):
+        with self._lock:
+            self.cmd = {}
+            self.rpc = {}
+            self.rpc_errors = {}
+            self.oneway = {}
+            self.loop = {}
+            self.closed = {"msgs": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0, "conns": 0}
+            self.started_ts = time.time()
+
+    def prometheus_text(self, prefix="nao", extra=None):
+        # extra: a snapshot() from another process (split mode), merged in
+        snap = self.snapshot()
+        if extra:
+            snap = merge_snapshots(snap, extra)
+        lines = []
+        for kind, label in (("cmd", "cmd"), ("rpc", "method"), ("oneway", "cmd"), ("loop", "phase")):
+            name = "%s_%s_latency_seconds" % (prefix, kind)
+            lines.append("# TYPE %s histogram" % name)
+            for key in sorted(snap[kind]):
+                h = snap[kind][key]
+                key = _label(key)
+                acc = 0
+                for ub, n in zip(h["buckets"], h["counts"]):
+                    acc += n
+                    lines.append('%s_bucket{%s="%s",le="%g"} %d' % (name, label, key, ub, acc))
+                lines.append('%s_bucket{%s="%s",le="+Inf"} %d' % (name, label, key, h["count"]))
+                lines.append('%s_sum{%s="%s"} %.9f' % (name, label, key, h["sum_s"]))
+                lines.append('%s_count{%s="%s"} %d' % (name, label, key, h["count"]))
+        name = "%s_rpc_errors_total" % prefix
+        lines.append("# TYPE %s counter" % name)
+        for key in sorted(snap["rpc"]):
+            lines.append('%s{method="%s"} %d' % (name, _label(key), snap["rpc"][key]["errors"]))
+        for k in ("msgs", "errors", "bytes_in", "bytes_out"):
+            name = "%s_conn_%s_total" % (prefix, k)
+            lines.append("# TYPE %s counter" % name)
+            total = snap["closed_connections"][k]
+            for c in snap["connections"]:
+                lines.append('%s{peer="%s"} %d' % (name, _label(c["addr"]), c[k]))
+                total += c[k]
+            lines.append('%s{peer="all"} %d' % (name, total))
+        lines.append("# TYPE %s_connections gauge" % prefix)
+        lines.append("%s_connections %d" % (prefix, len(snap["connections"])))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="nao", extra=None):
+        tmp = path + ".tmp"
+        f = open(tmp, "w")
+        try:
+            f.write(self.prometheus_text(prefix, extra))
+        finally:
+            f.close()
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Windows: rename does not replace an existing file
+            try: os.remove(path)
+            except OSError: pass
+            os.rename(tmp, path)
+
+
+def merge_snapshots(a, b):
+    """
+    Sum of two snapshot() results: histograms with the same name add up
+    (same buckets), connection lists are concatenated.
+    """
+    out = dict(a)
+    for kind in ("cmd", "rpc", "oneway", "loop"):
+        merged = dict(a.get(kind, {}))
+        for key, h in b.get(kind, {}).items():
+            mine = merged.get(key)
+            if mine is None:
+                merged[key] = h
+                continue
+            h2 = dict(mine)
+            h2.pop("p50_s", None)  # not recomputed
+            h2.pop("p99_s", None)
+            h2["counts"] = [x + y for x, y in zip(mine["counts"], h["counts"])]
+            h2["count"] = mine["count"] + h["count"]
+            h2["sum_s"] = mine["sum_s"] + h["sum_s"]
+            h2["max_s"] = max(mine["max_s"], h["max_s"])
+            h2["mean_s"] = (h2["sum_s"] / h2["count"]) if h2["count"] else 0.0
+            if "errors" in mine:
+                h2["errors"] = mine["errors"] + h.get("errors", 0)
+            merged[key] = h2
+        out[kind] = merged
+    out["connections"] = list(a.get("connections", [])) + list(b.get("connections", []))
+    closed = dict(a.get("closed_connections", {}))
+    for k, v in b.get("closed_connections", {}).items():
+        closed[k] = closed.get(k, 0) + v
+    out["closed_connections"] = closed
+    return out
+
+
+def prometheus_writer(metrics, path, interval_s, stop_evt, extra=None):
+    """
+    Thread body: dump the metrics as a Prometheus text file every interval_s.
+    extra: optional callable returning another process's snapshot() to merge.
+    """
+    interval_s = max(0.5, float(interval_s))
+    while not stop_evt.is_set():
+        stop_evt.wait(interval_s)
+        other = None
+        if extra is not None:
+            try:
+                other = extra()
+            except Exception as e:
+                print("[WARN] metrics export: control process:", e)
+        try:
+            metrics.write_prometheus(path, extra=other)
+        except Exception as e:
+            print("[WARN] metrics export failed:", e)
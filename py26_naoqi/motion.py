@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 import time
+import threading
 
 class SlewRateLimiter(object):
     """
@@ -43,21 +44,45 @@ class MovingTargetController(object):
         self._until_ts = 0.0  # if > now: auto-zero after deadline
         self._last_update_ts = 0.0
         self._idle_zero_s = float(auto_zero_on_idle_s)
+        self._hold_until = 0.0  # stop(hold_s): targets ignored until then
 
-    def set_target(self, vx_n, vy_n, vw_n, duration_s=None):
+    def configure(self, max_acc_vx, max_acc_vy, max_acc_vw, auto_zero_on_idle_s):
+        # live retune (settings reload), called from the control loop thread
+        self._lim_x.max_acc = float(max_acc_vx)
+        self._lim_y.max_acc = float(max_acc_vy)
+        self._lim_w.max_acc = float(max_acc_vw)
+        self._idle_zero_s = float(auto_zero_on_idle_s)
+
+    def set_target(self, vx_n, vy_n, vw_n, duration_s=None, sent_ts=None):
+        """
+        sent_ts: optional client send time (server clock); a 'duration_s'
+        window then counts from when the command was sent, not received.
+        Returns False (target ignored) during a stop(hold_s) hold.
+        """
         now = time.time()
+        if now < self._hold_until:
+            return False
         self._last_update_ts = now
         self._tgt_x = _clip(vx_n, -1.0, 1.0)
         self._tgt_y = _clip(vy_n, -1.0, 1.0)
         self._tgt_w = _clip(vw_n, -1.0, 1.0)
         if duration_s is not None and duration_s > 0.0:
-            self._until_ts = now + float(duration_s)
+            base = now if sent_ts is None else min(now, float(sent_ts))
+            self._until_ts = base + float(duration_s)
         else:
             self._until_ts = 0.0
+        return True
 
-    def stop(self):
-        # make the target zero immediately; limiters will ramp to zero
-        self.set_target(0.0, 0.0, 0.0, duration_s=None)
+    def stop(self, hold_s=0.0):
+        # make the target zero immediately; limiters will ramp to zero.
+        # hold_s > 0 (e.g. after a fall): whatever path set_target comes
+        # from, it is ignored for that long (a plain stop never shortens a hold)
+        now = time.time()
+        self._tgt_x = 0.0; self._tgt_y = 0.0; self._tgt_w = 0.0
+        self._until_ts = 0.0
+        self._last_update_ts = now
+        if hold_s > 0.0:
+            self._hold_until = max(self._hold_until, now + float(hold_s))
 
     def step(self, dt):
         """
@@ -87,7 +112,74 @@ class MovingTargetController(object):
             "last_update_ts": self._last_update_ts
         }
 
+    def state_values(self):
+        # state() flattened in key order, for codec.FixedReply
+        return (self._tgt_x, self._tgt_y, self._tgt_w,
+                self._lim_x.current, self._lim_y.current, self._lim_w.current,
+                self._until_ts, self._last_update_ts)
+
 def _clip(x, lo, hi):
     if x < lo: return lo
     if x > hi: return hi
     return x
+
+
+class StaleFilter(object):
+    """
+    Drops motion frames that arrive late or out of order (e.g. a stalled link
+    flushing its backlog). Per stream ("set_target", "set_head"):
+      - 'seq' must increase per connection,
+      - 'ts' (server clock) must not be older than the newest frame applied
+        from the same connection (clients' clock offsets differ),
+      - now - ts must not exceed max_age_s (per frame, else the default).
+    Frames without seq/ts are always accepted.
+    """
+    def __init__(self, default_max_age_s=None):
+        self.default_max_age_s = default_max_age_s
+        self._lock = threading.Lock()
+        self._last_seq = {}   # (conn_key, stream) -> seq
+        self._last_ts = {}    # (conn_key, stream) -> ts
+        self._accepted = {}
+        self._dropped = {}    # stream -> {reason: n}
+
+    def check(self, stream, conn_key, seq=None, ts=None, max_age_s=None, now=None):
+        """Returns None if the frame may be applied, else the drop reason."""
+        if now is None:
+            now = time.time()
+        if max_age_s is None:
+            max_age_s = self.default_max_age_s
+        with self._lock:
+            reason = None
+            if seq is not None:
+                last = self._last_seq.get((conn_key, stream))
+                if last is not None and seq <= last:
+                    reason = "out_of_order"
+            if reason is None and ts is not None:
+                if ts < self._last_ts.get((conn_key, stream), 0.0):
+                    reason = "superseded"
+                elif max_age_s is not None and max_age_s > 0.0 and (now - ts) > max_age_s:
+                    reason = "expired"
+            if reason is not None:
+                d = self._dropped.setdefault(stream, {})
+                d[reason] = d.get(reason, 0) + 1
+                return reason
+            if seq is not None:
+                self._last_seq[(conn_key, stream)] = seq
+            if ts is not None:
+                self._last_ts[(conn_key, stream)] = ts
+            self._accepted[stream] = self._accepted.get(stream, 0) + 1
+            return None
+
+    def forget(self, conn_key):
+        with self._lock:
+            for table in (self._last_seq, self._last_ts):
+                for k in list(table.keys()):
+                    if k[0] == conn_key:
+                        del table[k]
+
+    def stats(self):
+        with self._lock:
+            dropped = {}
+            for k, v in self._dropped.items():
+                dropped[k] = dict(v)
+            return {"accepted": dict(self._accepted), "dropped": dropped}
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 import socket
-import json
+from codec import dumps, loads
 
 def send_json_line(sock, obj):
-    data = json.dumps(obj)
+    return send_line(sock, dumps(obj))
+
+def send_line(sock, data):
+    """Send an already encoded JSON line (e.g. codec.FixedReply output)."""
     if not data.endswith("\n"):
         data += "\n"
-    _send_all(sock, data.encode('utf-8'))
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    _send_all(sock, data)
+    return len(data)
 
 def _send_all(sock, data_bytes):
     total = 0
@@ -21,7 +27,8 @@ def _send_all(sock, data_bytes):
 def recv_json_line(sock, buf):
     """
     buf is a dict with 'data' string buffer (Py2.6 str).
-    Returns (obj or None). Keeps partial data in buf['data'].
+    Returns (obj or None). Keeps partial data in buf['data'] and counts
+    received bytes in buf['nbytes'].
     """
     while True:
         idx = buf['data'].find("\n")
@@ -30,14 +37,15 @@ def recv_json_line(sock, buf):
             buf['data'] = buf['data'][idx+1:]
             line = line.strip()
             if line:
-                return json.loads(line)
+                return loads(line)
             return None
         chunk = sock.recv(4096)
         if not chunk:
             # peer closed; flush possible trailing line
             if buf['data'].strip():
-                obj = json.loads(buf['data'])
+                obj = loads(buf['data'])
                 buf['data'] = ""
                 return obj
             return None
+        buf['nbytes'] = buf.get('nbytes', 0) + len(chunk)
         buf['data'] += chunk
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import sys
+import time
+import threading
+
+
+def _frame_key(code):
+    return "%s:%d(%s)" % (os.path.basename(code.co_filename), code.co_firstlineno, code.co_name)
+
+
+class SamplingProfiler(object):
+    """
+    Statistical profiler over all Python threads (control loop, client
+    handlers, ...). A background thread samples sys._current_frames() every
+    interval_s for at most max_duration_s. Nothing is hooked into the
+    interpreter, so there is zero overhead when no session is running.
+    """
+    def __init__(self, out_dir=".", max_duration_s=60.0):
+        self.out_dir = out_dir
+        self.max_duration_s = float(max_duration_s)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last = None  # result of the last finished session
+
+    def running(self):
+        th = self._thread
+        return th is not None and th.is_alive()
+
+    def start(self, duration_s=10.0, interval_s=0.005):
+        with self._lock:
+            if self.running():
+                raise RuntimeError("profiler already running")
+            duration_s = max(0.1, min(float(duration_s), self.max_duration_s))
+            interval_s = max(0.001, float(interval_s))
+            self._stop = threading.Event()
+            self._last = None
+            th = threading.Thread(target=self._run, args=(duration_s, interval_s, self._stop))
+            th.daemon = True
+            self._thread = th
+            th.start()
+        return {"duration_s": duration_s, "interval_s": interval_s}
+
+    def stop(self, top=20):
+        """Stop the running session (if any); return its top-N summary."""
+        self._stop.set()
+        th = self._thread
+        if th is not None:
+            th.join(5.0)
+        with self._lock:
+            self._thread = None
+            res = self._last
+        if res is None:
+            raise RuntimeError("no profile collected")
+        out = dict(res)
+        out["top_self"] = res["top_self"][:top]
+        out["top_cumulative"] = res["top_cumulative"][:top]
+        return out
+
+    def _run(self, duration_s, interval_s, stop_evt):
+        me = threading.current_thread().ident
+        self_counts = {}
+        cum_counts = {}
+        thread_counts = {}
+        nsamples = 0
+        t_start = time.time()
+        t_end = t_start + duration_s
+        while not stop_evt.is_set() and time.time() < t_end:
+            names = {}
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                tname = names.get(tid, str(tid))
+                thread_counts[tname] = thread_counts.get(tname, 0) + 1
+                k = _frame_key(frame.f_code)
+                self_counts[k] = self_counts.get(k, 0) + 1
+                seen = set()
+                f = frame
+                while f is not None:
+                    k = _frame_key(f.f_code)
+                    if k not in seen:
+                        seen.add(k)
+                        cum_counts[k] = cum_counts.get(k, 0) + 1
+                    f = f.f_back
+            nsamples += 1
+            stop_evt.wait(interval_s)
+        elapsed = time.time() - t_start
+        self._finish(self_counts, cum_counts, thread_counts, nsamples, elapsed, interval_s)
+
+    def _finish(self, self_counts, cum_counts, thread_counts, nsamples, elapsed, interval_s):
+        # percentages are relative to all thread-samples, so 'self' sums to 100
+        nthread = sum(thread_counts.values())
+        def ranked(d):
+            items = sorted(d.items(), key=lambda kv: kv[1], reverse=True)
+            return [{"func": k, "samples": n,
+                     "pct": (100.0 * n / nthread) if nthread else 0.0} for k, n in items]
+        top_self = ranked(self_counts)
+        top_cum = ranked(cum_counts)
+        path = os.path.join(self.out_dir, "profile_%s.txt" % time.strftime("%Y%m%d_%H%M%S"))
+        try:
+            f = open(path, "w")
+            try:
+                f.write("# sampling profile: %d samples over %.2fs (interval %.1f ms)\n"
+                        % (nsamples, elapsed, interval_s * 1000.0))
+                f.write("# samples per thread: %s\n\n" % (thread_counts,))
+                f.write("%8s %7s  %s\n" % ("self", "pct", "function"))
+                for e in top_self:
+                    f.write("%8d %6.1f%%  %s\n" % (e["samples"], e["pct"], e["func"]))
+                f.write("\n%8s %7s  %s\n" % ("cumul", "pct", "function"))
+                for e in top_cum:
+                    f.write("%8d %6.1f%%  %s\n" % (e["samples"], e["pct"], e["func"]))
+            finally:
+                f.close()
+        except Exception as e:
+            print("[WARN] profile write failed:", e)
+            path = None
+        with self._lock:
+            self._last = {
+                "file": path,
+                "samples": nsamples,
+                "elapsed_s": elapsed,
+                "threads": thread_counts,
+                "top_self": top_self,
+                "top_cumulative": top_cum
+            }
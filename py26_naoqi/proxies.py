@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import re
+import time
+import socket
+import random
+import threading
+
+
+class ProxyUnavailable(RuntimeError):
+    pass
+
+
+# NAOqi reports everything as RuntimeError; these messages mean the module
+# answered and refused the call (bad posture name, wrong arguments, ...)
+_REFUSED = re.compile(r"not found|unknown|invalid|wrong number of arguments|"
+                      r"bad argument|out of range|(can't|cannot|could not) find method", re.I)
+
+
+def _transport_error(exc):
+    """True if exc says the proxy / broker link is broken, not the call itself."""
+    if isinstance(exc, (socket.error, IOError, EOFError)):
+        return True
+    if isinstance(exc, RuntimeError):
+        return _REFUSED.search(str(exc)) is None
+    return False  # TypeError, ValueError, AttributeError, ...: a caller's mistake
+
+
+class _Slot(object):
+    def __init__(self, name, required):
+        self.name = name
+        self.required = required
+        self.proxy = None
+        self.fails = 0            # consecutive failed calls
+        self.connects = 0
+        self.failures = 0         # times marked broken
+        self.down_since = None    # set when marked broken
+        self.last_error = None
+        self.refused = 0          # calls NAOqi rejected (not counted as failures)
+        self.last_recovery_s = None
+        self.connect_s = None
+
+
+class ProxySupervisor(object):
+    """
+    Creates ALProxy objects lazily in a background thread and keeps them
+    healthy: a proxy whose calls fail fail_threshold times in a row is
+    dropped and reconnected with jittered exponential backoff. Callers never
+    block on a missing proxy, they get ProxyUnavailable right away.
+    Optional proxies (e.g. ALTextToSpeech) are retried too but do not hold
+    back readiness.
+
+    on_connect(name, proxy) runs before a (re)connected proxy is published,
+    so e.g. the head angles can be re-read before the control loop uses it.
+
+    All proxies talk to the same broker: when a broken one reconnects
+    (typically after a NAOqi restart), the others are rebuilt too instead
+    of each failing fail_threshold times on a stale handle first.
+    """
+    def __init__(self, factory, ip, port, names, optional=(), metrics=None,
+                 on_connect=None, fail_threshold=3, backoff_s=(0.5, 10.0)):
+        self._factory = factory
+        self._ip = ip
+        self._port = port
+        self._metrics = metrics
+        self._on_connect = on_connect
+        self._fail_threshold = max(1, int(fail_threshold))
+        self._backoff_min, self._backoff_max = float(backoff_s[0]), float(backoff_s[1])
+        self._slots = {}
+        for n in names:
+            self._slots[n] = _Slot(n, True)
+        for n in optional:
+            self._slots[n] = _Slot(n, False)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self.started_ts = None
+        self.ready_s = None       # start -> all required proxies connected
+
+    def start(self, stop_evt):
+        self.started_ts = time.time()
+        self._thread = threading.Thread(target=self._run, args=(stop_evt,), name="proxy_supervisor")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def wait_ready(self, timeout=None):
+        self._ready.wait(timeout)
+        return self._ready.is_set()
+
+    def get(self, name):
+        p = self._slots[name].proxy
+        if p is None:
+            raise ProxyUnavailable("%s not connected" % name)
+        return p
+
+    def call(self, name, method, *args):
+        """proxy.method(*args), timed in metrics; repeated failures trigger a reconnect."""
+        slot = self._slots[name]
+        p = slot.proxy
+        if p is None:
+            raise ProxyUnavailable("%s not connected" % name)
+        try:
+            if self._metrics is not None:
+                r = self._metrics.call(method, getattr(p, method), *args)
+            else:
+                r = getattr(p, method)(*args)
+        except Exception as e:
+            self._call_failed(slot, p, e)
+            raise
+        slot.fails = 0
+        return r
+
+    def post(self, name, method, *args):
+        """Fire-and-forget through NAOqi's async 'post'; False if it could not be queued."""
+        slot = self._slots[name]
+        p = slot.proxy
+        if p is None:
+            return False
+        try:
+            getattr(p.post, method)(*args)
+        except Exception as e:
+            self._call_failed(slot, p, e)
+            return False
+        return True
+
+    def _call_failed(self, slot, p, exc):
+        with self._lock:
+            if slot.proxy is not p:
+                return  # already replaced
+            slot.last_error = str(exc)
+            if not _transport_error(exc):
+                slot.refused += 1
+                return
+            slot.fails += 1
+            if slot.fails < self._fail_threshold:
+                return
+            print("[WARN] %s failing (%s), reconnecting" % (slot.name, exc))
+            slot.proxy = None
+            slot.fails = 0
+            slot.failures += 1
+            slot.down_since = time.time()
+            self._ready.clear()
+        self._wake.set()
+
+    def _run(self, stop_evt):
+        delay = {}
+        next_try = {}
+        while not stop_evt.is_set():
+            now = time.time()
+            pending = False
+            fresh = []            # reconnected in this pass
+            recovered = False
+            for slot in list(self._slots.values()):
+                if slot.proxy is not None:
+                    continue
+                pending = True
+                if now < next_try.get(slot.name, 0.0):
+                    continue
+                t0 = time.time()
+                try:
+                    p = self._factory(slot.name, self._ip, self._port)
+                    if self._on_connect is not None:
+                        self._on_connect(slot.name, p)
+                except Exception as e:
+                    slot.last_error = str(e)
+                    d = delay.get(slot.name, self._backoff_min)
+                    delay[slot.name] = min(d * 2.0, self._backoff_max)
+                    next_try[slot.name] = time.time() + d * random.uniform(0.8, 1.2)
+                    continue
+                done = time.time()
+                slot.connect_s = done - t0
+                if slot.down_since is not None:
+                    slot.last_recovery_s = done - slot.down_since
+                    print("[INFO] %s reconnected after %.2fs" % (slot.name, slot.last_recovery_s))
+                    recovered = True
+                slot.down_since = None
+                slot.connects += 1
+                slot.fails = 0
+                delay.pop(slot.name, None)
+                slot.proxy = p
+                fresh.append(slot.name)
+            if recovered:
+                self._refresh_others(fresh)
+            if self._all_required_up():
+                if not self._ready.is_set():
+                    if self.ready_s is None:
+                        self.ready_s = time.time() - self.started_ts
+                        print("[INFO] NAOqi proxies ready after %.2fs" % self.ready_s)
+                    self._ready.set()
+            self._wake.wait(0.1 if pending else 1.0)
+            self._wake.clear()
+
+    def _refresh_others(self, fresh):
+        # swap in new proxies for the still connected slots; callers keep
+        # working on the old handle until the swap, so there is no gap
+        for slot in list(self._slots.values()):
+            if slot.name in fresh or slot.proxy is None:
+                continue
+            try:
+                p = self._factory(slot.name, self._ip, self._port)
+                if self._on_connect is not None:
+                    self._on_connect(slot.name, p)
+            except Exception as e:
+                with self._lock:
+                    slot.last_error = str(e)
+                    slot.proxy = None
+                    slot.fails = 0
+                    slot.failures += 1
+                    slot.down_since = time.time()
+                    self._ready.clear()
+                continue
+            with self._lock:
+                slot.proxy = p
+                slot.fails = 0
+                slot.connects += 1
+
+    def _all_required_up(self):
+        for slot in self._slots.values():
+            if slot.required and slot.proxy is None:
+                return False
+        return True
+
+    def stats(self):
+        out = {"ready": self._ready.is_set(), "ready_s": self.ready_s, "proxies": {}}
+        for slot in self._slots.values():
+            out["proxies"][slot.name] = {
+                "connected": slot.proxy is not None,
+                "required": slot.required,
+                "connects": slot.connects,
+                "failures": slot.failures,
+                "refused": slot.refused,
+                "connect_s": slot.connect_s,
+                "last_recovery_s": slot.last_recovery_s,
+                "last_error": slot.last_error
+            }
+        return out
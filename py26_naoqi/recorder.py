@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Always-on flight recorder for control_loop: a preallocated array('d') ring
+of per-tick records, dumped on demand (dump_recorder), on a control loop
+crash and on shutdown.
+
+Dump format (little-endian):
+  "<8sIII"  magic "NAOREC1\\0", version, n_fields, n_records
+  n_fields  NUL-padded 16-byte field names
+  n_records x n_fields float64, oldest first
+"""
+from __future__ import print_function
+import os
+import re
+import sys
+import time
+import struct
+import threading
+from array import array
+
+MAGIC = b"NAOREC1\0"
+VERSION = 1
+FIELDS = ("ts", "tgt_vx", "tgt_vy", "tgt_vw", "cur_vx", "cur_vy", "cur_vw",
+          "head_yaw", "head_pitch", "deadman", "tick_s", "err_flags")
+NF = len(FIELDS)
+
+# err_flags bits
+ERR_MOVE = 1          # moveToward failed
+ERR_STIFF = 2         # head setStiffnesses failed
+ERR_ANGLES = 4        # setAngles failed
+ERR_PROXY = 8         # ALMotion not connected
+
+_HDR = struct.Struct("<8sIII")
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class FlightRecorder(object):
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._buf = array('d', [0.0]) * (self.capacity * NF)
+        self._i = 0        # next slot
+        self.count = 0     # records ever written
+        self._lock = threading.Lock()  # record() vs snapshot(); uncontended on the tick path
+
+    def record(self, ts, tx, ty, tw, cx, cy, cw, hy, hp, deadman, tick_s, err):
+        b = self._buf
+        with self._lock:
+            o = self._i * NF
+            b[o] = ts; b[o + 1] = tx; b[o + 2] = ty; b[o + 3] = tw
+            b[o + 4] = cx; b[o + 5] = cy; b[o + 6] = cw
+            b[o + 7] = hy; b[o + 8] = hp
+            b[o + 9] = deadman; b[o + 10] = tick_s; b[o + 11] = err
+            i = self._i + 1
+            self._i = 0 if i == self.capacity else i
+            self.count += 1
+
+    def snapshot(self):
+        """Records oldest first, as a new array (allocates; not for the tick path)."""
+        with self._lock:
+            n = min(self.count, self.capacity)
+            o = self._i * NF
+            if self.count < self.capacity:
+                return array('d', self._buf[:o]), n
+            return self._buf[o:] + self._buf[:o], n
+
+    def dump(self, path):
+        data, n = self.snapshot()
+        if sys.byteorder != "little":
+            data.byteswap()
+        tmp = path + ".tmp"
+        f = open(tmp, "wb")
+        try:
+            f.write(_HDR.pack(MAGIC, VERSION, NF, n))
+            for name in FIELDS:
+                f.write(struct.pack("16s", name.encode("ascii")))
+            data.tofile(f)
+        finally:
+            f.close()
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Windows: rename does not replace an existing file
+            try: os.remove(path)
+            except OSError: pass
+            os.rename(tmp, path)
+        return {"file": path, "records": n, "bytes": _HDR.size + 16 * NF + n * NF * 8}
+
+    def dump_to_dir(self, out_dir, reason="manual", name=None):
+        """
+        name: optional file name from a client; only its basename is kept,
+        reduced to [A-Za-z0-9_.-], so a dump never lands outside out_dir.
+        """
+        if name:
+            name = _UNSAFE.sub("_", os.path.basename(("%s" % name).replace("\\", "/"))).lstrip(".")
+        if not name:
+            name = "flight_%s_%s.bin" % (time.strftime("%Y%m%d_%H%M%S"), reason)
+        elif not name.endswith(".bin"):
+            name += ".bin"
+        return self.dump(os.path.join(out_dir, name))
+
+
+def load(path):
+    """(field_names, [record tuples]) from a dump, pure Python for offline use."""
+    f = open(path, "rb")
+    try:
+        magic, version, nf, n = _HDR.unpack(f.read(_HDR.size))
+        if magic != MAGIC:
+            raise ValueError("not a flight recorder dump: %s" % path)
+        names = []
+        for _ in range(nf):
+            names.append(f.read(16).rstrip(b"\0").decode("ascii"))
+        data = array('d')
+        data.fromfile(f, n * nf)
+    finally:
+        f.close()
+    if sys.byteorder != "little":
+        data.byteswap()
+    recs = []
+    for i in range(n):
+        recs.append(tuple(data[i * nf:(i + 1) * nf]))
+    return names, recs
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
+import os
 import time
 import socket
 import threading
@@ -10,6 +11,7 @@ import site
 
 import signal
 import threading
+import multiprocessing
 import config
 
 if config.EXTRA_SITE_DIR:
@@ -18,14 +20,32 @@ if config.EXTRA_SITE_DIR:
     except Exception:
         pass
 
-try:
-    from naoqi import ALProxy
-except Exception as e:
-    print("[FATAL] NAOqi SDK not importable:", e)
-    sys.exit(1)
+if getattr(config, "SIMULATE_NAOQI", False) or "--sim" in sys.argv:
+    # no robot: simulated proxies with configurable RPC latency
+    from sim_naoqi import ALProxy, ALBroker, ALModule
+    _SIMULATED = True
+    print("[INFO] using simulated NAOqi (sim_naoqi.py)")
+else:
+    try:
+        from naoqi import ALProxy, ALBroker, ALModule
+    except Exception as e:
+        print("[FATAL] NAOqi SDK not importable:", e)
+        sys.exit(1)
+    _SIMULATED = False
 
-from net import send_json_line, recv_json_line
-from motion import MovingTargetController
+from net import send_json_line, send_line, recv_json_line
+from codec import FixedReply
+from proxies import ProxySupervisor, ProxyUnavailable
+import shm
+import recorder
+import video
+from events import EventHub, Subscriber
+import split
+from settings import Settings
+from actuators import ActuatorChannel
+from motion import MovingTargetController, StaleFilter
+from metrics import Metrics, prometheus_writer
+from profiler import SamplingProfiler
 
 
 
@@ -63,20 +83,54 @@ def _clip(x, lo, hi):
 
 
 # Globals
-_motion = None
-_posture = None
-_tts = None
+_T_START = time.time()
+_first_cmd_s = None   # process start -> first successfully handled command
+_listen_s = None      # process start -> listening socket ready
+
+# Config snapshot read by control_loop; swapped by reload_config / set_config
+_settings = Settings.from_config(config)
+_settings_lock = threading.Lock()
 
 _deadman = bool(config.DEADMAN_INITIAL)
 _ctrl = MovingTargetController(
-    max_acc_vx=config.MAX_ACC_VX,
-    max_acc_vy=config.MAX_ACC_VY,
-    max_acc_vw=config.MAX_ACC_VW,
-    auto_zero_on_idle_s=config.AUTO_ZERO_ON_IDLE_S
+    max_acc_vx=_settings.max_acc_vx,
+    max_acc_vy=_settings.max_acc_vy,
+    max_acc_vw=_settings.max_acc_vw,
+    auto_zero_on_idle_s=_settings.auto_zero_on_idle_s
 )
 
+# Drops late / out-of-order set_target & set_head frames (see motion.py)
+_stale = StaleFilter(default_max_age_s=_settings.stale_max_age_s)
+
+# Flight recorder: last RECORDER_SECONDS of control_loop ticks (see recorder.py)
+_rec = recorder.FlightRecorder(
+    float(getattr(config, "RECORDER_SECONDS", 300.0)) * _settings.loop_hz)
+
+# Same-host shared-memory input (see shm.py), opened in main() if configured
+_shm = None
+_video = None
+
+# PROCESS_SPLIT / --split (see split.py): _link in the network process,
+# _split_ep in the control process; both None in single-process mode
+_SPLIT = bool(getattr(config, "PROCESS_SPLIT", False)) or "--split" in sys.argv
+_link = None
+_split_ep = None
+
 _clients = set()
 _clients_lock = threading.Lock()
+_event_subs = {}  # conn -> events.Subscriber, for clients that sent subscribe_events
+
+# every command handle_conn knows; anything else is counted as "unknown"
+_COMMANDS = ("ping", "shutdown", "wake", "rest", "set_head", "center_head", "posture",
+             "set_deadman", "set_target", "metrics", "reload_config", "set_config",
+             "dump_recorder", "profile_start", "profile_stop", "subscribe_events", "raise_event")
+
+# Latency histograms / counters (see metrics.py)
+_metrics = Metrics(commands=_COMMANDS)
+
+# On-demand sampling profiler (profile_start / profile_stop)
+_profiler = SamplingProfiler(out_dir=getattr(config, "PROFILE_OUT_DIR", "."),
+                             max_duration_s=getattr(config, "PROFILE_MAX_S", 60.0))
 
 # ---- Head control state ----
 _head_yaw   = 0.0
@@ -86,6 +140,15 @@ _head_lock = threading.Lock()
 
 
 
+# Pre-rendered replies for the high-rate commands (see codec.py)
+_REP_HEAD = FixedReply('{"yaw_n":%s,"pitch_n":%s}')
+_REP_DEADMAN = FixedReply('{"enabled":%s}')
+_REP_TARGET = FixedReply('{"target":{"vx_n":%s,"vy_n":%s,"vw_n":%s},'
+                         '"current":{"vx_n":%s,"vy_n":%s,"vw_n":%s},'
+                         '"until_ts":%s,"last_update_ts":%s}')
+
+
+
 # Py2.6 type helpers
 try:
     basestring  # noqa
@@ -95,6 +158,10 @@ try:
     unicode  # noqa
 except NameError:
     unicode = str
+try:
+    reload  # noqa
+except NameError:
+    from importlib import reload
 
 _VALID_POSTURES = set([
     "Stand", "StandInit", "StandZero",
@@ -139,36 +206,150 @@ def _to_bytes(s):
 
 
 
-def init_proxies():
-    global _motion, _posture, _tts
-    _motion  = ALProxy("ALMotion",       config.NAO_IP, config.NAO_PORT)
-    _posture = ALProxy("ALRobotPosture", config.NAO_IP, config.NAO_PORT)
-    try:
-        _tts = ALProxy("ALTextToSpeech", config.NAO_IP, config.NAO_PORT)
-    except Exception:
-        _tts = None
+def _on_proxy_connect(name, proxy):
+    # runs in the supervisor thread before the proxy is published
+    if name == "ALMotion":
+        # Read current head angles as starting target (again after a NAOqi restart)
+        try:
+            ang = proxy.getAngles(["HeadYaw","HeadPitch"], True)
+            if isinstance(ang, list) and len(ang) == 2:
+                global _head_yaw, _head_pitch
+                with _head_lock:
+                    _head_yaw, _head_pitch = float(ang[0]), float(ang[1])
+        except Exception:
+            pass
+    elif name == "ALTextToSpeech":
+        if not _nao.stats()["proxies"][name]["connects"]:
+            try: proxy.post.say("Interface prêt.")
+            except Exception: pass
+
+# NAOqi proxies: created in the background, reconnected on repeated failures
+_nao = ProxySupervisor(ALProxy, config.NAO_IP, config.NAO_PORT,
+                       names=("ALMotion", "ALRobotPosture"),
+                       optional=("ALTextToSpeech",) +
+                                (("ALVideoDevice",) if getattr(config, "VIDEO_ENABLED", False) else ()),
+                       metrics=_metrics,
+                       on_connect=_on_proxy_connect,
+                       fail_threshold=getattr(config, "PROXY_FAIL_THRESHOLD", 3),
+                       backoff_s=(getattr(config, "PROXY_BACKOFF_MIN_S", 0.5),
+                                  getattr(config, "PROXY_BACKOFF_MAX_S", 10.0)))
+
+def _swap_settings(overrides=None):
+    """
+    Build a new snapshot (reloading config.py if overrides is None) and
+    publish it; control_loop applies it at its next tick. Raises ValueError
+    and keeps the old snapshot if validation fails.
+    """
+    global _settings
+    with _settings_lock:
+        if overrides is None:
+            reload(config)
+            new = Settings.from_config(config)
+        else:
+            new = Settings.from_config(config, overrides)
+            # the validated, converted values, not the client's strings
+            vals = new.config_values()
+            for k in overrides:
+                setattr(config, k, vals[k])
+        _settings = new
+    return new
+
 
 def say(txt):
-    if _tts:
-        try: _tts.say(txt)
-        except Exception: pass
+    # never blocks: NAOqi 'post' call, or skipped if TTS is not connected
+    _nao.post("ALTextToSpeech", "say", txt)
+
+
+# ---- ALMemory event alerts (see events.py) ----
+_fall_hold_until = 0.0
+
+
+def _on_alert(key, kind, value):
+    # runs on the NAOqi callback thread, before any client hears about it
+    global _fall_hold_until
+    if kind == "fall":
+        # the hold is enforced where targets are applied (TCP, shm, split child);
+        # _fall_hold_until only lets handle_conn tell the client why
+        hold_s = float(getattr(config, "EVENTS_FALL_HOLD_S", 2.0))
+        if _link is not None:
+            _link.stop(hold_s)
+        else:
+            _ctrl.stop(hold_s)
+        _fall_hold_until = time.time() + hold_s
+        print("[WARN] %s: targets zeroed" % key)
+
+
+def _push_event(frame):
+    # never blocks: each subscriber has its own sender thread (events.Subscriber)
+    with _clients_lock:
+        subs = list(_event_subs.items())
+    for conn, sub in subs:
+        if not sub.offer(frame):
+            with _clients_lock:
+                if _event_subs.get(conn) is sub:
+                    del _event_subs[conn]
+            print("[WARN] event subscriber not reading, dropped")
+
+
+def _event_sender(conn, wlock):
+    def send(frame):
+        with wlock:
+            send_json_line(conn, frame)
+    return send
+
+
+_events = None
+if getattr(config, "EVENTS_ENABLED", False):
+    _events = EventHub(getattr(config, "EVENTS", {}),
+                       coalesce_s=getattr(config, "EVENTS_COALESCE_S", 1.0),
+                       on_event=_on_alert, push=_push_event)
 
 
 def handle_conn(conn, addr):
-    buf = {'data': ""}
+    global _first_cmd_s
+    buf = {'data': "", 'nbytes': 0}
+    ckey = id(conn)
+    wlock = threading.Lock()  # replies vs. pushed event frames
     with _clients_lock:
         _clients.add(conn)
+    _metrics.conn_open(ckey, addr)
     try:
         while not _SHUTDOWN.is_set():
             msg = recv_json_line(conn, buf)
             if msg is None:
                 break
+            t_cmd = time.time()
             rid = msg.get("rid")
             cmd = msg.get("cmd")
             args = msg.get("args", {}) or {}
+            # optional send timestamp, already converted to our clock by the client
+            sent_ts = msg.get("ts")
+            if sent_ts is not None:
+                try:
+                    sent_ts = float(sent_ts)
+                    _metrics.observe_oneway(cmd, max(0.0, t_cmd - sent_ts))
+                except Exception:
+                    sent_ts = None
             try:
-                if cmd == "ping":
-                    rep = {"ok": True, "rid": rid, "data": {"pong": time.time()}}
+                drop = None
+                if cmd in ("set_target", "set_head"):
+                    seq = msg.get("seq")
+                    max_age = msg.get("max_age_s")
+                    drop = _stale.check(cmd, ckey,
+                                        seq=(None if seq is None else int(seq)),
+                                        ts=sent_ts,
+                                        max_age_s=(None if max_age is None else float(max_age)),
+                                        now=t_cmd)
+                    if drop is None and cmd == "set_target" and t_cmd < _fall_hold_until:
+                        drop = "fall"
+                if drop is not None:
+                    # stale frame: never reaches _ctrl / _head_cmd
+                    rep = {"ok": True, "rid": rid, "data": {"dropped": drop}}
+                elif cmd == "ping":
+                    # t1 = receive time, pong = reply time (NTP-style sync, see py3 clock.py)
+                    rep = {"ok": True, "rid": rid, "data": {"pong": time.time(), "t1": t_cmd}}
+                    if "t0" in args:
+                        rep["data"]["t0"] = args["t0"]
                 elif cmd == "shutdown":
                     # Optional remote shutdown
                     _SHUTDOWN.set()
@@ -176,9 +357,9 @@ def handle_conn(conn, addr):
                 elif cmd == "wake":
                     try:
                         # not all NAOqi 1.14 have wakeUp; emulate
-                        _motion.setStiffnesses("Body", 1.0)
+                        _nao.call("ALMotion", "setStiffnesses", "Body", 1.0)
                         try:
-                            _posture.goToPosture("StandInit", 0.75)
+                            _nao.call("ALRobotPosture", "goToPosture", "StandInit", 0.75)
                         except Exception:
                             pass
                         rep = {"ok": True, "rid": rid, "data": {}}
@@ -187,10 +368,10 @@ def handle_conn(conn, addr):
                 elif cmd == "rest":
                     try:
                         try:
-                            _posture.goToPosture("Crouch", 0.5)
+                            _nao.call("ALRobotPosture", "goToPosture", "Crouch", 0.5)
                         except Exception:
                             pass
-                        _motion.setStiffnesses("Body", 0.0)
+                        _nao.call("ALMotion", "setStiffnesses", "Body", 0.0)
                         rep = {"ok": True, "rid": rid, "data": {}}
                     except Exception as e:
                         rep = {"ok": False, "rid": rid, "error": str(e)}
@@ -209,16 +390,22 @@ def handle_conn(conn, addr):
                     if yn >  1.0: yn =  1.0
                     if pn < -1.0: pn = -1.0
                     if pn >  1.0: pn =  1.0
-                    with _head_lock:
-                        _head_cmd["yaw_n"] = yn
-                        _head_cmd["pitch_n"] = pn
-                    rep = {"ok": True, "rid": rid, "data": {"yaw_n": yn, "pitch_n": pn}}
+                    if _link is not None:
+                        _link.set_head(yn, pn)
+                    else:
+                        with _head_lock:
+                            _head_cmd["yaw_n"] = yn
+                            _head_cmd["pitch_n"] = pn
+                    rep = _REP_HEAD.encode(rid, yn, pn)
 
                 elif cmd == "center_head":
-                    with _head_lock:
-                        global _head_yaw, _head_pitch
-                        _head_yaw = 0.0
-                        _head_pitch = 0.0
+                    if _link is not None:
+                        _link.center_head()
+                    else:
+                        with _head_lock:
+                            global _head_yaw, _head_pitch
+                            _head_yaw = 0.0
+                            _head_pitch = 0.0
                     rep = {"ok": True, "rid": rid, "data": {}}
 
 
@@ -236,8 +423,8 @@ def handle_conn(conn, addr):
                             if speed > 1.0: speed = 1.0
                             # Force bytes for NAOqi
                             name_b = _to_bytes(name)
-                            _motion.setStiffnesses("Body", 1.0)
-                            _posture.goToPosture(name_b, speed)
+                            _nao.call("ALMotion", "setStiffnesses", "Body", 1.0)
+                            _nao.call("ALRobotPosture", "goToPosture", name_b, speed)
                             rep = {"ok": True, "rid": rid, "data": {"name": name, "speed": speed}}
                         except Exception as e:
                             rep = {"ok": False, "rid": rid, "error": str(e)}
@@ -246,7 +433,9 @@ def handle_conn(conn, addr):
                 elif cmd == "set_deadman":
                     global _deadman
                     _deadman = bool(args.get("enabled", False))
-                    rep = {"ok": True, "rid": rid, "data": {"enabled": _deadman}}
+                    if _link is not None:
+                        _link.set_deadman(_deadman)
+                    rep = _REP_DEADMAN.encode(rid, _deadman)
                 elif cmd == "set_target":
                     vx = float(args.get("vx_n", 0.0))
                     vy = float(args.get("vy_n", 0.0))
@@ -254,53 +443,357 @@ def handle_conn(conn, addr):
                     dur = args.get("duration_s", None)
                     if dur is not None:
                         dur = float(dur)
-                    _ctrl.set_target(vx, vy, vw, duration_s=dur)
-                    rep = {"ok": True, "rid": rid, "data": _ctrl.state()}
+                    if _link is not None:
+                        rep = _REP_TARGET.encode(rid, *_link.set_target(vx, vy, vw, duration_s=dur,
+                                                                        sent_ts=sent_ts))
+                    else:
+                        _ctrl.set_target(vx, vy, vw, duration_s=dur, sent_ts=sent_ts)
+                        rep = _REP_TARGET.encode(rid, *_ctrl.state_values())
+                elif cmd == "metrics":
+                    # args: {"reset": bool} -> snapshot then optionally clear
+                    rep = {"ok": True, "rid": rid, "data": _metrics.snapshot()}
+                    rep["data"]["stale"] = _stale.stats()
+                    rep["data"]["naoqi"] = _nao.stats()
+                    rep["data"]["startup"] = {"listen_s": _listen_s, "first_cmd_s": _first_cmd_s,
+                                              "proxies_ready_s": _nao.ready_s}
+                    if _shm is not None:
+                        rep["data"]["shm"] = _shm.stats()
+                    if _video is not None:
+                        rep["data"]["video"] = _video.stats()
+                    if _events is not None:
+                        rep["data"]["events"] = _events.stats()
+                    if _link is not None:
+                        # loop / tick-path RPC timing live in the control process
+                        ctl = _link.request("metrics", bool(args.get("reset", False)))
+                        rep["data"]["loop"] = ctl.pop("loop")
+                        rep["data"]["control"] = ctl
+                    elif _act_move is not None:
+                        rep["data"]["actuators"] = {"move": _act_move.stats(), "head": _act_head.stats()}
+                    if args.get("reset", False):
+                        _metrics.reset()
+                elif cmd in ("reload_config", "set_config"):
+                    # set_config args: {"HEAD_MAX_YAW_RATE": 2.0, ...}
+                    try:
+                        ovr = None
+                        if cmd == "set_config":
+                            ovr = {}
+                            for k, v in args.items():
+                                ovr[str(k)] = v
+                        new = _swap_settings(ovr)
+                        if _link is not None:
+                            _link.request("settings", ovr)
+                            _stale.default_max_age_s = new.stale_max_age_s
+                        rep = {"ok": True, "rid": rid, "data": new.as_dict()}
+                    except Exception as e:
+                        rep = {"ok": False, "rid": rid, "error": str(e)}
+                elif cmd == "dump_recorder":
+                    # args: {"path": str} file name, always inside RECORDER_DIR
+                    # (default: flight_<time>_manual.bin)
+                    try:
+                        path = args.get("path")
+                        if _link is not None:
+                            info = _link.request("dump_recorder", path)
+                        else:
+                            info = _rec.dump_to_dir(getattr(config, "RECORDER_DIR", "."), name=path)
+                        rep = {"ok": True, "rid": rid, "data": info}
+                    except Exception as e:
+                        rep = {"ok": False, "rid": rid, "error": str(e)}
+                elif cmd == "profile_start":
+                    # args: {"duration_s": float, "interval_ms": float,
+                    #        "process": "control" | "network" (split mode, default control)}
+                    try:
+                        duration_s = float(args.get("duration_s", 10.0))
+                        interval_s = float(args.get("interval_ms", 5.0)) / 1000.0
+                        if _link is not None and args.get("process", "control") == "control":
+                            info = _link.request("profile_start", duration_s, interval_s)
+                        else:
+                            info = _profiler.start(duration_s=duration_s, interval_s=interval_s)
+                        rep = {"ok": True, "rid": rid, "data": info}
+                    except Exception as e:
+                        rep = {"ok": False, "rid": rid, "error": str(e)}
+                elif cmd == "subscribe_events":
+                    # args: {"on": bool} -> event frames {"event": key, "kind", "value", "ts", "repeats"}
+                    if _events is None:
+                        rep = {"ok": False, "rid": rid, "error": "events disabled"}
+                    else:
+                        with _clients_lock:
+                            sub = _event_subs.pop(conn, None)
+                            if sub is not None:
+                                sub.close()
+                            if args.get("on", True):
+                                _event_subs[conn] = Subscriber(
+                                    _event_sender(conn, wlock),
+                                    max_pending=getattr(config, "EVENTS_MAX_PENDING", 32),
+                                    name="events-%s:%s" % tuple(addr[:2]))
+                        rep = {"ok": True, "rid": rid, "data": {"events": sorted(_events.events)}}
+                elif cmd == "raise_event" and _SIMULATED:
+                    # offline testing only: args {"key": "robotHasFallen", "value": 1}
+                    ALProxy("ALMemory", config.NAO_IP, config.NAO_PORT).raiseEvent(str(args["key"]), args.get("value"))
+                    rep = {"ok": True, "rid": rid, "data": {}}
+                elif cmd == "profile_stop":
+                    # args: {"top": int, "process": as for profile_start} -> top-N summary, full stats in a file
+                    try:
+                        top = int(args.get("top", 20))
+                        if _link is not None and args.get("process", "control") == "control":
+                            data = _link.request("profile_stop", top, timeout_s=10.0)
+                        else:
+                            data = _profiler.stop(top=top)
+                        rep = {"ok": True, "rid": rid, "data": data}
+                    except Exception as e:
+                        rep = {"ok": False, "rid": rid, "error": str(e)}
                 else:
                     rep = {"ok": False, "rid": rid, "error": "unknown cmd: %s" % cmd}
             except Exception as e:
                 rep = {"ok": False, "rid": rid, "error": "exception: %s" % (e,)}
+            # rep is a dict, or an already encoded FixedReply line (always ok)
             try:
-                send_json_line(conn, rep)
+                with wlock:
+                    if isinstance(rep, dict):
+                        ok = rep.get("ok")
+                        nout = send_json_line(conn, rep)
+                    else:
+                        ok = True
+                        nout = send_line(conn, rep)
             except Exception:
                 break
+            _metrics.observe_cmd(cmd, time.time() - t_cmd)
+            if ok and _first_cmd_s is None and cmd != "ping":  # a real command, not a probe
+                _first_cmd_s = time.time() - _T_START
+                print("[INFO] first command handled %.3fs after start" % _first_cmd_s)
+            _metrics.conn_update(ckey, msgs=1, errors=(0 if ok else 1),
+                                 bytes_in=buf['nbytes'], bytes_out=nout)
+            buf['nbytes'] = 0
     finally:
+        _metrics.conn_close(ckey)
+        _stale.forget(ckey)
         with _clients_lock:
             try: _clients.remove(conn)
             except Exception: pass
+            sub = _event_subs.pop(conn, None)
+        if sub is not None:
+            sub.close()
         try: conn.close()
         except Exception: pass
 
 
 
 
+def _poll_shm(now):
+    # latest frame -> same path as set_target / set_head, then ring commands
+    global _deadman, _head_yaw, _head_pitch
+    lv = _shm.read_latest()
+    if lv is not None:
+        ts, vx, vy, vw, yn, pn = lv
+        if _stale.check("set_target", "shm", ts=ts, now=now) is None:
+            _ctrl.set_target(vx, vy, vw)
+        if _stale.check("set_head", "shm", ts=ts, now=now) is None:
+            with _head_lock:
+                _head_cmd["yaw_n"] = _clip(yn, -1.0, 1.0)
+                _head_cmd["pitch_n"] = _clip(pn, -1.0, 1.0)
+    for code, a, b, c in _shm.poll_commands():
+        if code == shm.CMD_SET_DEADMAN:
+            _deadman = bool(a)
+        elif code == shm.CMD_CENTER_HEAD:
+            with _head_lock:
+                _head_yaw = 0.0
+                _head_pitch = 0.0
+        elif code == shm.CMD_STOP:
+            _ctrl.stop()
+
+
+def _poll_split():
+    # command block from the network process -> same state as handle_conn sets
+    global _deadman, _head_yaw, _head_pitch
+    got = _split_ep.poll()
+    if got is None:
+        return
+    v, prev = got
+    if v[split.C_TGT_N] != prev[split.C_TGT_N]:
+        _ctrl.set_target(v[split.C_VX], v[split.C_VY], v[split.C_VW],
+                         duration_s=(v[split.C_DUR] or None), sent_ts=(v[split.C_SENT_TS] or None))
+    if v[split.C_STOP_N] != prev[split.C_STOP_N]:
+        _ctrl.stop(v[split.C_HOLD_S])
+    # only values that changed: an unrelated write (e.g. set_target) must not
+    # undo a CMD_SET_DEADMAN or head frame that came in over shm since
+    if v[split.C_DEADMAN_N] != prev[split.C_DEADMAN_N]:
+        _deadman = bool(v[split.C_DEADMAN])
+    with _head_lock:
+        if v[split.C_HEAD_N] != prev[split.C_HEAD_N]:
+            _head_cmd["yaw_n"] = v[split.C_YAW_N]
+            _head_cmd["pitch_n"] = v[split.C_PITCH_N]
+        if v[split.C_CENTER_N] != prev[split.C_CENTER_N]:
+            _head_yaw = 0.0
+            _head_pitch = 0.0
+
+
+def _split_handlers():
+    # pipe requests served in the control process (see split.ControlEndpoint.serve)
+    def metrics(reset):
+        d = _metrics.snapshot()
+        d["naoqi"] = _nao.stats()
+        d["split_torn"] = _split_ep.torn
+        if _shm is not None:
+            d["shm"] = _shm.stats()
+        if _act_move is not None:
+            d["actuators"] = {"move": _act_move.stats(), "head": _act_head.stats()}
+        if reset:
+            _metrics.reset()
+        return d
+
+    def settings(overrides):
+        return _swap_settings(overrides).as_dict()
+
+    def dump_recorder(path):
+        return _rec.dump_to_dir(getattr(config, "RECORDER_DIR", "."), name=path)
+
+    def profile_start(duration_s, interval_s):
+        return _profiler.start(duration_s=duration_s, interval_s=interval_s)
+
+    def profile_stop(top):
+        return _profiler.stop(top=top)
+
+    return {"metrics": metrics, "settings": settings, "dump_recorder": dump_recorder,
+            "profile_start": profile_start, "profile_stop": profile_stop}
+
+
+def _control_process(cmd, st, pipe, parent_pipe):
+    # PROCESS_SPLIT child: control_loop, tick-path proxies and actuator workers
+    global _nao, _shm, _split_ep
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the network process decides when to stop
+    except Exception:
+        pass
+    # drop the inherited parent end, or its death never reads as EOF here
+    parent_pipe.close()
+    _split_ep = split.ControlEndpoint(cmd, st, pipe)
+    # own NAOqi connection, ALMotion only (posture / TTS stay with the network process)
+    _nao = ProxySupervisor(ALProxy, config.NAO_IP, config.NAO_PORT,
+                           names=("ALMotion",),
+                           metrics=_metrics,
+                           on_connect=_on_proxy_connect,
+                           fail_threshold=getattr(config, "PROXY_FAIL_THRESHOLD", 3),
+                           backoff_s=(getattr(config, "PROXY_BACKOFF_MIN_S", 0.5),
+                                      getattr(config, "PROXY_BACKOFF_MAX_S", 10.0)))
+    _nao.start(_SHUTDOWN)
+    shm_path = getattr(config, "LOCAL_SHM_PATH", None)
+    if shm_path:
+        _shm = shm.ShmReader(shm_path)
+    if _act_move is not None:
+        _act_move.start()
+        _act_head.start()
+    tp = threading.Thread(target=_split_ep.serve, args=(_split_handlers(), _SHUTDOWN), name="split_pipe")
+    tp.daemon = True
+    tp.start()
+    try:
+        control_loop()
+    finally:
+        if _act_move is not None:
+            _act_head.stop()
+        try:
+            print("[INFO] flight record: %s" %
+                  _rec.dump_to_dir(getattr(config, "RECORDER_DIR", "."), "shutdown")["file"])
+        except Exception as e:
+            print("[WARN] flight record dump failed:", e)
+
+
+def _send_move(vx, vy, vw):
+    try:
+        _nao.call("ALMotion", "moveToward", vx, vy, vw)
+        return 0
+    except ProxyUnavailable:
+        return recorder.ERR_PROXY
+    except Exception:
+        return recorder.ERR_MOVE
+
+
+def _send_head(yaw, pitch, frac):
+    err = 0
+    # make sure head is stiff and send both joints in one call
+    try:
+        _nao.call("ALMotion", "setStiffnesses", ["HeadYaw", "HeadPitch"], 1.0)
+    except ProxyUnavailable:
+        return recorder.ERR_PROXY
+    except Exception:
+        err |= recorder.ERR_STIFF
+    try:
+        _nao.call("ALMotion", "setAngles", ["HeadYaw", "HeadPitch"], [yaw, pitch], frac)
+    except ProxyUnavailable:
+        return recorder.ERR_PROXY
+    except Exception:
+        err |= recorder.ERR_ANGLES
+    return err
+
+
+# Per-actuator latest-wins mailboxes, so one slow RPC never stretches the
+# tick or delays the other channel (None = RPCs inline in control_loop)
+if getattr(config, "ACTUATOR_WORKERS", True):
+    _act_move = ActuatorChannel("move", _send_move)
+    _act_head = ActuatorChannel("head", _send_head)
+else:
+    _act_move = _act_head = None
+
+
 def control_loop():
-    # use a sane default if LOOP_HZ missing/zero
-    hz = float(getattr(config, "LOOP_HZ", 50.0)) or 50.0
-    dt = 1.0 / hz
+    try:
+        _run_control_loop()
+    except Exception:
+        traceback.print_exc()
+        try:
+            print("[ERROR] control loop crashed, flight record: %s" %
+                  _rec.dump_to_dir(getattr(config, "RECORDER_DIR", "."), "crash")["file"])
+        except Exception:
+            pass
+        raise
+
+
+def _run_control_loop():
+    s = _settings
+    dt = s.dt
     last = time.time()
-    print("[INFO] control loop at %.1f Hz" % hz)
+    print("[INFO] control loop at %.1f Hz" % s.loop_hz)
 
     # ensure globals are writable
     global _head_yaw, _head_pitch
 
     while not _SHUTDOWN.is_set():
         t0 = time.time()
+        # settings swap only ever takes effect here, between two ticks
+        if _settings is not s:
+            s = _settings
+            dt = s.dt
+            _ctrl.configure(s.max_acc_vx, s.max_acc_vy, s.max_acc_vw, s.auto_zero_on_idle_s)
+            _stale.default_max_age_s = s.stale_max_age_s
+            print("[INFO] settings reloaded (control loop at %.1f Hz)" % s.loop_hz)
         dt_eff = t0 - last
         # guard against weird time jumps
         if dt_eff <= 0.0 or dt_eff > 0.5:
             dt_eff = dt
         last = t0
+        err = 0   # recorder.ERR_* flags for this tick
+
+        if _shm is not None:
+            try:
+                _poll_shm(t0)
+            except Exception:
+                pass
+        if _split_ep is not None:
+            try:
+                _poll_split()
+            except Exception:
+                pass
 
         # --- Locomotion (gated by deadman) ---
         try:
             vx, vy, vw = _ctrl.step(dt_eff)
-            if _deadman:
-                _motion.moveToward(vx, vy, vw)
+            if not _deadman:
+                vx, vy, vw = 0.0, 0.0, 0.0
+            if _act_move is not None:
+                _act_move.post(vx, vy, vw)
+                err |= _act_move.flags
             else:
-                _motion.moveToward(0.0, 0.0, 0.0)
+                err |= _send_move(vx, vy, vw)
         except Exception:
-            pass
+            err |= recorder.ERR_MOVE
 
         # --- Head control (NOT gated by deadman) ---
         try:
@@ -310,65 +803,117 @@ def control_loop():
                 pitch_n = max(-1.0, min(1.0, float(_head_cmd.get("pitch_n", 0.0))))
 
             # integrate normalized rates (rad/s) -> absolute target angles
-            _head_yaw   += yaw_n   * float(getattr(config, "HEAD_MAX_YAW_RATE",   1.5)) * dt_eff
-            _head_pitch += pitch_n * float(getattr(config, "HEAD_MAX_PITCH_RATE", 1.0)) * dt_eff
+            _head_yaw   += yaw_n   * s.head_yaw_rate   * dt_eff
+            _head_pitch += pitch_n * s.head_pitch_rate * dt_eff
 
             # clamp to mechanical limits
-            _head_yaw   = _clip(_head_yaw,   getattr(config, "HEAD_YAW_MIN",   -2.0857), getattr(config, "HEAD_YAW_MAX",   2.0857))
-            _head_pitch = _clip(_head_pitch, getattr(config, "HEAD_PITCH_MIN", -0.6720), getattr(config, "HEAD_PITCH_MAX", 0.5149))
-
-            # make sure head is stiff and send both joints in one call
-            try:
-                _motion.setStiffnesses(["HeadYaw", "HeadPitch"], 1.0)
-            except Exception:
-                pass
-
-            frac = float(getattr(config, "HEAD_FRACTION_SPEED", 0.3))
-            # fraction must be [0..1]
-            if frac < 0.0: frac = 0.0
-            if frac > 1.0: frac = 1.0
+            _head_yaw   = _clip(_head_yaw,   s.head_yaw_lim[0],   s.head_yaw_lim[1])
+            _head_pitch = _clip(_head_pitch, s.head_pitch_lim[0], s.head_pitch_lim[1])
 
-            _motion.setAngles(["HeadYaw", "HeadPitch"], [_head_yaw, _head_pitch], frac)
+            if _act_head is not None:
+                _act_head.post(_head_yaw, _head_pitch, s.head_frac)
+                err |= _act_head.flags
+            else:
+                err |= _send_head(_head_yaw, _head_pitch, s.head_frac)
         except Exception:
             # never crash the loop on head errors
-            pass
+            err |= recorder.ERR_ANGLES
 
         # --- pacing ---
         slept = time.time() - t0
+        _metrics.observe_loop("tick_s", slept)
+        _metrics.observe_loop("jitter_s", abs(dt_eff - dt))
+        tx, ty, tw, cx, cy, cw, until_ts, upd_ts = _ctrl.state_values()
+        _rec.record(t0, tx, ty, tw, cx, cy, cw, _head_yaw, _head_pitch,
+                    1.0 if _deadman else 0.0, slept, err)
+        if _split_ep is not None:
+            _split_ep.publish((tx, ty, tw, cx, cy, cw, until_ts, upd_ts), _head_yaw, _head_pitch, _rec.count, slept)
         wait = dt - slept
         if wait > 0.0:
             time.sleep(wait)
 
-    # On shutdown ensure a stop command goes out once
-    try:
-        _motion.moveToward(0.0, 0.0, 0.0)
-    except Exception:
-        pass
+    # On shutdown ensure a stop command goes out once; through the move
+    # worker, after its RPC in flight, so a queued command cannot overtake it
+    if _act_move is not None:
+        _act_move.stop(final=(0.0, 0.0, 0.0))
+    else:
+        _send_move(0.0, 0.0, 0.0)
 
 
 
 def main():
-    global _listener_sock
-    init_proxies()
-    try:
-        say("Interface prêt.")
-    except Exception:
-        pass
-
-    # Read current head angles as starting target
-    try:
-        ang = _motion.getAngles(["HeadYaw","HeadPitch"], True)
-        if isinstance(ang, list) and len(ang) == 2:
-            global _head_yaw, _head_pitch
-            _head_yaw, _head_pitch = float(ang[0]), float(ang[1])
-    except Exception:
-        pass
-
-
-    # Start control thread
-    th = threading.Thread(target=control_loop)
-    th.daemon = True
-    th.start()
+    global _listener_sock, _listen_s, _shm, _video, _link
+    th = None
+    if _SPLIT:
+        # start the control process before this one has any thread or NAOqi connection
+        cmd, st, pipe, child_pipe = split.make_channel()
+        _link = split.ControlLink(cmd, st, pipe)
+        _link.set_deadman(_deadman)
+        proc = multiprocessing.Process(target=_control_process, args=(cmd, st, child_pipe, pipe),
+                                       name="control_loop")
+        proc.daemon = True
+        proc.start()
+        child_pipe.close()  # so a dead child reads as EOF in _link.request
+        _link.proc = proc
+        print("[INFO] control loop in process %d" % proc.pid)
+        # per-process priority, which threads cannot have: client bursts yield to the ticks
+        nice = int(getattr(config, "SPLIT_NETWORK_NICE", 0))
+        if nice and hasattr(os, "nice"):
+            try: os.nice(nice)
+            except OSError: pass
+        else:
+            print("[WARN] SPLIT_NETWORK_NICE is 0: on a single core the split alone adds jitter")
+
+    # Proxies connect in the background; the socket is up right away and
+    # commands needing NAOqi fail fast until they are ready.
+    _nao.start(_SHUTDOWN)
+
+    shm_path = getattr(config, "LOCAL_SHM_PATH", None)
+    if shm_path and _link is None:
+        _shm = shm.ShmReader(shm_path)
+        print("[INFO] shared-memory input on %s" % shm_path)
+
+    if _link is None:
+        if _act_move is not None:
+            _act_move.start()
+            _act_head.start()
+
+        # Start control thread
+        th = threading.Thread(target=control_loop, name="control_loop")
+        th.daemon = True
+        th.start()
+
+    # ALMemory alerts: subscribe in the background (robot may still be booting)
+    if _events is not None:
+        for target, args, name in ((_events.run_pusher, (), "event_push"),
+                                   (_events.attach_loop, (ALBroker, ALModule, ALProxy, config.NAO_IP,
+                                                          config.NAO_PORT, _SHUTDOWN), "event_attach")):
+            te = threading.Thread(target=target, args=args, name=name)
+            te.daemon = True
+            te.start()
+
+    # Optional camera stream on its own port
+    video_sock = None
+    if getattr(config, "VIDEO_ENABLED", False):
+        _video = video.VideoHub(video.NaoqiSource(_nao, config.VIDEO_CAMERA, config.VIDEO_RESOLUTION,
+                                                  config.VIDEO_COLORSPACE, config.VIDEO_FPS),
+                                config.VIDEO_FPS, getattr(config, "VIDEO_POOL", 4),
+                                getattr(config, "VIDEO_SEND_TIMEOUT_S", 2.0))
+        video_sock = video.start(_video, config.HOST, config.VIDEO_PORT)
+        print("[INFO] camera stream on %s:%d" % (config.HOST, config.VIDEO_PORT))
+
+    # Optional periodic Prometheus text export
+    prom_path = getattr(config, "METRICS_PROM_FILE", None)
+    if prom_path:
+        # split mode: merge in the control process's loop / tick-path RPC histograms
+        extra = None
+        if _link is not None:
+            extra = lambda: _link.request("metrics", False)
+        tm = threading.Thread(target=prometheus_writer,
+                              args=(_metrics, prom_path,
+                                    getattr(config, "METRICS_PROM_INTERVAL_S", 10.0), _SHUTDOWN, extra))
+        tm.daemon = True
+        tm.start()
 
     # Start TCP server (timeout to poll shutdown)
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -377,7 +922,8 @@ def main():
     s.listen(5)
     s.settimeout(0.5)  # so we can check _SHUTDOWN regularly
     _listener_sock = s
-    print("[INFO] py26 NAO interface listening on %s:%d" % (config.HOST, config.PORT))
+    _listen_s = time.time() - _T_START
+    print("[INFO] py26 NAO interface listening on %s:%d (%.3fs after start)" % (config.HOST, config.PORT, _listen_s))
 
     try:
         while not _SHUTDOWN.is_set():
@@ -396,7 +942,7 @@ def main():
             except Exception:
                 pass
 
-            t = threading.Thread(target=handle_conn, args=(c, a))
+            t = threading.Thread(target=handle_conn, args=(c, a), name="client-%s:%s" % a[:2])
             t.daemon = True
             t.start()
             _client_threads.append(t)
@@ -405,6 +951,13 @@ def main():
         try: s.close()
         except Exception: pass
 
+        if _events is not None:
+            _events.stop()
+        if _video is not None:
+            _video.stop()
+            try: video_sock.close()
+            except Exception: pass
+
         # Close existing client sockets (nudges handlers to exit)
         with _clients_lock:
             for cli in list(_clients):
@@ -423,8 +976,20 @@ def main():
 
         # Ask control loop to stop and wait shortly
         _SHUTDOWN.set()
-        try: th.join(2.0)
-        except Exception: pass
+        if _link is not None:
+            _link.close()  # the control process stops the robot and dumps its record
+        else:
+            try: th.join(2.0)
+            except Exception: pass
+            if _act_move is not None:
+                _act_move.stop()
+                _act_head.stop()
+
+            try:
+                print("[INFO] flight record: %s" %
+                      _rec.dump_to_dir(getattr(config, "RECORDER_DIR", "."), "shutdown")["file"])
+            except Exception as e:
+                print("[WARN] flight record dump failed:", e)
 
         try: say("Au revoir.")
         except Exception: pass
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Validated, precomputed snapshot of the config values control_loop reads
+every tick. A snapshot is immutable once built; reload_config / set_config
+build a new one and swap the module-level reference, which control_loop
+picks up at its next tick.
+"""
+from __future__ import print_function
+import math
+
+
+class Settings(object):
+    __slots__ = ("loop_hz", "dt",
+                 "max_acc_vx", "max_acc_vy", "max_acc_vw", "auto_zero_on_idle_s",
+                 "head_yaw_rate", "head_pitch_rate",
+                 "head_yaw_lim", "head_pitch_lim", "head_frac",
+                 "stale_max_age_s")
+
+    # config name -> default, for every value taken into a snapshot
+    KEYS = {
+        "LOOP_HZ": 50.0,
+        "MAX_ACC_VX": 1.5, "MAX_ACC_VY": 1.5, "MAX_ACC_VW": 3.0,
+        "AUTO_ZERO_ON_IDLE_S": 2.0,
+        "HEAD_MAX_YAW_RATE": 1.5, "HEAD_MAX_PITCH_RATE": 1.0,
+        "HEAD_YAW_MIN": -2.0857, "HEAD_YAW_MAX": 2.0857,
+        "HEAD_PITCH_MIN": -0.6720, "HEAD_PITCH_MAX": 0.5149,
+        "HEAD_FRACTION_SPEED": 0.3,
+        "STALE_MAX_AGE_S": None,
+    }
+
+    # upper bounds: past these a value is a typo, not a tuning choice
+    MAX_LOOP_HZ = 500.0     # dt under 2 ms: the tick would just spin
+    MAX_ACC = 100.0         # norm/s^2; reaches full speed within ~10 ms
+    MAX_HEAD_RATE = 10.0    # rad/s, above the head joints' own limit
+
+    @classmethod
+    def from_config(cls, cfg, overrides=None):
+        """Build from a config module (plus optional {NAME: value}); raises ValueError."""
+        overrides = overrides or {}
+        for k in overrides:
+            if k not in cls.KEYS:
+                raise ValueError("unknown or non-reloadable setting: %s" % k)
+
+        def get(name):
+            if name in overrides:
+                return overrides[name]
+            return getattr(cfg, name, cls.KEYS[name])
+
+        def num(name, lo=None, hi=None):
+            try:
+                v = float(get(name))
+            except (TypeError, ValueError):
+                raise ValueError("%s must be a number" % name)
+            # float() takes "nan" / "inf"; neither means anything here
+            if math.isnan(v) or math.isinf(v):
+                raise ValueError("%s must be finite" % name)
+            if lo is not None and v < lo:
+                raise ValueError("%s must be >= %s" % (name, lo))
+            if hi is not None and v > hi:
+                raise ValueError("%s must be <= %s" % (name, hi))
+            return v
+
+        s = cls()
+        # use a sane default if LOOP_HZ missing/zero
+        s.loop_hz = num("LOOP_HZ", 0.0, cls.MAX_LOOP_HZ) or 50.0
+        s.dt = 1.0 / s.loop_hz
+        s.max_acc_vx = num("MAX_ACC_VX", 0.0, cls.MAX_ACC)
+        s.max_acc_vy = num("MAX_ACC_VY", 0.0, cls.MAX_ACC)
+        s.max_acc_vw = num("MAX_ACC_VW", 0.0, cls.MAX_ACC)
+        s.auto_zero_on_idle_s = num("AUTO_ZERO_ON_IDLE_S", 0.0)
+        s.head_yaw_rate = num("HEAD_MAX_YAW_RATE", 0.0, cls.MAX_HEAD_RATE)
+        s.head_pitch_rate = num("HEAD_MAX_PITCH_RATE", 0.0, cls.MAX_HEAD_RATE)
+        s.head_yaw_lim = (num("HEAD_YAW_MIN"), num("HEAD_YAW_MAX"))
+        s.head_pitch_lim = (num("HEAD_PITCH_MIN"), num("HEAD_PITCH_MAX"))
+        if s.head_yaw_lim[0] > s.head_yaw_lim[1] or s.head_pitch_lim[0] > s.head_pitch_lim[1]:
+            raise ValueError("head limits: MIN must be <= MAX")
+        # fraction must be [0..1]
+        frac = num("HEAD_FRACTION_SPEED")
+        s.head_frac = min(1.0, max(0.0, frac))
+        age = get("STALE_MAX_AGE_S")
+        s.stale_max_age_s = None if age is None else num("STALE_MAX_AGE_S", 0.0)
+        return s
+
+    def config_values(self):
+        """{config NAME: validated value}, what config.py should hold for this snapshot."""
+        return {
+            "LOOP_HZ": self.loop_hz,
+            "MAX_ACC_VX": self.max_acc_vx, "MAX_ACC_VY": self.max_acc_vy, "MAX_ACC_VW": self.max_acc_vw,
+            "AUTO_ZERO_ON_IDLE_S": self.auto_zero_on_idle_s,
+            "HEAD_MAX_YAW_RATE": self.head_yaw_rate, "HEAD_MAX_PITCH_RATE": self.head_pitch_rate,
+            "HEAD_YAW_MIN": self.head_yaw_lim[0], "HEAD_YAW_MAX": self.head_yaw_lim[1],
+            "HEAD_PITCH_MIN": self.head_pitch_lim[0], "HEAD_PITCH_MAX": self.head_pitch_lim[1],
+            "HEAD_FRACTION_SPEED": self.head_frac,
+            "STALE_MAX_AGE_S": self.stale_max_age_s,
+        }
+
+    def as_dict(self):
+        out = {}
+        for k in self.__slots__:
+            out[k] = getattr(self, k)
+        return out
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Same-host transport: a memory-mapped file shared with the Py3 controller
+(py3_control/shm.py writes it, keep both layouts in sync).
+
+  [0:64)    header   "<8sIIII": magic, version, ring_slots, slot_size, 0
+  [64:128)  latest   "<Q6d": seq, ts, vx_n, vy_n, vw_n, yaw_n, pitch_n
+  [128:192) ring head "<Q": number of commands ever written
+  [192:..)  ring     ring_slots x slot_size, each "<QIIddd": seq, code, 0, a, b, c
+
+'latest' is a seqlock: the writer makes seq odd, writes, then makes it even;
+a read is kept only if seq is even and unchanged across the read. Ring slot
+k (1-based) lives at (k % ring_slots) and is valid while its seq == k.
+control_loop polls both with struct.unpack_from on the map: no syscall and
+no JSON on the hot path.
+"""
+from __future__ import print_function
+import os
+import mmap
+import struct
+
+MAGIC = b"NAOSHM1\0"
+VERSION = 1
+RING_SLOTS = 64
+SLOT_SIZE = 48
+
+_HDR = struct.Struct("<8sIIII")
+_SEQ = struct.Struct("<Q")
+_LATEST = struct.Struct("<Q6d")
+_SLOT = struct.Struct("<QIIddd")
+OFF_LATEST = 64
+OFF_HEAD = 128
+OFF_RING = 192
+SIZE = OFF_RING + RING_SLOTS * SLOT_SIZE
+
+# ring command codes
+CMD_SET_DEADMAN = 1   # a = 0/1
+CMD_CENTER_HEAD = 2
+CMD_STOP = 3
+
+
+def open_map(path):
+    """Open (creating / initialising if needed) the shared file; returns the mmap."""
+    if not os.path.exists(path) or os.path.getsize(path) < SIZE:
+        f = open(path, "wb")
+        try:
+            f.write(b"\0" * SIZE)
+        finally:
+            f.close()
+    f = open(path, "r+b")
+    try:
+        mm = mmap.mmap(f.fileno(), SIZE)
+    finally:
+        f.close()
+    magic, version, slots, slot_size, _ = _HDR.unpack_from(mm, 0)
+    if magic != MAGIC:
+        mm[0:SIZE] = b"\0" * SIZE
+        _HDR.pack_into(mm, 0, MAGIC, VERSION, RING_SLOTS, SLOT_SIZE, 0)
+    elif version != VERSION or slots != RING_SLOTS or slot_size != SLOT_SIZE:
+        mm.close()
+        raise RuntimeError("shm layout mismatch in %s (v%d, %d x %d)" % (path, version, slots, slot_size))
+    return mm
+
+
+class ShmReader(object):
+    """Server side: latest-value slot + command ring consumer."""
+    def __init__(self, path):
+        self.path = path
+        self._mm = open_map(path)
+        self._last_seq = _SEQ.unpack_from(self._mm, OFF_LATEST)[0]
+        self._tail = _SEQ.unpack_from(self._mm, OFF_HEAD)[0]  # skip commands written before we started
+        self.frames = 0
+        self.torn = 0
+        self.cmds = 0
+        self.overruns = 0
+
+    def read_latest(self):
+        """(ts, vx, vy, vw, yaw_n, pitch_n) if a new frame was published, else None."""
+        mm = self._mm
+        v = _LATEST.unpack_from(mm, OFF_LATEST)
+        seq = v[0]
+        if seq == self._last_seq:
+            return None
+        if seq & 1 or _SEQ.unpack_from(mm, OFF_LATEST)[0] != seq:
+            self.torn += 1  # writer mid-update, take it next tick
+            return None
+        self._last_seq = seq
+        self.frames += 1
+        return v[1:]
+
+    def poll_commands(self):
+        """[(code, a, b, c)] written since the last poll, oldest first."""
+        mm = self._mm
+        head = _SEQ.unpack_from(mm, OFF_HEAD)[0]
+        if head == self._tail:
+            return []
+        if head - self._tail > RING_SLOTS:
+            self.overruns += head - self._tail - RING_SLOTS
+            self._tail = head - RING_SLOTS
+        out = []
+        k = self._tail + 1
+        while k <= head:
+            off = OFF_RING + (k % RING_SLOTS) * SLOT_SIZE
+            seq, code, _, a, b, c = _SLOT.unpack_from(mm, off)
+            if seq == k and _SEQ.unpack_from(mm, off)[0] == k:
+                out.append((code, a, b, c))
+            else:
+                self.overruns += 1
+            k += 1
+        self._tail = head
+        self.cmds += len(out)
+        return out
+
+    def stats(self):
+        return {"path": self.path, "frames": self.frames, "torn": self.torn,
+                "cmds": self.cmds, "overruns": self.overruns}
+
+    def close(self):
+        try: self._mm.close()
+        except Exception: pass
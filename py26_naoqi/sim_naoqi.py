@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Simulated NAOqi for running server.py without a robot (SIMULATE_NAOQI or
+'--sim'): ALProxy-compatible objects whose RPCs sleep for a configurable,
+jittered latency and keep just enough state to answer getters.
+"""
+from __future__ import print_function
+import time
+import random
+import threading
+
+try:
+    import config
+except Exception:
+    config = None
+
+
+def _latency():
+    base = float(getattr(config, "SIM_RPC_LATENCY_S", 0.002))
+    jit = float(getattr(config, "SIM_RPC_JITTER_S", 0.001))
+    d = base + random.uniform(0.0, jit)
+    if d > 0.0:
+        time.sleep(d)
+
+
+class _Post(object):
+    # proxy.post.method(...) -> run in a thread, return a fake task id
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._ids = 0
+
+    def __getattr__(self, name):
+        fn = getattr(self._proxy, name)
+        def call(*args):
+            th = threading.Thread(target=fn, args=args)
+            th.daemon = True
+            th.start()
+            self._ids += 1
+            return self._ids
+        return call
+
+
+class _SimModule(object):
+    def __init__(self):
+        self.post = _Post(self)
+
+    def ping(self):
+        return True
+
+
+class SimMotion(_SimModule):
+    def __init__(self):
+        _SimModule.__init__(self)
+        self._lock = threading.Lock()
+        self._angles = {"HeadYaw": 0.0, "HeadPitch": 0.0}
+        self._stiff = {}
+        self.velocity = (0.0, 0.0, 0.0)
+
+    def moveToward(self, vx, vy, vw):
+        _latency()
+        self.velocity = (float(vx), float(vy), float(vw))
+
+    def stopMove(self):
+        _latency()
+        self.velocity = (0.0, 0.0, 0.0)
+
+    def setStiffnesses(self, names, value):
+        _latency()
+        if not isinstance(names, list):
+            names = [names]
+        with self._lock:
+            for n in names:
+                self._stiff[n] = float(value)
+
+    def setAngles(self, names, angles, frac):
+        _latency()
+        if not isinstance(names, list):
+            names, angles = [names], [angles]
+        with self._lock:
+            for n, a in zip(names, angles):
+                self._angles[n] = float(a)
+
+    def getAngles(self, names, use_sensors):
+        _latency()
+        if not isinstance(names, list):
+            names = [names]
+        with self._lock:
+            return [self._angles.get(n, 0.0) for n in names]
+
+
+class SimPosture(_SimModule):
+    def __init__(self):
+        _SimModule.__init__(self)
+        self.posture = "Crouch"
+
+    def goToPosture(self, name, speed):
+        # a real posture change takes seconds; scale it down but keep it slow
+        time.sleep(float(getattr(config, "SIM_POSTURE_S", 0.5)))
+        self.posture = name
+        return True
+
+    def getPosture(self):
+        _latency()
+        return self.posture
+
+
+class SimTTS(_SimModule):
+    def say(self, txt):
+        time.sleep(0.05 + 0.02 * len(txt))
+        print("[SIM] say: %s" % (txt,))
+
+
+class SimVideo(_SimModule):
+    """Synthetic camera: a scrolling RGB gradient at the subscribed resolution."""
+    _SIZES = {0: (160, 120), 1: (320, 240), 2: (640, 480), 3: (1280, 960), 7: (80, 60), 8: (40, 30)}
+
+    def __init__(self):
+        _SimModule.__init__(self)
+        self._subs = {}
+        self._n = 0
+
+    def subscribeCamera(self, name, camera, resolution, colorspace, fps):
+        _latency()
+        w, h = self._SIZES.get(int(resolution), (320, 240))
+        row = bytearray(3 * w)
+        for x in range(w):
+            row[3 * x] = x * 255 // max(1, w - 1)
+        img = bytearray()
+        for y in range(h):
+            row[1::3] = bytearray([y * 255 // max(1, h - 1)]) * w
+            row[2::3] = bytearray([(x * y) & 0xFF for x in range(w)])
+            img += row
+        handle = "%s_%d" % (name, len(self._subs))
+        self._subs[handle] = (w, h, bytes(img), int(camera))
+        return handle
+
+    def subscribe(self, name, resolution, colorspace, fps):
+        return self.subscribeCamera(name, 0, resolution, colorspace, fps)
+
+    def unsubscribe(self, handle):
+        return self._subs.pop(handle, None) is not None
+
+    def getImageRemote(self, handle):
+        _latency()
+        w, h, img, cam = self._subs[handle]
+        self._n += 1
+        off = (self._n * 3 * w) % len(img)  # scroll one row per frame
+        now = time.time()
+        return [w, h, 3, 11, int(now), int((now % 1.0) * 1e6), img[off:] + img[:off], cam]
+
+    def releaseImage(self, handle):
+        return True
+
+
+class SimMemory(_SimModule):
+    """Stand-in event source: raiseEvent() calls subscribers like ALMemory does."""
+    def __init__(self):
+        _SimModule.__init__(self)
+        self._lock = threading.Lock()
+        self._data = {}
+        self._subs = {}  # event -> {module: method}
+
+    def subscribeToEvent(self, event, module, method):
+        _latency()
+        with self._lock:
+            self._subs.setdefault(event, {})[module] = method
+
+    def unsubscribeToEvent(self, event, module):
+        with self._lock:
+            self._subs.get(event, {}).pop(module, None)
+
+    def getData(self, key):
+        _latency()
+        return self._data.get(key)
+
+    def raiseEvent(self, event, value):
+        with self._lock:
+            self._data[event] = value
+            subs = list(self._subs.get(event, {}).items())
+        for module, method in subs:
+            mod = _registered.get(module)
+            if mod is not None:
+                th = threading.Thread(target=getattr(mod, method), args=(event, value, module))
+                th.daemon = True
+                th.start()
+
+
+_registered = {}
+
+
+class ALBroker(object):
+    def __init__(self, name, ip, port, parent_ip, parent_port):
+        self.name = name
+
+    def shutdown(self):
+        pass
+
+
+class ALModule(object):
+    def __init__(self, name):
+        self.name = name
+        _registered[name] = self
+
+
+_MODULES = {
+    "ALMotion": SimMotion,
+    "ALRobotPosture": SimPosture,
+    "ALTextToSpeech": SimTTS,
+    "ALVideoDevice": SimVideo,
+    "ALMemory": SimMemory,
+}
+_instances = {}
+_inst_lock = threading.Lock()
+
+
+def ALProxy(name, ip=None, port=None):
+    """One shared simulated module per name, like the real NAOqi broker."""
+    with _inst_lock:
+        m = _instances.get(name)
+        if m is None:
+            cls = _MODULES.get(name)
+            if cls is None:
+                raise RuntimeError("ALProxy::ALProxy: module %s not found (simulated)" % name)
+            m = cls()
+            _instances[name] = m
+        return m
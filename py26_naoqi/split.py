@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Two-process server (PROCESS_SPLIT or 'server.py --split'): the parent keeps
+the sockets, JSON parsing and one-off NAOqi commands; a child process runs
+control_loop with its own proxies and actuator workers, under its own GIL,
+so a burst of client traffic cannot delay a tick.
+
+Per tick state crosses as two fixed RawArray('d') blocks, each a seqlock
+like shm.py's 'latest' slot (seq odd while writing):
+  command (parent -> child)  targets, head rates, deadman, event counters
+  status  (child -> parent)  _ctrl.state_values(), head angles, tick stats
+Rare requests (metrics, settings, dump_recorder, shutdown) go over a Pipe.
+"""
+from __future__ import print_function
+import time
+import threading
+import multiprocessing
+
+# command block
+# *_N fields count events; the child applies a value only when its counter
+# moved, so it cannot undo a newer change from another source (shm ring)
+C_SEQ, C_TGT_N, C_VX, C_VY, C_VW, C_DUR, C_SENT_TS, C_YAW_N, C_PITCH_N, \
+    C_DEADMAN, C_CENTER_N, C_STOP_N, C_HOLD_S, C_DEADMAN_N, C_HEAD_N = range(15)
+C_SIZE = 15
+
+# status block
+S_SEQ, S_TGT_X, S_TGT_Y, S_TGT_W, S_CUR_X, S_CUR_Y, S_CUR_W, S_UNTIL, S_LAST_UPD, \
+    S_HEAD_YAW, S_HEAD_PITCH, S_TICKS, S_TICK_S = range(13)
+S_SIZE = 13
+
+
+def _read(arr, size, retries=100):
+    # seqlock read; None if the writer kept it busy for all retries
+    for _ in range(retries):
+        seq = arr[0]
+        if int(seq) & 1:
+            continue
+        vals = arr[0:size]
+        if arr[0] == seq:
+            return vals
+    return None
+
+
+def _clip(x, lo, hi):
+    if x < lo: return lo
+    if x > hi: return hi
+    return x
+
+
+def make_channel():
+    """(command block, status block, parent pipe end, child pipe end)"""
+    cmd = multiprocessing.RawArray('d', C_SIZE)
+    st = multiprocessing.RawArray('d', S_SIZE)
+    parent_end, child_end = multiprocessing.Pipe()
+    return cmd, st, parent_end, child_end
+
+
+class ControlLink(object):
+    """Parent side: writes the command block, reads status, forwards rare requests."""
+    def __init__(self, cmd, st, pipe, proc=None):
+        self._cmd = cmd
+        self._st = st
+        self._pipe = pipe
+        self.proc = proc
+        self._wlock = threading.Lock()   # client threads share the command block
+        self._plock = threading.Lock()   # one pipe request at a time
+        self._status = [0.0] * S_SIZE
+        self._req_n = 0
+
+    def _write(self, pairs, bump=None):
+        # bump: index of an event counter to increment in the same write
+        c = self._cmd
+        with self._wlock:
+            c[C_SEQ] += 1                # odd: write in progress
+            for i, v in pairs:
+                c[i] = v
+            if bump is not None:
+                c[bump] += 1
+            c[C_SEQ] += 1
+
+    def set_target(self, vx, vy, vw, duration_s=None, sent_ts=None):
+        """Returns state_values() as they will be once the child applies it."""
+        now = time.time()
+        vx, vy, vw = _clip(vx, -1.0, 1.0), _clip(vy, -1.0, 1.0), _clip(vw, -1.0, 1.0)
+        dur = float(duration_s) if duration_s is not None and duration_s > 0.0 else 0.0
+        self._write(((C_VX, vx), (C_VY, vy), (C_VW, vw), (C_DUR, dur),
+                     (C_SENT_TS, 0.0 if sent_ts is None else float(sent_ts))), bump=C_TGT_N)
+        s = self.status()
+        until = 0.0
+        if dur:
+            until = (now if sent_ts is None else min(now, float(sent_ts))) + dur
+        return (vx, vy, vw, s[S_CUR_X], s[S_CUR_Y], s[S_CUR_W], until, now)
+
+    def set_head(self, yaw_n, pitch_n):
+        self._write(((C_YAW_N, yaw_n), (C_PITCH_N, pitch_n)), bump=C_HEAD_N)
+
+    def set_deadman(self, enabled):
+        self._write(((C_DEADMAN, 1.0 if enabled else 0.0),), bump=C_DEADMAN_N)
+
+    def center_head(self):
+        self._write((), bump=C_CENTER_N)
+
+    def stop(self, hold_s=0.0):
+        # hold_s: the child ignores targets for that long (see MovingTargetController.stop)
+        self._write(((C_HOLD_S, float(hold_s)),), bump=C_STOP_N)
+
+    def status(self):
+        v = _read(self._st, S_SIZE)
+        if v is not None:
+            self._status = v
+        return self._status
+
+    def request(self, op, *args, **kw):
+        """
+        Pipe round trip to the control process; raises RuntimeError on its
+        errors, if it is gone, or after timeout_s (a late answer is skipped
+        by the next request).
+        """
+        timeout_s = float(kw.get("timeout_s", 5.0))
+        with self._plock:
+            if self.proc is not None and not self.proc.is_alive():
+                raise RuntimeError("%s: control process not running" % op)
+            self._req_n += 1
+            n = self._req_n
+            self._pipe.send((n, op) + args)
+            t_end = time.time() + timeout_s
+            while True:
+                if not self._pipe.poll(0.1):
+                    if self.proc is not None and not self.proc.is_alive():
+                        raise RuntimeError("%s: control process died" % op)
+                    if time.time() > t_end:
+                        raise RuntimeError("%s: no answer from control process" % op)
+                    continue
+                try:
+                    rn, ok, val = self._pipe.recv()
+                except (EOFError, IOError):
+                    raise RuntimeError("%s: control process closed the pipe" % op)
+                if rn == n:
+                    break
+        if not ok:
+            raise RuntimeError(val)
+        return val
+
+    def close(self, timeout=3.0):
+        try:
+            with self._plock:
+                self._pipe.send((0, "shutdown"))
+        except Exception:
+            pass
+        if self.proc is not None:
+            self.proc.join(timeout)
+            if self.proc.is_alive():
+                self.proc.terminate()
+
+
+class ControlEndpoint(object):
+    """Child side: polled by control_loop once per tick."""
+    def __init__(self, cmd, st, pipe):
+        self._cmd = cmd
+        self._st = st
+        self._pipe = pipe
+        self._last = None
+        self.torn = 0
+
+    def poll(self):
+        """(command block values, previous values) if anything changed, else None."""
+        v = _read(self._cmd, C_SIZE, retries=3)
+        if v is None:
+            self.torn += 1   # parent mid-write, take it next tick
+            return None
+        if self._last is not None and v[C_SEQ] == self._last[C_SEQ]:
+            return None
+        prev = self._last or [0.0] * C_SIZE
+        self._last = v
+        return v, prev
+
+    def publish(self, state_values, head_yaw, head_pitch, ticks, tick_s):
+        s = self._st
+        s[S_SEQ] += 1
+        s[S_TGT_X:S_LAST_UPD + 1] = list(state_values)
+        s[S_HEAD_YAW] = head_yaw
+        s[S_HEAD_PITCH] = head_pitch
+        s[S_TICKS] = ticks
+        s[S_TICK_S] = tick_s
+        s[S_SEQ] += 1
+
+    def serve(self, handlers, stop_evt):
+        """Answers pipe requests with handlers[op](*args) until shutdown or EOF."""
+        while not stop_evt.is_set():
+            try:
+                msg = self._pipe.recv()
+            except (EOFError, IOError):
+                break  # parent gone
+            n, op = msg[0], msg[1]
+            if op == "shutdown":
+                break
+            try:
+                rep = (n, True, handlers[op](*msg[2:]))
+            except Exception as e:
+                rep = (n, False, "%s: %s" % (op, e))
+            try:
+                self._pipe.send(rep)
+            except (EOFError, IOError):
+                break
+        stop_evt.set()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actuators import ActuatorChannel
+
+
+class _Rpc(object):
+    """Records calls; each call blocks until released (a slow NAOqi)."""
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Semaphore(0)
+        self.started = threading.Semaphore(0)
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        self.started.release()
+        self.gate.acquire()
+        if args and args[0] == "boom":
+            raise RuntimeError("proxy reconnecting")
+        return 0
+
+
+class ActuatorChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.rpc = _Rpc()
+        self.ch = ActuatorChannel("move", self.rpc)
+        self.ch.start()
+
+    def tearDown(self):
+        for _ in range(10):
+            self.rpc.gate.release()
+        self.ch.stop(timeout=2.0)
+
+    def test_latest_wins_while_busy(self):
+        self.ch.post(1)
+        self.rpc.started.acquire()      # worker is inside the first call
+        for i in (2, 3, 4):
+            self.ch.post(i)
+        self.rpc.gate.release()
+        self.rpc.started.acquire()
+        self.rpc.gate.release()
+        self.assertEqual(self.rpc.calls, [(1,), (4,)])
+        self.assertEqual(self.ch.superseded, 2)
+
+    def test_worker_survives_exceptions(self):
+        self.ch.post("boom")
+        self.rpc.started.acquire()
+        self.rpc.gate.release()
+        self.ch.post("ok")
+        self.rpc.started.acquire()
+        self.rpc.gate.release()
+        t_end = time.time() + 2.0
+        while self.ch.sent < 2 and time.time() < t_end:
+            time.sleep(0.005)
+        st = self.ch.stats()
+        self.assertEqual(st["errors"], 1)
+        self.assertEqual(st["sent"], 2)
+        self.assertTrue("reconnecting" in st["last_error"])
+        self.assertEqual(self.rpc.calls, [("boom",), ("ok",)])
+
+    def test_final_command_sent_after_call_in_flight(self):
+        self.ch.post("move")
+        self.rpc.started.acquire()
+        self.ch.post("queued")
+        # stop returns before the slow RPC finishes; the final one still goes out after it
+        self.ch.stop(final=("stop",), timeout=0.01)
+        self.ch.stop()                  # a second plain stop must not drop the final command
+        self.rpc.gate.release()
+        self.rpc.started.acquire()
+        self.rpc.gate.release()
+        self.ch._thread.join(2.0)
+        self.assertFalse(self.ch._thread.is_alive())
+        self.assertEqual(self.rpc.calls, [("move",), ("stop",)])
+
+    def test_plain_stop_drops_pending(self):
+        self.ch.post("move")
+        self.rpc.started.acquire()
+        self.ch.post("queued")
+        self.ch.stop(timeout=0.01)
+        self.rpc.gate.release()
+        self.ch._thread.join(2.0)
+        self.assertEqual(self.rpc.calls, [("move",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
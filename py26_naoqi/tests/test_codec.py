@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+from codec import FixedReply
+from motion import MovingTargetController
+
+# same layout as server.py's _REP_TARGET
+TARGET = FixedReply('{"target":{"vx_n":%s,"vy_n":%s,"vw_n":%s},'
+                    '"current":{"vx_n":%s,"vy_n":%s,"vw_n":%s},'
+                    '"until_ts":%s,"last_update_ts":%s}')
+
+
+class FixedReplyTest(unittest.TestCase):
+    def test_matches_state_dict(self):
+        ctrl = MovingTargetController(1.5, 1.5, 3.0, 2.0)
+        ctrl.set_target(0.4321, -0.1234, 0.1, duration_s=0.5, sent_ts=1700000000.123456)
+        ctrl.step(0.02)
+        line = TARGET.encode(7, *ctrl.state_values())
+        self.assertEqual(json.loads(line), {"ok": True, "rid": 7, "data": ctrl.state()})
+
+    def test_floats_round_trip(self):
+        r = FixedReply('{"a":%s,"b":%s}')
+        for v in (0.1, -1e-9, 1700000000.123456, 1.0 / 3.0):
+            self.assertEqual(json.loads(r.encode(1, v, 0.0))["data"]["a"], v)
+
+    def test_bools_ints_none(self):
+        r = FixedReply('{"enabled":%s,"n":%s,"x":%s}')
+        self.assertEqual(json.loads(r.encode(1, True, 3, None))["data"],
+                         {"enabled": True, "n": 3, "x": None})
+        self.assertEqual(json.loads(r.encode(1, False, 0, None))["data"]["enabled"], False)
+
+    def test_rid_kinds(self):
+        r = FixedReply('{"enabled":%s}')
+        for rid in (None, 0, 123456789012, "abc", 'q"uo\\te', 1.5):
+            self.assertEqual(json.loads(r.encode(rid, True))["rid"], rid)
+
+    def test_non_finite_is_null(self):
+        r = FixedReply('{"a":%s,"b":%s,"c":%s}')
+        line = r.encode(1, float("nan"), float("inf"), float("-inf"))
+        self.assertEqual(json.loads(line)["data"], {"a": None, "b": None, "c": None})
+
+
+class DumpsTest(unittest.TestCase):
+    def test_compact(self):
+        self.assertEqual(codec.loads(codec.dumps({"a": [1, 2.5, "x"]})), {"a": [1, 2.5, "x"]})
+        self.assertFalse(" " in codec.dumps({"a": 1, "b": [1, 2]}))
+
+    def test_non_finite_is_null(self):
+        out = codec.dumps({"a": float("nan"), "b": [1.0, float("inf")], "c": {"d": float("-inf")}})
+        self.assertEqual(json.loads(out), {"a": None, "b": [1.0, None], "c": {"d": None}})
+        self.assertFalse("NaN" in out or "Infinity" in out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events import EventHub, Subscriber
+from motion import MovingTargetController
+
+EVENTS = {"robotHasFallen": "fall", "BatteryChargeChanged": "battery"}
+
+
+class EventHubTest(unittest.TestCase):
+    def test_reaction_runs_before_push(self):
+        seen = []
+        hub = EventHub(EVENTS, on_event=lambda k, kind, v: seen.append((k, kind, v)))
+        hub.fire("robotHasFallen", 1)
+        self.assertEqual(seen, [("robotHasFallen", "fall", 1)])
+        self.assertEqual(len(hub._pending), 1)
+
+    def test_repeats_coalesced(self):
+        hub = EventHub(EVENTS, coalesce_s=10.0)
+        for _ in range(3):
+            hub.fire("BatteryChargeChanged", 50)
+        hub.fire("BatteryChargeChanged", 49)  # new value: a frame of its own
+        # the first frame, still waiting, is replaced by the newer one
+        self.assertEqual(len(hub._pending), 1)
+        f = hub._pending[0]
+        self.assertEqual((f["value"], f["kind"]), (49, "battery"))
+        self.assertEqual(f["repeats"], 3)
+        st = hub.stats()
+        self.assertEqual((st["received"], st["coalesced"]), (4, 3))
+
+    def test_pusher_delivers_then_stops(self):
+        got = []
+        hub = EventHub(EVENTS, coalesce_s=0.0, push=got.append)
+        th = threading.Thread(target=hub.run_pusher)
+        th.daemon = True
+        th.start()
+        hub.fire("robotHasFallen", 1)
+        hub.fire("BatteryChargeChanged", 20)
+        t_end = time.time() + 2.0
+        while len(got) < 2 and time.time() < t_end:
+            time.sleep(0.01)
+        self.assertEqual([f["event"] for f in got], ["robotHasFallen", "BatteryChargeChanged"])
+        hub.stop()
+        th.join(2.0)
+        self.assertFalse(th.is_alive())
+
+    def test_failing_reaction_still_pushes(self):
+        def boom(k, kind, v):
+            raise RuntimeError("no motion proxy")
+        hub = EventHub(EVENTS, on_event=boom)
+        hub.fire("robotHasFallen", 1)
+        self.assertEqual(len(hub._pending), 1)
+
+
+class SubscriberTest(unittest.TestCase):
+    def test_stalled_subscriber_refused_others_unaffected(self):
+        gate = threading.Event()
+        fast = []
+        slow = Subscriber(lambda f: gate.wait(), max_pending=3)
+        quick = Subscriber(fast.append, max_pending=3)
+        accepted = []
+        for i in range(10):
+            accepted.append(slow.offer(i))
+            quick.offer(i)
+            time.sleep(0.005)
+        gate.set()
+        # one frame in the blocked send, three queued, then refused for good
+        self.assertEqual(accepted, [True] * 4 + [False] * 6)
+        t_end = time.time() + 2.0
+        while len(fast) < 10 and time.time() < t_end:
+            time.sleep(0.01)
+        self.assertEqual(fast, list(range(10)))
+        quick.close()
+
+    def test_send_error_closes(self):
+        def broken(f):
+            raise IOError("reset by peer")
+        sub = Subscriber(broken)
+        self.assertTrue(sub.offer(1))
+        t_end = time.time() + 2.0
+        while sub.offer(2) and time.time() < t_end:
+            time.sleep(0.01)
+        self.assertFalse(sub.offer(3))
+
+
+class FallHoldTest(unittest.TestCase):
+    def test_targets_ignored_during_hold(self):
+        c = MovingTargetController(1.5, 1.5, 3.0, 0.0)
+        c.set_target(0.5, 0.0, 0.0)
+        c.stop(hold_s=0.1)
+        self.assertEqual(c.state_values()[:3], (0.0, 0.0, 0.0))
+        self.assertFalse(c.set_target(0.8, 0.0, 0.0))
+        self.assertEqual(c.state_values()[0], 0.0)
+        time.sleep(0.12)
+        self.assertTrue(c.set_target(0.8, 0.0, 0.0))
+        self.assertEqual(c.state_values()[0], 0.8)
+
+    def test_plain_stop_keeps_hold(self):
+        # e.g. a client's stop over shm right after a fall
+        c = MovingTargetController(1.5, 1.5, 3.0, 0.0)
+        c.stop(hold_s=10.0)
+        c.stop()
+        c.stop(hold_s=0.01)
+        self.assertFalse(c.set_target(0.3, 0.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# Run from py26_naoqi/:  python -m unittest discover -s tests
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import LatencyHistogram, Metrics, merge_snapshots
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def test_bucket_edges(self):
+        h = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+        for dt in (0.0005, 0.001, 0.002, 0.05, 0.5):
+            h.observe(dt)
+        # an observation equal to an upper bound falls in that bucket; beyond the last is +Inf
+        self.assertEqual(h.counts, [2, 1, 1, 1])
+        self.assertEqual(h.count, 5)
+        self.assertAlmostEqual(h.total, 0.5535)
+        self.assertEqual(h.max, 0.5)
+
+    def test_quantile(self):
+        h = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+        self.assertEqual(h.quantile(0.5), None)
+        for _ in range(98):
+            h.observe(0.0005)
+        h.observe(0.05)
+        h.observe(0.7)
+        self.assertEqual(h.quantile(0.5), 0.001)
+        self.assertEqual(h.quantile(0.99), 0.1)
+        self.assertEqual(h.quantile(1.0), 0.7)  # +Inf bucket reports the max seen
+
+    def test_snapshot(self):
+        h = LatencyHistogram(buckets=(0.001, 0.01))
+        h.observe(0.002)
+        h.observe(0.004)
+        s = h.snapshot()
+        self.assertEqual(s["count"], 2)
+        self.assertAlmostEqual(s["mean_s"], 0.003)
+        self.assertEqual(s["buckets"], [0.001, 0.01])
+        self.assertEqual(s["counts"], [0, 2, 0])
+        self.assertEqual((s["p50_s"], s["p99_s"]), (0.01, 0.01))
+
+    def test_snapshot_quantiles_match_its_counts(self):
+        # observe() keeps running while snapshots are taken
+        h = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+        stop = threading.Event()
+
+        def load():
+            i = 0
+            while not stop.is_set():
+                h.observe((0.0005, 0.005, 0.05, 0.5)[i % 4])
+                i += 1
+        th = threading.Thread(target=load)
+        th.daemon = True
+        th.start()
+        try:
+            for _ in range(2000):
+                s = h.snapshot()
+                self.assertEqual(sum(s["counts"]), s["count"])
+                check = LatencyHistogram(buckets=s["buckets"])
+                check.counts, check.count, check.max = s["counts"], s["count"], s["max_s"]
+                self.assertEqual((s["p50_s"], s["p99_s"]), (check.quantile(0.5), check.quantile(0.99)))
+        finally:
+            stop.set()
+            th.join(2.0)
+
+
+class MetricsTest(unittest.TestCase):
+    def test_unknown_commands_share_one_entry(self):
+        m = Metrics(commands=("ping", "set_target"))
+        m.observe_cmd("ping", 0.001)
+        for name in ("nope", "x" * 1000, None, [1, 2]):
+            m.observe_cmd(name, 0.001)
+            m.observe_oneway(name, 0.001)
+        self.assertEqual(sorted(m.cmd), ["ping", "unknown"])
+        self.assertEqual(m.cmd["unknown"].count, 4)
+        self.assertEqual(sorted(m.oneway), ["unknown"])
+
+    def test_without_command_list_keeps_names(self):
+        m = Metrics()
+        m.observe_cmd("anything", 0.001)
+        self.assertEqual(sorted(m.cmd), ["anything"])
+
+    def test_rpc_errors_counted(self):
+        m = Metrics()
+
+        def boom():
+            raise IOError("down")
+        self.assertRaises(IOError, m.call, "moveToward", boom)
+        self.assertEqual(m.call("getAngles", lambda: 3), 3)
+        snap = m.snapshot()
+        self.assertEqual(snap["rpc"]["moveToward"]["errors"], 1)
+        self.assertEqual(snap["rpc"]["moveToward"]["count"], 1)
+        self.assertEqual(snap["rpc"]["getAngles"]["errors"], 0)
+
+    def test_prometheus_cumulative_buckets(self):
+        m = Metrics(buckets=(0.001, 0.01))
+        m.observe_rpc("moveToward", 0.0005)
+        m.observe_rpc("moveToward", 0.005)
+        m.observe_rpc("moveToward", 0.5)
+        text = m.prometheus_text()
+        self.assertTrue('nao_rpc_latency_seconds_bucket{method="moveToward",le="0.001"} 1' in text)
+        self.assertTrue('nao_rpc_latency_seconds_bucket{method="moveToward",le="0.01"} 2' in text)
+        self.assertTrue('nao_rpc_latency_seconds_bucket{method="moveToward",le="+Inf"} 3' in text)
+        self.assertTrue('nao_rpc_latency_seconds_count{method="moveToward"} 3' in text)
+
+    def test_prometheus_label_escaping(self):
+        m = Metrics()
+        m.observe_rpc('a"b\\c\nd', 0.001)
+        m.conn_open(1, ('evil"host', 1))
+        text = m.prometheus_text()
+        self.assertTrue('method="a\\"b\\\\c\\nd"' in text)
+        self.assertTrue('peer="evil\\"host:1"' in text)
+        for line in text.splitlines():
+            if "{" in line:
+                self.assertEqual(len(line.split("} ")), 2, line)
+
+    def test_conn_counters_consistent_in_snapshots(self):
+        m = Metrics()
+        m.conn_open(1, ("127.0.0.1", 4000))
+        stop = threading.Event()
+
+        def client():
+            while not stop.is_set():
+                m.conn_update(1, msgs=1, bytes_in=10, bytes_out=20)
+        th = threading.Thread(target=client)
+        th.daemon = True
+        th.start()
+        try:
+            for _ in range(2000):
+                c = m.snapshot()["connections"][0]
+                self.assertEqual((c["bytes_in"], c["bytes_out"]), (10 * c["msgs"], 20 * c["msgs"]))
+        finally:
+            stop.set()
+            th.join(2.0)
+        m.conn_close(1)
+        m.conn_update(1, msgs=1)     # late update after close: ignored
+        self.assertEqual(m.snapshot()["connections"], [])
+
+    def test_merge_snapshots(self):
+        a = Metrics(buckets=(0.001, 0.01))
+        b = Metrics(buckets=(0.001, 0.01))
+        a.observe_rpc("setAngles", 0.0005)
+        b.observe_rpc("setAngles", 0.005)
+        b.observe_loop("tick_s", 0.002)
+        merged = merge_snapshots(a.snapshot(), b.snapshot())
+        h = merged["rpc"]["setAngles"]
+        self.assertEqual(h["counts"], [1, 1, 0])
+        self.assertEqual(h["count"], 2)
+        self.assertAlmostEqual(h["sum_s"], 0.0055)
+        self.assertEqual(merged["loop"]["tick_s"]["count"], 1)
+        text = a.prometheus_text(extra=b.snapshot())
+        self.assertTrue('nao_loop_latency_seconds_count{phase="tick_s"} 1' in text)
+
+
+if __name__ == "__main__":
+    unittest.main()
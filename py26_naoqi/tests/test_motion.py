@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motion import StaleFilter
+
+
+class StaleFilterTest(unittest.TestCase):
+    def test_unstamped_frames_always_pass(self):
+        f = StaleFilter(default_max_age_s=0.1)
+        for _ in range(3):
+            self.assertEqual(f.check("set_target", 1), None)
+
+    def test_seq_must_increase_per_connection(self):
+        f = StaleFilter()
+        self.assertEqual(f.check("set_target", 1, seq=5), None)
+        self.assertEqual(f.check("set_target", 1, seq=5), "out_of_order")
+        self.assertEqual(f.check("set_target", 1, seq=4), "out_of_order")
+        self.assertEqual(f.check("set_target", 1, seq=6), None)
+        # other connection, other stream: own counters
+        self.assertEqual(f.check("set_target", 2, seq=1), None)
+        self.assertEqual(f.check("set_head", 1, seq=1), None)
+
+    def test_older_ts_superseded(self):
+        f = StaleFilter()
+        self.assertEqual(f.check("set_target", 1, ts=100.0, now=100.0), None)
+        self.assertEqual(f.check("set_target", 1, ts=99.9, now=100.0), "superseded")
+        self.assertEqual(f.check("set_head", 1, ts=99.9, now=100.0), None)
+
+    def test_ts_tracked_per_connection(self):
+        # clients with different clock offsets must not starve each other
+        f = StaleFilter()
+        self.assertEqual(f.check("set_target", 1, ts=100.0, now=100.0), None)
+        self.assertEqual(f.check("set_target", 2, ts=50.0, now=100.0), None)
+        self.assertEqual(f.check("set_target", 2, ts=50.1, now=100.0), None)
+        self.assertEqual(f.check("set_target", 1, ts=100.1, now=100.0), None)
+
+    def test_forget_resets_connection(self):
+        f = StaleFilter()
+        f.check("set_target", 1, seq=10, ts=100.0, now=100.0)
+        f.forget(1)
+        # reconnected with a restarted counter and a new clock offset
+        self.assertEqual(f.check("set_target", 1, seq=1, ts=20.0, now=100.0), None)
+
+    def test_expired(self):
+        f = StaleFilter(default_max_age_s=0.2)
+        self.assertEqual(f.check("set_target", 1, ts=99.5, now=100.0), "expired")
+        self.assertEqual(f.check("set_target", 1, ts=99.9, now=100.0), None)
+        # per-frame limit overrides the default
+        self.assertEqual(f.check("set_target", 1, ts=99.95, max_age_s=0.01, now=100.0), "expired")
+        self.assertEqual(f.check("set_target", 1, ts=99.0, max_age_s=0.0, now=100.0), "superseded")
+
+    def test_dropped_frames_do_not_advance_state(self):
+        f = StaleFilter(default_max_age_s=0.2)
+        self.assertEqual(f.check("set_target", 1, seq=1, ts=10.0, now=100.0), "expired")
+        self.assertEqual(f.check("set_target", 1, seq=1, ts=100.0, now=100.0), None)
+
+    def test_stats(self):
+        f = StaleFilter()
+        f.check("set_target", 1, seq=2)
+        f.check("set_target", 1, seq=1)
+        f.check("set_target", 1, seq=1)
+        st = f.stats()
+        self.assertEqual(st["accepted"], {"set_target": 1})
+        self.assertEqual(st["dropped"], {"set_target": {"out_of_order": 2}})
+
+
+if __name__ == "__main__":
+    unittest.main()
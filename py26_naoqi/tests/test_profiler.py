@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiler import SamplingProfiler
+
+
+def _busy_worker(stop):
+    # something for the sampler to find
+    while not stop.is_set():
+        sum(i * i for i in range(200))
+
+
+class SamplingProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.prof = SamplingProfiler(out_dir=self.dir, max_duration_s=0.5)
+        self.worker_stop = threading.Event()
+        th = threading.Thread(target=_busy_worker, args=(self.worker_stop,), name="busy")
+        th.daemon = True
+        th.start()
+        self.worker = th
+
+    def tearDown(self):
+        self.worker_stop.set()
+        self.worker.join(2.0)
+        if self.prof.running():
+            self.prof.stop()
+        shutil.rmtree(self.dir)
+
+    def test_second_start_refused(self):
+        self.prof.start(duration_s=0.5, interval_s=0.002)
+        self.assertRaises(RuntimeError, self.prof.start, 0.5, 0.002)
+        self.assertTrue(self.prof.running())
+        self.prof.stop()
+        self.assertFalse(self.prof.running())
+
+    def test_stop_without_session(self):
+        self.assertRaises(RuntimeError, self.prof.stop)
+
+    def test_duration_and_interval_capped(self):
+        info = self.prof.start(duration_s=3600.0, interval_s=0.0)
+        self.assertEqual(info, {"duration_s": 0.5, "interval_s": 0.001})
+        t_end = time.time() + 3.0
+        while self.prof.running() and time.time() < t_end:
+            time.sleep(0.02)
+        self.assertFalse(self.prof.running(), "session outlived max_duration_s")
+        res = self.prof.stop()
+        self.assertTrue(res["elapsed_s"] < 1.0)
+
+    def test_summary_and_file(self):
+        self.prof.start(duration_s=0.5, interval_s=0.002)
+        time.sleep(0.2)
+        res = self.prof.stop(top=1000)
+        self.assertTrue(res["samples"] > 0)
+        self.assertTrue(res["threads"].get("busy", 0) > 0)
+        short = self.prof.stop(top=3)   # the finished session, cut to the top 3
+        self.assertEqual(short["top_self"], res["top_self"][:3])
+        self.assertEqual(short["top_cumulative"], res["top_cumulative"][:3])
+        funcs = [e["func"] for e in res["top_cumulative"]]
+        self.assertTrue(any("_busy_worker" in f for f in funcs), funcs)
+        pcts = [e["pct"] for e in res["top_self"]]
+        self.assertEqual(pcts, sorted(pcts, reverse=True))
+        self.assertEqual(os.path.dirname(res["file"]), self.dir)
+        f = open(res["file"])
+        try:
+            text = f.read()
+        finally:
+            f.close()
+        self.assertTrue(text.startswith("# sampling profile: %d samples" % res["samples"]))
+        self.assertTrue("_busy_worker" in text)
+
+
+if __name__ == "__main__":
+    unittest.main()
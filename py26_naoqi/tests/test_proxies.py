@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from proxies import ProxySupervisor, ProxyUnavailable
+
+
+class _Broker(object):
+    """Fake NAOqi: a restart bumps the generation, older proxies then fail."""
+    def __init__(self):
+        self.gen = 0
+        self.up = True
+
+    def factory(self, name, ip, port):
+        if not self.up:
+            raise RuntimeError("connection refused")
+        return _Proxy(self, name)
+
+
+class _Proxy(object):
+    def __init__(self, broker, name):
+        self._broker = broker
+        self.name = name
+        self.gen = broker.gen
+
+    def echo(self, x):
+        if self.gen != self._broker.gen:
+            raise RuntimeError("stale handle")
+        return x
+
+    def goToPosture(self, name, speed):
+        # what NAOqi answers for a bad posture name
+        raise RuntimeError("ALRobotPosture::goToPosture\n\tPosture %s not found" % name)
+
+    @property
+    def post(self):
+        if self.gen != self._broker.gen:
+            raise RuntimeError("stale handle")
+        return self
+
+
+def _wait(cond, timeout=2.0):
+    t_end = time.time() + timeout
+    while not cond():
+        if time.time() > t_end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class ProxySupervisorTest(unittest.TestCase):
+    def setUp(self):
+        self.broker = _Broker()
+        self.stop = threading.Event()
+        self.sup = ProxySupervisor(self.broker.factory, "nao", 9559,
+                                   names=("ALMotion", "ALRobotPosture"),
+                                   optional=("ALTextToSpeech",),
+                                   fail_threshold=2, backoff_s=(0.01, 0.05))
+
+    def tearDown(self):
+        self.stop.set()
+        self.sup._wake.set()
+        if self.sup._thread is not None:
+            self.sup._thread.join(2.0)
+
+    def test_not_connected_fails_fast(self):
+        self.broker.up = False
+        self.sup.start(self.stop)
+        t0 = time.time()
+        self.assertRaises(ProxyUnavailable, self.sup.call, "ALMotion", "echo", 1)
+        self.assertTrue(time.time() - t0 < 0.1)
+        self.assertFalse(self.sup.wait_ready(0.05))
+        self.broker.up = True
+        self.assertTrue(self.sup.wait_ready(2.0))
+        self.assertEqual(self.sup.call("ALMotion", "echo", 1), 1)
+
+    def test_reconnect_refreshes_siblings(self):
+        self.sup.start(self.stop)
+        self.assertTrue(self.sup.wait_ready(2.0))
+        self.broker.gen += 1  # NAOqi restarted
+        for _ in range(2):
+            self.assertRaises(RuntimeError, self.sup.call, "ALMotion", "echo", 1)
+        self.assertTrue(_wait(lambda: self.sup.stats()["proxies"]["ALMotion"]["connected"]))
+        # the other proxies were rebuilt with it, without failing first
+        self.assertTrue(_wait(lambda: self.sup.stats()["proxies"]["ALTextToSpeech"]["connects"] == 2))
+        for name in ("ALMotion", "ALRobotPosture", "ALTextToSpeech"):
+            self.assertEqual(self.sup.call(name, "echo", name), name)
+        self.assertEqual(self.sup.stats()["proxies"]["ALRobotPosture"]["failures"], 0)
+
+    def test_single_failure_keeps_proxy(self):
+        self.sup.start(self.stop)
+        self.assertTrue(self.sup.wait_ready(2.0))
+        p = self.sup.get("ALMotion")
+        self.broker.gen += 1
+        self.assertRaises(RuntimeError, self.sup.call, "ALMotion", "echo", 1)
+        self.assertTrue(self.sup.get("ALMotion") is p)  # below fail_threshold
+
+    def test_refused_calls_keep_proxy(self):
+        self.sup.start(self.stop)
+        self.assertTrue(self.sup.wait_ready(2.0))
+        p = self.sup.get("ALRobotPosture")
+        for _ in range(5):
+            self.assertRaises(RuntimeError, self.sup.call, "ALRobotPosture", "goToPosture", "Nope", 0.5)
+            self.assertRaises(TypeError, self.sup.call, "ALRobotPosture", "echo")
+        self.assertTrue(self.sup.get("ALRobotPosture") is p)
+        st = self.sup.stats()["proxies"]["ALRobotPosture"]
+        self.assertEqual((st["failures"], st["refused"]), (0, 10))
+        self.assertTrue("echo()" in st["last_error"], st["last_error"])
+
+    def test_post_failures_count_without_threads(self):
+        self.sup.start(self.stop)
+        self.assertTrue(self.sup.wait_ready(2.0))
+        self.assertTrue(self.sup.post("ALTextToSpeech", "echo", "hi"))
+        n_threads = threading.active_count()
+        self.broker.gen += 1
+        self.assertFalse(self.sup.post("ALTextToSpeech", "echo", "hi"))
+        self.assertEqual(threading.active_count(), n_threads)
+        self.assertFalse(self.sup.post("ALTextToSpeech", "echo", "hi"))
+        # two transport failures: dropped and reconnected like a failing call
+        self.assertTrue(_wait(lambda: self.sup.stats()["proxies"]["ALTextToSpeech"]["failures"] == 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
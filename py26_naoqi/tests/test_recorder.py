@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recorder
+from recorder import FlightRecorder
+
+
+def _fill(rec, n):
+    for i in range(n):
+        v = float(i)
+        rec.record(v, v, v, v, v, v, v, v, v, 1.0, 0.001, 0)
+
+
+class FlightRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_snapshot_before_wrap(self):
+        rec = FlightRecorder(5)
+        _fill(rec, 3)
+        data, n = rec.snapshot()
+        self.assertEqual(n, 3)
+        self.assertEqual([data[i * recorder.NF] for i in range(n)], [0.0, 1.0, 2.0])
+
+    def test_snapshot_after_wrap_is_oldest_first(self):
+        rec = FlightRecorder(5)
+        _fill(rec, 12)
+        data, n = rec.snapshot()
+        self.assertEqual(n, 5)
+        self.assertEqual(len(data), 5 * recorder.NF)
+        self.assertEqual([data[i * recorder.NF] for i in range(n)], [7.0, 8.0, 9.0, 10.0, 11.0])
+        self.assertEqual(rec.count, 12)
+
+    def test_dump_load_round_trip(self):
+        rec = FlightRecorder(4)
+        _fill(rec, 6)
+        info = rec.dump(os.path.join(self.dir, "r.bin"))
+        self.assertEqual(info["records"], 4)
+        self.assertEqual(os.path.getsize(info["file"]), info["bytes"])
+        names, recs = recorder.load(info["file"])
+        self.assertEqual(tuple(names), recorder.FIELDS)
+        self.assertEqual([r[0] for r in recs], [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(recs[-1][names.index("deadman")], 1.0)
+
+    def test_dump_load_exactly_full(self):
+        # count == capacity: the write index has wrapped to 0
+        rec = FlightRecorder(4)
+        _fill(rec, 4)
+        data, n = rec.snapshot()
+        self.assertEqual((n, len(data)), (4, 4 * recorder.NF))
+        info = rec.dump(os.path.join(self.dir, "full.bin"))
+        self.assertEqual(os.path.getsize(info["file"]), info["bytes"])
+        names, recs = recorder.load(info["file"])
+        self.assertEqual([r[0] for r in recs], [0.0, 1.0, 2.0, 3.0])
+
+    def test_dump_to_dir_default_name(self):
+        rec = FlightRecorder(2)
+        info = rec.dump_to_dir(self.dir, "crash")
+        base = os.path.basename(info["file"])
+        self.assertTrue(base.startswith("flight_") and base.endswith("_crash.bin"), base)
+        self.assertEqual(os.path.dirname(info["file"]), self.dir)
+
+    def test_client_name_stays_in_dir(self):
+        rec = FlightRecorder(2)
+        for name, expect in (("../../etc/passwd", "passwd.bin"),
+                             ("run1.bin", "run1.bin"),
+                             ("a b\"c", "a_b_c.bin"),
+                             ("C:\\temp\\x", "x.bin"),
+                             ("/abs/.hidden", "hidden.bin")):
+            info = rec.dump_to_dir(self.dir, name=name)
+            self.assertEqual(info["file"], os.path.join(self.dir, expect), name)
+        for name in ("..", "", None, "/"):
+            info = rec.dump_to_dir(self.dir, name=name)
+            self.assertEqual(os.path.dirname(info["file"]), self.dir)
+            self.assertTrue(os.path.basename(info["file"]).startswith("flight_"))
+
+    def test_load_rejects_other_files(self):
+        path = os.path.join(self.dir, "junk.bin")
+        f = open(path, "wb")
+        f.write(b"\0" * 64)
+        f.close()
+        self.assertRaises(ValueError, recorder.load, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
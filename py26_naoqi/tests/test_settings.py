@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import Settings
+
+
+class _Cfg(object):
+    LOOP_HZ = 20.0
+    MAX_ACC_VX = 1.0
+    HEAD_FRACTION_SPEED = 0.3
+
+
+class SettingsTest(unittest.TestCase):
+    def test_defaults_and_config(self):
+        s = Settings.from_config(_Cfg())
+        self.assertEqual(s.loop_hz, 20.0)
+        self.assertAlmostEqual(s.dt, 0.05)
+        self.assertEqual(s.max_acc_vx, 1.0)
+        self.assertEqual(s.max_acc_vy, Settings.KEYS["MAX_ACC_VY"])
+        self.assertEqual(s.head_yaw_lim, (Settings.KEYS["HEAD_YAW_MIN"], Settings.KEYS["HEAD_YAW_MAX"]))
+        self.assertEqual(s.stale_max_age_s, None)
+
+    def test_overrides_win(self):
+        s = Settings.from_config(_Cfg(), {"LOOP_HZ": "50", "STALE_MAX_AGE_S": 0.25})
+        self.assertEqual(s.loop_hz, 50.0)
+        self.assertEqual(s.stale_max_age_s, 0.25)
+
+    def test_zero_loop_hz_falls_back(self):
+        s = Settings.from_config(_Cfg(), {"LOOP_HZ": 0})
+        self.assertEqual(s.loop_hz, 50.0)
+
+    def test_fraction_clamped(self):
+        self.assertEqual(Settings.from_config(_Cfg(), {"HEAD_FRACTION_SPEED": 3}).head_frac, 1.0)
+        self.assertEqual(Settings.from_config(_Cfg(), {"HEAD_FRACTION_SPEED": -1}).head_frac, 0.0)
+
+    def test_rejected(self):
+        for bad in ({"NAO_IP": "1.2.3.4"},                        # not reloadable
+                    {"LOOP_HZ": "fast"},
+                    {"LOOP_HZ": None},
+                    {"MAX_ACC_VX": -1.0},
+                    {"HEAD_MAX_YAW_RATE": -0.1},
+                    {"HEAD_YAW_MIN": 1.0, "HEAD_YAW_MAX": -1.0},
+                    {"STALE_MAX_AGE_S": -1}):
+            self.assertRaises(ValueError, Settings.from_config, _Cfg(), bad)
+
+    def test_non_finite_rejected(self):
+        for name in ("LOOP_HZ", "HEAD_MAX_YAW_RATE", "HEAD_FRACTION_SPEED", "HEAD_YAW_MIN",
+                     "MAX_ACC_VW", "STALE_MAX_AGE_S"):
+            for v in ("nan", "inf", "-inf", float("nan"), float("inf")):
+                self.assertRaises(ValueError, Settings.from_config, _Cfg(), {name: v})
+
+    def test_upper_bounds(self):
+        self.assertEqual(Settings.from_config(_Cfg(), {"LOOP_HZ": Settings.MAX_LOOP_HZ}).loop_hz,
+                         Settings.MAX_LOOP_HZ)
+        for bad in ({"LOOP_HZ": "1e6"},
+                    {"MAX_ACC_VX": Settings.MAX_ACC * 2},
+                    {"HEAD_MAX_PITCH_RATE": 1e9}):
+            self.assertRaises(ValueError, Settings.from_config, _Cfg(), bad)
+
+    def test_config_values_round_trip(self):
+        s = Settings.from_config(_Cfg(), {"LOOP_HZ": "40", "HEAD_FRACTION_SPEED": "2"})
+        vals = s.config_values()
+        self.assertEqual(sorted(vals), sorted(Settings.KEYS))
+        self.assertEqual((vals["LOOP_HZ"], vals["HEAD_FRACTION_SPEED"]), (40.0, 1.0))
+        self.assertEqual(Settings.from_config(_Cfg(), vals).as_dict(), s.as_dict())
+
+    def test_as_dict(self):
+        d = Settings.from_config(_Cfg()).as_dict()
+        self.assertEqual(sorted(d), sorted(Settings.__slots__))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shm
+
+
+class _Writer(object):
+    """Minimal py3_control/shm.py ShmWriter, with hooks to stop mid-write."""
+    def __init__(self, mm):
+        self.mm = mm
+        self.seq = shm._SEQ.unpack_from(mm, shm.OFF_LATEST)[0]
+        self.head = shm._SEQ.unpack_from(mm, shm.OFF_HEAD)[0]
+
+    def begin(self):
+        self.seq += 1
+        shm._SEQ.pack_into(self.mm, shm.OFF_LATEST, self.seq)
+
+    def publish(self, ts, vx, vy, vw, yn, pn):
+        self.begin()
+        shm._LATEST.pack_into(self.mm, shm.OFF_LATEST, self.seq, ts, vx, vy, vw, yn, pn)
+        self.seq += 1
+        shm._SEQ.pack_into(self.mm, shm.OFF_LATEST, self.seq)
+
+    def command(self, code, a=0.0, b=0.0, c=0.0):
+        k = self.head + 1
+        shm._SLOT.pack_into(self.mm, shm.OFF_RING + (k % shm.RING_SLOTS) * shm.SLOT_SIZE,
+                            k, code, 0, a, b, c)
+        self.head = k
+        shm._SEQ.pack_into(self.mm, shm.OFF_HEAD, k)
+
+
+class ShmReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "nao.shm")
+        self.reader = shm.ShmReader(self.path)
+        self.mm = shm.open_map(self.path)
+        self.w = _Writer(self.mm)
+
+    def tearDown(self):
+        self.reader.close()
+        self.mm.close()
+        shutil.rmtree(self.dir)
+
+    def test_latest_only_once(self):
+        self.assertEqual(self.reader.read_latest(), None)
+        self.w.publish(1.0, 0.1, 0.2, 0.3, 0.4, 0.5)
+        self.w.publish(2.0, 0.5, 0.0, 0.0, 0.0, 0.0)
+        self.assertEqual(self.reader.read_latest(), (2.0, 0.5, 0.0, 0.0, 0.0, 0.0))
+        self.assertEqual(self.reader.read_latest(), None)
+        self.assertEqual(self.reader.stats()["frames"], 1)
+
+    def test_torn_read_retried_next_poll(self):
+        self.w.begin()  # writer stopped with seq odd
+        self.assertEqual(self.reader.read_latest(), None)
+        self.assertEqual(self.reader.torn, 1)
+        self.w.seq -= 1
+        self.w.publish(3.0, 1.0, 0.0, 0.0, 0.0, 0.0)
+        self.assertEqual(self.reader.read_latest()[0], 3.0)
+
+    def test_commands_in_order(self):
+        self.assertEqual(self.reader.poll_commands(), [])
+        self.w.command(shm.CMD_SET_DEADMAN, 1.0)
+        self.w.command(shm.CMD_STOP)
+        self.assertEqual(self.reader.poll_commands(),
+                         [(shm.CMD_SET_DEADMAN, 1.0, 0.0, 0.0), (shm.CMD_STOP, 0.0, 0.0, 0.0)])
+        self.assertEqual(self.reader.poll_commands(), [])
+
+    def test_ring_overrun_keeps_newest(self):
+        n = shm.RING_SLOTS + 10
+        for i in range(n):
+            self.w.command(shm.CMD_CENTER_HEAD, float(i))
+        got = self.reader.poll_commands()
+        self.assertEqual(len(got), shm.RING_SLOTS)
+        self.assertEqual(got[0][1], float(n - shm.RING_SLOTS))
+        self.assertEqual(got[-1][1], float(n - 1))
+        self.assertEqual(self.reader.overruns, 10)
+
+    def test_layout_mismatch_refused(self):
+        shm._HDR.pack_into(self.mm, 0, shm.MAGIC, shm.VERSION + 1, shm.RING_SLOTS, shm.SLOT_SIZE, 0)
+        self.mm.flush()
+        self.assertRaises(RuntimeError, shm.open_map, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim_naoqi
+from events import EventHub
+from proxies import ProxySupervisor
+from video import NaoqiSource
+
+
+class _FastSim(object):
+    SIM_RPC_LATENCY_S = 0.0
+    SIM_RPC_JITTER_S = 0.0
+    SIM_POSTURE_S = 0.01
+
+
+class SimNaoqiTest(unittest.TestCase):
+    """The simulated modules accept every call server.py, video.py and events.py make."""
+    def setUp(self):
+        self._config = sim_naoqi.config
+        sim_naoqi.config = _FastSim
+        self.stop = threading.Event()
+        self.sup = ProxySupervisor(sim_naoqi.ALProxy, "127.0.0.1", 9559,
+                                   names=("ALMotion", "ALRobotPosture"),
+                                   optional=("ALTextToSpeech", "ALVideoDevice"))
+        self.sup.start(self.stop)
+        self.assertTrue(self.sup.wait_ready(2.0))
+
+    def tearDown(self):
+        self.stop.set()
+        self.sup._wake.set()
+        if self.sup._thread is not None:
+            self.sup._thread.join(2.0)
+        sim_naoqi.config = self._config
+
+    def test_motion_calls(self):
+        call = self.sup.call
+        call("ALMotion", "setStiffnesses", "Body", 1.0)
+        call("ALMotion", "moveToward", 0.2, -0.1, 0.3)
+        motion = sim_naoqi.ALProxy("ALMotion")
+        self.assertEqual(motion.velocity, (0.2, -0.1, 0.3))
+        call("ALMotion", "setStiffnesses", ["HeadYaw", "HeadPitch"], 1.0)
+        call("ALMotion", "setAngles", ["HeadYaw", "HeadPitch"], [0.4, -0.2], 0.3)
+        self.assertEqual(motion.getAngles(["HeadYaw", "HeadPitch"], True), [0.4, -0.2])
+        call("ALMotion", "stopMove")
+        self.assertEqual(motion.velocity, (0.0, 0.0, 0.0))
+
+    def test_posture_and_tts(self):
+        self.assertTrue(self.sup.call("ALRobotPosture", "goToPosture", "StandInit", 0.75))
+        self.assertEqual(sim_naoqi.ALProxy("ALRobotPosture").getPosture(), "StandInit")
+        self.assertTrue(self.sup.post("ALTextToSpeech", "say", "ok") is not None)
+
+    def test_unknown_module(self):
+        self.assertRaises(RuntimeError, sim_naoqi.ALProxy, "ALNoSuchModule")
+
+    def test_video_source(self):
+        src = NaoqiSource(self.sup, 0, 1, 11, 15)
+        out = bytearray()
+        n = src.grab(out)
+        self.assertEqual((src.width, src.height, src.layers, src.colorspace), (320, 240, 3, 11))
+        self.assertEqual(n, 320 * 240 * 3)
+        first = bytes(out)
+        src.grab(out)
+        self.assertNotEqual(bytes(out), first)   # scrolls between frames
+        src.close()
+
+    def test_memory_events_reach_hub(self):
+        got = []
+        hub = EventHub({"robotHasFallen": "fall"}, on_event=lambda k, kind, v: got.append((k, v)))
+        hub.attach(sim_naoqi.ALBroker, sim_naoqi.ALModule, sim_naoqi.ALProxy,
+                   "127.0.0.1", 9559, module_name="SimTestEvents")
+        try:
+            sim_naoqi.ALProxy("ALMemory").raiseEvent("robotHasFallen", 1)
+            t_end = time.time() + 2.0
+            while not got and time.time() < t_end:
+                time.sleep(0.01)
+            self.assertEqual(got, [("robotHasFallen", 1)])
+            self.assertEqual(sim_naoqi.ALProxy("ALMemory").getData("robotHasFallen"), 1)
+        finally:
+            hub.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import split
+
+
+class _TornBlock(object):
+    """A block whose writer finishes a write between the first seq read and the re-check."""
+    def __init__(self, vals, writes=1):
+        self.vals = list(vals)
+        self.writes = writes
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            v = self.vals[i]
+            if self.writes:
+                self.writes -= 1
+                self.vals[0] += 2
+            return v
+        return self.vals[i]
+
+
+class SeqlockReadTest(unittest.TestCase):
+    def test_busy_writer_gives_none(self):
+        self.assertEqual(split._read([3.0, 1.0, 2.0], 3), None)
+
+    def test_torn_read_retried(self):
+        arr = _TornBlock([2.0, 1.0, 2.0], writes=2)
+        self.assertEqual(split._read(arr, 3), [6.0, 1.0, 2.0])
+        self.assertEqual(split._read(_TornBlock([2.0, 1.0], writes=5), 2, retries=3), None)
+
+
+class ChannelTest(unittest.TestCase):
+    def setUp(self):
+        cmd, st, self.parent_end, self.child_end = split.make_channel()
+        self.link = split.ControlLink(cmd, st, self.parent_end)
+        self.ep = split.ControlEndpoint(cmd, st, self.child_end)
+        # cleanups run last-first: shut the server down before closing the pipe
+        self.addCleanup(self.child_end.close)
+        self.addCleanup(self.parent_end.close)
+
+    def _serve(self, handlers):
+        stop = threading.Event()
+        th = threading.Thread(target=self.ep.serve, args=(handlers, stop))
+        th.daemon = True
+        th.start()
+        self.addCleanup(th.join, 2.0)
+        self.addCleanup(self.link.close)
+        return stop
+
+    def test_commands_seen_once(self):
+        self.ep.poll()
+        self.link.set_target(0.5, 2.0, -0.25, duration_s=0.3)
+        v, prev = self.ep.poll()
+        self.assertEqual((v[split.C_VX], v[split.C_VY], v[split.C_VW], v[split.C_DUR]), (0.5, 1.0, -0.25, 0.3))
+        self.assertEqual(v[split.C_TGT_N], prev[split.C_TGT_N] + 1)
+        self.assertEqual(self.ep.poll(), None)
+        self.link.stop(hold_s=2.0)
+        v, prev = self.ep.poll()
+        self.assertEqual((v[split.C_STOP_N], v[split.C_HOLD_S]), (1.0, 2.0))
+
+    def test_unrelated_write_leaves_deadman_and_head_counters(self):
+        self.link.set_deadman(True)
+        self.link.set_head(0.5, -0.5)
+        v, _ = self.ep.poll()
+        self.assertEqual((v[split.C_DEADMAN], v[split.C_DEADMAN_N], v[split.C_HEAD_N]), (1.0, 1.0, 1.0))
+        # e.g. the shm ring turned the deadman off in between: a set_target
+        # must not look like a new deadman or head command
+        self.link.set_target(0.1, 0.0, 0.0)
+        v, prev = self.ep.poll()
+        self.assertEqual(v[split.C_DEADMAN_N], prev[split.C_DEADMAN_N])
+        self.assertEqual(v[split.C_HEAD_N], prev[split.C_HEAD_N])
+        self.link.set_deadman(True)   # same value again still counts as a command
+        v, prev = self.ep.poll()
+        self.assertEqual(v[split.C_DEADMAN_N], prev[split.C_DEADMAN_N] + 1)
+
+    def test_status_published(self):
+        self.ep.publish((0.1, 0.2, 0.3, 0.05, 0.0, 0.0, 0.0, 12.0), 0.4, -0.1, 7, 0.002)
+        s = self.link.status()
+        self.assertEqual(s[split.S_TGT_X:split.S_LAST_UPD + 1], [0.1, 0.2, 0.3, 0.05, 0.0, 0.0, 0.0, 12.0])
+        self.assertEqual((s[split.S_HEAD_YAW], s[split.S_TICKS]), (0.4, 7.0))
+        self.assertEqual(s[split.S_SEQ] % 2, 0)
+
+    def test_request_round_trip_and_errors(self):
+        def boom():
+            raise ValueError("bad key")
+        self._serve({"metrics": lambda reset: {"reset": reset}, "boom": boom})
+        self.assertEqual(self.link.request("metrics", True), {"reset": True})
+        with self.assertRaises(RuntimeError) as cm:
+            self.link.request("boom")
+        self.assertTrue("bad key" in str(cm.exception))
+        with self.assertRaises(RuntimeError):
+            self.link.request("nope")
+
+    def test_timeout_then_late_answer_skipped(self):
+        with self.assertRaises(RuntimeError) as cm:
+            self.link.request("metrics", False, timeout_s=0.2)
+        self.assertTrue("no answer" in str(cm.exception))
+        # the server now answers the timed-out request first; the link must skip it
+        self._serve({"metrics": lambda reset: reset})
+        self.assertEqual(self.link.request("metrics", True), True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import socket
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import video
+
+
+class _Source(object):
+    width, height, layers, colorspace = 64, 48, 3, 11
+
+    def __init__(self):
+        self.n = 0
+
+    def grab(self, out):
+        self.n += 1
+        out[:] = bytearray([self.n % 256]) * (self.width * self.height * self.layers)
+        return len(out)
+
+    def close(self):
+        pass
+
+
+def _recv_exact(s, n):
+    buf = b""
+    while len(buf) < n:
+        d = s.recv(n - len(buf))
+        if not d:
+            raise EOFError
+        buf += d
+    return buf
+
+
+def _wait(cond, timeout=3.0):
+    t_end = time.time() + timeout
+    while not cond():
+        if time.time() > t_end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class VideoHubTest(unittest.TestCase):
+    def setUp(self):
+        self.src = _Source()
+        self.hub = video.VideoHub(self.src, fps=50, pool_size=2, send_timeout_s=0.2)
+        th = threading.Thread(target=self.hub.capture_loop)
+        th.daemon = True
+        th.start()
+        self.socks = []
+
+    def tearDown(self):
+        self.hub.stop()
+        for s in self.socks:
+            s.close()
+
+    def _subscribe(self, rcvbuf=None):
+        a, b = socket.socketpair()
+        self.socks.append(b)
+        if rcvbuf:
+            b.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+            a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, rcvbuf)
+        a.settimeout(self.hub._send_timeout_s)
+        th = threading.Thread(target=self.hub.serve_client, args=(a, ("127.0.0.1", 1)))
+        th.daemon = True
+        th.start()
+        return b
+
+    def test_frames_arrive_in_order(self):
+        s = self._subscribe()
+        last = 0
+        for _ in range(3):
+            magic, seq, ts, w, h, layers, cs, _, size = video.HEADER.unpack(_recv_exact(s, video.HEADER.size))
+            payload = _recv_exact(s, size)
+            self.assertEqual(magic, video.MAGIC)
+            self.assertEqual((w, h, layers, cs), (64, 48, 3, 11))
+            self.assertEqual(size, 64 * 48 * 3)
+            self.assertEqual(len(payload), size)
+            self.assertTrue(seq > last)
+            last = seq
+
+    def test_stalled_viewer_dropped_capture_goes_on(self):
+        self._subscribe(rcvbuf=4096)   # never read
+        self.assertTrue(_wait(lambda: self.hub.send_timeouts == 1))
+        n = self.hub.captured
+        self.assertTrue(_wait(lambda: self.hub.captured > n + 5))
+        self.assertTrue(_wait(lambda: not self.hub.stats()["subscribers"]))
+        for f in self.hub._pool:
+            self.assertTrue(f.refs <= 1)  # only capture may hold one
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Camera streaming: one capture thread grabs frames from ALVideoDevice
+(synthetic frames under --sim) at a fixed rate into a small pool of reusable buffers;
+the latest frame is shared by every subscriber on VIDEO_PORT. A subscriber
+that is still sending when newer frames arrive skips them (latest wins),
+so a slow client never queues frames or slows the others. One whose send
+blocks for send_timeout_s is disconnected, so a stalled viewer cannot pin
+a pool buffer for long.
+
+Wire format per frame (little-endian), payload sent straight from the
+pool buffer:
+  "<4sIdHHBBHI"  magic "NVF1", seq, ts, width, height, layers,
+                 colorspace, 0, payload size
+  payload        raw image bytes (width * height * layers)
+"""
+from __future__ import print_function
+import time
+import socket
+import struct
+import threading
+
+MAGIC = b"NVF1"
+HEADER = struct.Struct("<4sIdHHBBHI")
+
+# NAOqi resolution ids -> (width, height)
+RESOLUTIONS = {0: (160, 120), 1: (320, 240), 2: (640, 480), 3: (1280, 960), 7: (80, 60), 8: (40, 30)}
+
+try:
+    _view = buffer  # Py2: zero-copy slice of a bytearray
+except NameError:
+    def _view(b, off, n):
+        return memoryview(b)[off:off + n]
+
+
+class _Frame(object):
+    __slots__ = ("buf", "size", "seq", "ts", "width", "height", "layers", "colorspace", "refs")
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.size = 0
+        self.seq = 0
+        self.ts = 0.0
+        self.width = self.height = self.layers = self.colorspace = 0
+        self.refs = 0
+
+
+class NaoqiSource(object):
+    """ALVideoDevice through the proxy supervisor; re-subscribes after a reconnect."""
+    def __init__(self, supervisor, camera, resolution, colorspace, fps, name="nao_xbox_video"):
+        self._nao = supervisor
+        self._camera, self._res, self._cs, self._fps = camera, resolution, colorspace, fps
+        self._name = name
+        self._proxy = None
+        self._handle = None
+        self.width, self.height = RESOLUTIONS.get(resolution, (0, 0))
+        self.layers, self.colorspace = 0, colorspace
+
+    def _subscribe(self):
+        p = self._nao.get("ALVideoDevice")
+        if p is self._proxy and self._handle is not None:
+            return p
+        try:
+            self._handle = p.subscribeCamera(self._name, self._camera, self._res, self._cs, self._fps)
+        except Exception:
+            # NAOqi 1.14: no subscribeCamera
+            self._handle = p.subscribe(self._name, self._res, self._cs, self._fps)
+            try: p.setParam(18, self._camera)  # kCameraSelectID
+            except Exception: pass
+        self._proxy = p
+        return p
+
+    def grab(self, out):
+        self._subscribe()
+        img = self._nao.call("ALVideoDevice", "getImageRemote", self._handle)
+        if not img or len(img) < 7:
+            return 0
+        self.width, self.height, self.layers, self.colorspace = int(img[0]), int(img[1]), int(img[2]), int(img[3])
+        data = img[6]
+        out[:] = data  # reuses out's storage when the size is unchanged
+        try: self._nao.call("ALVideoDevice", "releaseImage", self._handle)
+        except Exception: pass
+        return len(data)
+
+    def close(self):
+        if self._proxy is not None and self._handle is not None:
+            try: self._proxy.unsubscribe(self._handle)
+            except Exception: pass
+        self._handle = None
+
+
+class VideoHub(object):
+    def __init__(self, source, fps, pool_size=4, send_timeout_s=2.0):
+        self._src = source
+        self._period = 1.0 / max(0.1, float(fps))
+        self._send_timeout_s = float(send_timeout_s)
+        self._cond = threading.Condition(threading.Lock())
+        self._pool = [_Frame() for _ in range(max(2, int(pool_size)))]
+        self._latest = None
+        self._stop = False
+        self._subs = {}  # id -> per-subscriber stats
+        self.captured = 0
+        self.capture_errors = 0
+        self.pool_exhausted = 0
+        self.send_timeouts = 0    # subscribers dropped for not reading
+        self.grab_s = 0.0
+
+    # ---- capture ----
+    def _free_frame(self):
+        for f in self._pool:
+            if f.refs == 0 and f is not self._latest:
+                return f
+        return None
+
+    def capture_loop(self):
+        seq = 0
+        while True:
+            t0 = time.time()
+            with self._cond:
+                if self._stop:
+                    return
+                f = self._free_frame()
+                if f is not None:
+                    f.refs += 1  # owned by capture while filling
+            if f is None:
+                self.pool_exhausted += 1
+            else:
+                try:
+                    size = self._src.grab(f.buf)
+                except Exception:
+                    size = 0
+                    self.capture_errors += 1
+                self.grab_s += time.time() - t0
+                with self._cond:
+                    f.refs -= 1
+                    if size:
+                        seq += 1
+                        f.size, f.seq, f.ts = size, seq, t0
+                        f.width, f.height = self._src.width, self._src.height
+                        f.layers, f.colorspace = self._src.layers, self._src.colorspace
+                        self._latest = f
+                        self.captured += 1
+                        self._cond.notify_all()
+            wait = self._period - (time.time() - t0)
+            if wait > 0.0:
+                time.sleep(wait)
+            elif f is None or not size:
+                time.sleep(0.05)  # source failing: don't spin
+
+    # ---- subscribers ----
+    def serve_client(self, conn, addr):
+        st = {"addr": "%s:%s" % tuple(addr[:2]), "sent": 0, "dropped": 0, "bytes": 0}
+        with self._cond:
+            self._subs[id(st)] = st
+        last = 0
+        try:
+            while True:
+                with self._cond:
+                    while not self._stop and (self._latest is None or self._latest.seq == last):
+                        self._cond.wait()
+                    if self._stop:
+                        return
+                    f = self._latest
+                    f.refs += 1
+                try:
+                    if last:
+                        st["dropped"] += f.seq - last - 1
+                    last = f.seq
+                    conn.sendall(HEADER.pack(MAGIC, f.seq, f.ts, f.width, f.height,
+                                             f.layers, f.colorspace, 0, f.size))
+                    conn.sendall(_view(f.buf, 0, f.size))
+                    st["sent"] += 1
+                    st["bytes"] += HEADER.size + f.size
+                finally:
+                    with self._cond:
+                        f.refs -= 1
+        except socket.timeout:
+            self.send_timeouts += 1
+        except Exception:
+            pass
+        finally:
+            with self._cond:
+                self._subs.pop(id(st), None)
+            try: conn.close()
+            except Exception: pass
+
+    def accept_loop(self, sock):
+        while not self._stop:
+            try:
+                c, a = sock.accept()
+            except socket.timeout:
+                continue
+            except Exception:
+                if self._stop:
+                    break
+                time.sleep(0.1)
+                continue
+            try:
+                c.settimeout(self._send_timeout_s)  # sendall gives up on a stalled viewer
+                c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except Exception:
+                pass
+            th = threading.Thread(target=self.serve_client, args=(c, a), name="video-%s:%s" % a[:2])
+            th.daemon = True
+            th.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        try: self._src.close()
+        except Exception: pass
+
+    def stats(self):
+        return {"captured": self.captured, "capture_errors": self.capture_errors,
+                "pool_exhausted": self.pool_exhausted, "send_timeouts": self.send_timeouts,
+                "grab_mean_s": (self.grab_s / self.captured) if self.captured else 0.0,
+                "subscribers": [dict(s) for s in list(self._subs.values())]}
+
+
+def start(hub, host, port):
+    """Starts the capture and accept threads; returns the listening socket."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind((host, port))
+    s.listen(5)
+    s.settimeout(0.5)
+    for target, args, name in ((hub.capture_loop, (), "video_capture"),
+                               (hub.accept_loop, (s,), "video_accept")):
+        th = threading.Thread(target=target, args=args, name=name)
+        th.daemon = True
+        th.start()
+    return s
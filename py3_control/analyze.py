@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+analyze.py
+Offline analysis of recorded sessions with NumPy: server flight recorder
+dumps (py26_naoqi/recorder.py, one record per control_loop tick) and
+teleop logs (tracelog.py, one record per gamepad tick). Files are
+memory-mapped as structured arrays; all statistics are array operations.
+
+    python3 analyze.py flight_*.bin
+    python3 analyze.py flight_x.bin --teleop teleop_y.bin
+    python3 analyze.py flight_x.bin --teleop teleop_y.bin --deadzone 0.08 --max-acc 2,2,4
+
+--deadzone / --max-acc re-run the stick mapping and the slew limiter over
+the recorded inputs with other values, next to what was actually flown.
+Needs numpy (pip install numpy).
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import config
+from mapping import MapParams
+from tracelog import HEADER, MAGIC
+
+AXES = ("vx", "vy", "vw")
+
+
+# ---- loading ----
+
+def load_trace(path: str):
+    """Structured float64 array (field names from the file), memory-mapped read-only."""
+    with open(path, "rb") as f:
+        magic, _version, nf, n = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("not a recorder/teleop log: %s" % path)
+        names = [f.read(16).rstrip(b"\0").decode("ascii") for _ in range(nf)]
+    dtype = np.dtype([(name, "<f8") for name in names])
+    offset = HEADER.size + 16 * nf
+    avail = (os.path.getsize(path) - offset) // dtype.itemsize
+    if n == 0 or n > avail:
+        n = avail  # unfinished log: read up to the last complete record
+    if n <= 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n,))
+
+
+# ---- vectorised re-runs of mapping.py / motion.py ----
+
+def map_vel(lx, ly, lb, rb, p: MapParams):
+    """mapping.map_state_to_vel over whole arrays; returns (vx, vy, vw)."""
+    lx = np.where(np.abs(lx) < p.deadzone, 0.0, lx)
+    ly = np.where(np.abs(ly) < p.deadzone, 0.0, ly)
+    vy = np.clip(lx, -1.0, 1.0) * p.max_vy
+    vx = np.clip(-ly if p.invert_y else ly, -1.0, 1.0) * p.max_vx
+    lb = np.asarray(lb) > 0.5
+    rb = np.asarray(rb) > 0.5
+    vw = np.where(lb & ~rb, abs(p.hold_vw), np.where(rb & ~lb, -abs(p.hold_vw), 0.0))
+    return np.clip(vx, -1.0, 1.0), np.clip(vy, -1.0, 1.0), np.clip(vw, -1.0, 1.0)
+
+
+def slew_replay(tgt, dt, max_acc, c0=0.0):
+    """
+    motion.SlewRateLimiter over whole traces. tgt: (..., N) targets, dt: (N,)
+    tick periods, max_acc: broadcastable to tgt[..., 0] (per axis, per
+    parameter set, per trace). The limiter is a recurrence in time, so the
+    only Python loop is over ticks; each step updates every axis, trace and
+    parameter set in the batch at once.
+    """
+    tgt = np.asarray(tgt, dtype=np.float64)
+    step = np.asarray(max_acc, dtype=np.float64)[..., None] * np.asarray(dt, dtype=np.float64)
+    step = np.broadcast_to(step, tgt.shape)
+    out = np.empty_like(tgt)
+    c = np.zeros(tgt.shape[:-1]) + c0
+    for k in range(tgt.shape[-1]):
+        c = np.clip(np.clip(tgt[..., k], c - step[..., k], c + step[..., k]), -1.0, 1.0)
+        out[..., k] = c
+    return out
+
+
+# ---- statistics ----
+
+def _pcts(x, qs=(50, 90, 99)) -> List[float]:
+    return list(np.percentile(x, qs)) if len(x) else [float("nan")] * len(qs)
+
+
+def loop_stats(fl, hz: Optional[float] = None) -> Dict[str, float]:
+    ts = np.asarray(fl["ts"])
+    dt = np.diff(ts)
+    nominal = 1.0 / hz if hz else (float(np.median(dt)) if len(dt) else 0.0)
+    jit = np.abs(dt - nominal)
+    tick = np.asarray(fl["tick_s"])
+    p = _pcts(jit)
+    t = _pcts(tick)
+    return {"ticks": len(ts), "nominal_s": nominal,
+            "jitter_mean_s": float(jit.mean()) if len(jit) else float("nan"),
+            "jitter_p50_s": p[0], "jitter_p90_s": p[1], "jitter_p99_s": p[2],
+            "jitter_max_s": float(jit.max()) if len(jit) else float("nan"),
+            "tick_p50_s": t[0], "tick_p99_s": t[2],
+            "tick_max_s": float(tick.max()) if len(tick) else float("nan"),
+            "overruns": int(np.count_nonzero(tick > nominal)) if nominal else 0,
+            "errors": int(np.count_nonzero(np.asarray(fl["err_flags"]) != 0))}
+
+
+def saturation(tgt, cur, dt, eps: float = 1e-6) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Per axis: seconds and fraction of ticks the limiter was binding (cur != tgt)."""
+    sat = np.abs(np.asarray(tgt) - np.asarray(cur)) > eps
+    dt = np.asarray(dt)
+    secs = (sat * dt).sum(axis=-1)
+    frac = sat.mean(axis=-1) if sat.shape[-1] else np.zeros(sat.shape[:-1])
+    return secs, frac
+
+
+def deadzone_clip(axis, dz: float) -> Tuple[int, float]:
+    """Samples where the stick was off-centre but inside the deadzone, and their share of off-centre samples."""
+    a = np.abs(np.asarray(axis))
+    moved = a > 1e-3
+    clipped = moved & (a < dz)
+    n = int(np.count_nonzero(moved))
+    return int(np.count_nonzero(clipped)), (float(np.count_nonzero(clipped)) / n if n else 0.0)
+
+
+def xcorr_lag(t_a, a, t_b, b, grid_s: float = 0.001, max_lag_s: float = 1.0) -> Optional[float]:
+    """
+    Delay of b behind a (both sampled at their own times, same clock), from
+    the peak of their FFT cross-correlation on a common grid. a / b are
+    (k, N) stacks (e.g. the three axes); their correlations are summed.
+    """
+    lo, hi = max(t_a[0], t_b[0]), min(t_a[-1], t_b[-1])
+    if hi - lo < 10 * grid_s:
+        return None
+    g = np.arange(lo, hi, grid_s)
+    ga = np.stack([np.interp(g, t_a, x) for x in a])
+    gb = np.stack([np.interp(g, t_b, x) for x in b])
+    ga -= ga.mean(axis=1, keepdims=True)
+    gb -= gb.mean(axis=1, keepdims=True)
+    if not np.any(ga) or not np.any(gb):
+        return None
+    n = 1 << int(np.ceil(np.log2(2 * len(g))))
+    cc = np.fft.irfft(np.conj(np.fft.rfft(ga, n)) * np.fft.rfft(gb, n), n).sum(axis=0)
+    lags = cc[:min(len(g), int(max_lag_s / grid_s) + 1)]
+    return float(np.argmax(lags)) * grid_s
+
+
+def sample_at(t_src, values, t_dst):
+    """Zero-order hold: latest value of 'values' at or before each t_dst (0 before the first)."""
+    idx = np.searchsorted(t_src, t_dst, side="right") - 1
+    out = np.asarray(values)[..., np.clip(idx, 0, None)]
+    return np.where(idx >= 0, out, 0.0)
+
+
+# ---- report ----
+
+def _ms(x) -> str:
+    return "-" if x is None or x != x else "%.2f" % (x * 1e3)
+
+
+def report_flight(paths: Sequence[str], hz: Optional[float]):
+    loaded = [(p, load_trace(p)) for p in paths]
+    loaded = [(p, t) for p, t in loaded if len(t) > 1]
+    if not loaded:
+        print("no control-loop ticks in %s" % ", ".join(paths))
+        return None
+    print("== control loop (%d file(s)) ==" % len(loaded))
+    print("%-34s %7s %9s %9s %9s %9s %8s %6s" % ("file", "ticks", "jit p50", "jit p99", "jit max",
+                                                  "tick p99", "overrun", "errs"))
+    for p, fl in loaded:
+        s = loop_stats(fl, hz)
+        print("%-34s %7d %9s %9s %9s %9s %8d %6d" % (
+            os.path.basename(p)[-34:], s["ticks"], _ms(s["jitter_p50_s"]), _ms(s["jitter_p99_s"]),
+            _ms(s["jitter_max_s"]), _ms(s["tick_p99_s"]), s["overruns"], s["errors"]))
+    return [t for _, t in loaded]
+
+
+def report_slew(fl, max_acc: Optional[Sequence[float]]):
+    ts = np.asarray(fl["ts"])
+    dt = np.diff(ts, prepend=ts[0] - (ts[1] - ts[0]))
+    tgt = np.stack([np.asarray(fl["tgt_" + a]) for a in AXES])
+    cur = np.stack([np.asarray(fl["cur_" + a]) for a in AXES])
+    secs, frac = saturation(tgt, cur, dt)
+    print("\n== slew limiter (last file, %.1f s) ==" % (ts[-1] - ts[0]))
+    print("recorded       " + "  ".join("%s %6.2fs (%4.1f%%)" % (a, s, f * 100) for a, s, f in zip(AXES, secs, frac)))
+    lag = xcorr_lag(ts, tgt, ts, cur)
+    print("target -> current lag (slew + tick): %s ms" % _ms(lag))
+    if max_acc:
+        rep = slew_replay(tgt, dt, np.asarray(max_acc))
+        secs, frac = saturation(tgt, rep, dt)
+        print("MAX_ACC=%-7s" % ",".join("%g" % a for a in max_acc) +
+              "  ".join("%s %6.2fs (%4.1f%%)" % (a, s, f * 100) for a, s, f in zip(AXES, secs, frac)))
+        print("re-run -> lag %s ms, max |diff| vs recorded %.3f" %
+              (_ms(xcorr_lag(ts, tgt, ts, rep)), float(np.abs(rep - cur).max())))
+
+
+def report_teleop(tp, fl, dz: Optional[float], max_acc: Optional[Sequence[float]]):
+    p = MapParams(deadzone=float(config.STICK_DEADZONE), max_vx=float(config.MAX_VX_NORM),
+                  max_vy=float(config.MAX_VY_NORM), hold_vw=float(config.HOLD_VW_NORM),
+                  invert_y=bool(config.INVERT_Y))
+    print("\n== teleop (%d ticks) ==" % len(tp))
+    for d in ([p.deadzone] + ([dz] if dz is not None else [])):
+        cl = [deadzone_clip(tp[a], d) for a in ("lx", "ly")]
+        print("deadzone %.3f: clipped lx %d (%.1f%%), ly %d (%.1f%%)" %
+              (d, cl[0][0], cl[0][1] * 100, cl[1][0], cl[1][1] * 100))
+
+    ts_srv = np.asarray(tp["ts_srv"])
+    synced = ~np.isnan(ts_srv)
+    if fl is None or not synced.any():
+        print("(no server-clock timestamps or flight record: lag not available)")
+        return
+    t_cmd = ts_srv[synced]
+    cmd = np.stack([np.asarray(tp[a])[synced] for a in AXES])
+    ts = np.asarray(fl["ts"])
+    tgt = np.stack([np.asarray(fl["tgt_" + a]) for a in AXES])
+    cur = np.stack([np.asarray(fl["cur_" + a]) for a in AXES])
+    print("command -> target lag %s ms, command -> actuation lag %s ms" %
+          (_ms(xcorr_lag(t_cmd, cmd, ts, tgt)), _ms(xcorr_lag(t_cmd, cmd, ts, cur))))
+
+    if dz is not None or max_acc:
+        q = MapParams(deadzone=p.deadzone if dz is None else dz, max_vx=p.max_vx, max_vy=p.max_vy,
+                      hold_vw=p.hold_vw, invert_y=p.invert_y)
+        new = np.stack(map_vel(np.asarray(tp["lx"])[synced], np.asarray(tp["ly"])[synced],
+                               np.asarray(tp["lb"])[synced], np.asarray(tp["rb"])[synced], q))
+        tgt_new = sample_at(t_cmd, new, ts)
+        dt = np.diff(ts, prepend=ts[0] - (ts[1] - ts[0]))
+        acc = max_acc or list(estimate_max_acc(cur, dt))
+        rep = slew_replay(tgt_new, dt, np.asarray(acc))
+        secs, frac = saturation(tgt_new, rep, dt)
+        print("re-run deadzone %.3f MAX_ACC %s: " % (q.deadzone, ",".join("%g" % a for a in acc)) +
+              "  ".join("%s sat %.2fs (%.1f%%)" % (a, s, f * 100) for a, s, f in zip(AXES, secs, frac)))
+        print("                command -> actuation lag %s ms" % _ms(xcorr_lag(t_cmd, cmd, ts, rep)))
+
+
+def estimate_max_acc(cur, dt) -> "np.ndarray":
+    """Per-axis MAX_ACC the server flew with: the steepest recorded slope of cur."""
+    slope = np.abs(np.diff(np.asarray(cur), axis=-1)) / np.maximum(np.asarray(dt)[1:], 1e-6)
+    return slope.max(axis=-1) if slope.shape[-1] else np.ones(slope.shape[:-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NumPy analysis of flight recorder dumps and teleop logs")
+    ap.add_argument("flight", nargs="*", help="server flight_*.bin dumps")
+    ap.add_argument("--teleop", help="teleop_*.bin session log (tracelog.py)")
+    ap.add_argument("--hz", type=float, help="nominal loop rate (default: median tick period)")
+    ap.add_argument("--deadzone", type=float, help="re-run the stick mapping with this deadzone")
+    ap.add_argument("--max-acc", help="re-run the slew limiter with VX,VY,VW (norm/s)")
+    args = ap.parse_args()
+    if np is None:
+        print("analyze.py needs numpy: pip install numpy", file=sys.stderr)
+        sys.exit(2)
+    if not args.flight and not args.teleop:
+        ap.error("give at least one flight dump or --teleop")
+    max_acc = None
+    if args.max_acc:
+        max_acc = [float(x) for x in args.max_acc.split(",")]
+        if len(max_acc) != 3:
+            ap.error("--max-acc takes VX,VY,VW")
+
+    traces = report_flight(args.flight, args.hz) if args.flight else None
+    fl = traces[-1] if traces else None
+    if fl is not None:
+        report_slew(fl, max_acc)
+    if args.teleop:
+        tp = load_trace(args.teleop)
+        if len(tp):
+            report_teleop(tp, fl, args.deadzone, max_acc)
+        else:
+            print("no records in %s" % args.teleop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+clock.py
+NTP-style clock offset / RTT estimation against the Py2.6 server, using the
+server's 'ping' command:
+
+    t0 = client send, t1 = server receive, t2 = server reply, t3 = client receive
+    offset = ((t1 - t0) + (t2 - t3)) / 2      (server clock - client clock)
+    rtt    = (t3 - t0) - (t2 - t1)
+
+The estimate is taken from the lowest-RTT sample of a sliding window, which
+is the one least disturbed by queueing.
+"""
+
+import time
+import socket
+from collections import deque
+from typing import Optional, Dict, Any, Callable
+
+from net import send_json_line, recv_json_line
+
+
+class ClockSync(object):
+    def __init__(self, window: int = 8):
+        self._samples = deque(maxlen=max(1, int(window)))  # (rtt, offset, t3)
+        self.offset = 0.0
+        self.rtt = None  # type: Optional[float]
+        self.updated_ts = 0.0
+
+    def add_sample(self, t0: float, t1: float, t2: float, t3: float) -> None:
+        rtt = max(0.0, (t3 - t0) - (t2 - t1))
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0
+        self._samples.append((rtt, offset, t3))
+        best = min(self._samples)
+        self.rtt, self.offset = best[0], best[1]
+        self.updated_ts = t3
+
+    def sync(self, sock: socket.socket, n: int = 1) -> None:
+        """Run n ping exchanges on an idle request/reply socket."""
+        def request(msg):
+            send_json_line(sock, msg)
+            return recv_json_line(sock)
+        self.sync_with(request, n)
+
+    def sync_with(self, request: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]], n: int = 1) -> None:
+        """Same as sync(), over any request(msg) -> reply callable (e.g. ServerLink.call)."""
+        for _ in range(max(1, int(n))):
+            t0 = time.time()
+            rep = request({"cmd": "ping", "args": {"t0": t0}})
+            t3 = time.time()
+            data = (rep or {}).get("data") or {}
+            if "pong" not in data:
+                continue
+            t2 = float(data["pong"])
+            t1 = float(data.get("t1", t2))
+            self.add_sample(t0, t1, t2, t3)
+
+    def due(self, interval_s: float) -> bool:
+        return (time.time() - self.updated_ts) >= interval_s
+
+    def synced(self) -> bool:
+        return self.rtt is not None
+
+    def to_server(self, t: float) -> float:
+        """Client timestamp -> server clock."""
+        return t + self.offset
+
+    def now_server(self) -> float:
+        return time.time() + self.offset
+
+    def estimate(self) -> Dict[str, Any]:
+        return {"offset_s": self.offset, "rtt_s": self.rtt,
+                "samples": len(self._samples), "updated_ts": self.updated_ts}
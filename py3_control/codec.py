@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+codec.py
+JSON codec used by net.py, picked once at import time (fastest available):
+orjson, then ujson, then stdlib json with a reused compact encoder.
+config.JSON_CODEC can force one by name. NaN / Infinity are sent as null
+with every codec (orjson's behaviour; they are not JSON).
+
+Run this file to benchmark every available codec:  python codec.py
+"""
+
+import json
+import math
+import time
+from typing import Any, Callable, List, Tuple
+
+import config
+
+Codec = Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+def _orjson() -> Codec:
+    import orjson
+    return ("orjson", orjson.dumps, orjson.loads)
+
+
+def _ujson() -> Codec:
+    import ujson
+    return ("ujson", lambda o: ujson.dumps(o).encode("utf-8"), ujson.loads)
+
+
+def _stdlib() -> Codec:
+    enc = json.JSONEncoder(separators=(",", ":"), allow_nan=False)
+    return ("json", lambda o: enc.encode(o).encode("utf-8"), json.loads)
+
+
+_PREFERENCE = (_orjson, _ujson, _stdlib)
+
+
+def available() -> List[Codec]:
+    """[(name, dumps -> bytes, loads)] for every importable codec, fastest first."""
+    out = []
+    for make in _PREFERENCE:
+        try:
+            out.append(make())
+        except ImportError:
+            pass
+    return out
+
+
+def _select() -> Codec:
+    codecs = available()
+    forced = getattr(config, "JSON_CODEC", None)
+    if forced:
+        for c in codecs:
+            if c[0] == forced:
+                return c
+        print("[CODEC] %r not available, using %s" % (forced, codecs[0][0]))
+    return codecs[0]
+
+
+NAME, _dumps_bytes, loads = _select()
+
+
+def _finite(o: Any) -> Any:
+    # o with every NaN / Infinity float replaced by None
+    if isinstance(o, float):
+        return o if math.isfinite(o) else None
+    if isinstance(o, dict):
+        return {k: _finite(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_finite(v) for v in o]
+    return o
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    try:
+        return _dumps_bytes(obj)
+    except (ValueError, OverflowError):
+        # non-finite float somewhere (ujson / stdlib refuse them)
+        return _dumps_bytes(_finite(obj))
+
+
+def _bench(n: int = 20000) -> None:
+    msgs = [
+        {"cmd": "set_target", "seq": 1234, "ts": 1700000000.123456,
+         "args": {"vx_n": 0.4321, "vy_n": -0.1234, "vw_n": 0.0}},
+        {"cmd": "set_head", "seq": 1234, "ts": 1700000000.123456,
+         "args": {"yaw_n": 0.25, "pitch_n": -0.5}},
+        {"ok": True, "rid": 7, "data": {
+            "target": {"vx_n": 0.4321, "vy_n": -0.1234, "vw_n": 0.0},
+            "current": {"vx_n": 0.4, "vy_n": -0.1, "vw_n": 0.0},
+            "until_ts": 0.0, "last_update_ts": 1700000000.123456}},
+    ]
+    print("%-10s %12s %12s" % ("codec", "enc msg/s", "dec msg/s"))
+    for name, enc, dec in available():
+        lines = [enc(m) for m in msgs]
+        t0 = time.perf_counter()
+        for _ in range(n):
+            for m in msgs:
+                enc(m)
+        t_enc = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(n):
+            for line in lines:
+                dec(line)
+        t_dec = time.perf_counter() - t0
+        k = float(n * len(msgs))
+        print("%-10s %12.0f %12.0f" % (name, k / t_enc, k / t_dec))
+    print("selected: %s" % NAME)
+
+
+if __name__ == "__main__":
+    _bench()
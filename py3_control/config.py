@@ -30,4 +30,38 @@ AXIS_SCALE_LY = -1.0            # multiply normalized LY by this
 
 # Right stick sensitivity
 HEAD_YAW_SCALE   = 0.8   # 0–1 multiplier
-HEAD_PITCH_SCALE = 0.8
\ No newline at end of file
+HEAD_PITCH_SCALE = 0.8
+
+# Clock sync with the server (NTP-style over 'ping', see clock.py)
+CLOCK_SYNC_INTERVAL_S = 2.0       # 0 disables periodic resync
+CLOCK_SYNC_WINDOW = 8             # keep the min-RTT sample of the last N
+CLOCK_SYNC_PRINT = False
+
+# Motion frames older than this (server clock) are dropped by the server
+CMD_MAX_AGE_S = 0.3
+
+# JSON codec (codec.py): None = fastest available (orjson > ujson > json)
+JSON_CODEC = None
+
+# Connection manager (link.py)
+LINK_CONNECT_TIMEOUT_S = 1.0
+LINK_REPLY_TIMEOUT_S = 0.5        # no reply within this -> link considered dead
+LINK_HEARTBEAT_S = 1.0            # ping if nothing received for this long
+LINK_BACKOFF_MIN_S = 0.05         # reconnect backoff (jittered, doubling)
+LINK_BACKOFF_MAX_S = 2.0
+
+# Same-host shared-memory transport for motion/head frames (shm.py);
+# must match LOCAL_SHM_PATH in py26_naoqi/config.py. None = TCP only.
+LOCAL_SHM_PATH = None
+
+# Hot reload: config.py is re-read when its mtime changes (0 disables)
+CONFIG_WATCH_S = 1.0
+
+# Camera stream (server VIDEO_ENABLED must be True)
+VIDEO_PORT = 40101
+
+# Print the server's ALMemory alerts (fall, bumpers, battery) as they arrive
+SUBSCRIBE_EVENTS = True
+
+# Per-tick teleop session log (tracelog.py) for analyze.py; None disables
+TELEOP_LOG_DIR = None
@@ -4,8 +4,12 @@ import threading
 from typing import Dict, Any
 
 import config
-from net import connect, send_json_line, recv_json_line
-from mapping import MapParams, map_state_to_vel
+from mapping import map_state_to_vel
+from clock import ClockSync
+from link import ServerLink
+import shm
+import tracelog
+from settings import ControllerSettings, ConfigWatcher
 
 # Shared gamepad state (left stick + LB/RB only)
 class PadState(object):
@@ -102,45 +106,98 @@ def run_controller():
     t.daemon = True
     t.start()
 
-    # Connect to NAO server
-    sock = connect(config.HOST, config.PORT, timeout=3.0)
-    if config.GAMEPAD_SET_DEADMAN_ON_START:
-        send_json_line(sock, {"cmd":"set_deadman","args":{"enabled":True}})
-        try: _ = recv_json_line(sock)
-        except Exception: pass
-
-    params = MapParams(
-        deadzone=config.STICK_DEADZONE,
-        max_vx=config.MAX_VX_NORM,
-        max_vy=config.MAX_VY_NORM,
-        hold_vw=config.HOLD_VW_NORM,
-        invert_y=config.INVERT_Y,
-        debug=config.MAPPING_DEBUG
-    )
+    # Clock offset vs. server, refreshed periodically; commands carry a 'ts'
+    # stamp in server time so it can measure one-way latency.
+    clock = ClockSync(window=getattr(config, "CLOCK_SYNC_WINDOW", 8))
+    sync_every = float(getattr(config, "CLOCK_SYNC_INTERVAL_S", 2.0))
+    last_rep_lat = 0.0
+
+    def restore_session(lk):
+        # runs on every (re)connect, before any motion frame is sent
+        if config.GAMEPAD_SET_DEADMAN_ON_START:
+            lk.call({"cmd":"set_deadman","args":{"enabled":True}})
+        clock.sync_with(lk.call, n=4)
+        if getattr(config, "SUBSCRIBE_EVENTS", True):
+            lk.call({"cmd": "subscribe_events"})
+
+    def on_event(ev):
+        # pushed by the server: fall / bumper / battery (server already stopped on a fall)
+        rep = " (x%d)" % (ev["repeats"] + 1) if ev.get("repeats") else ""
+        print("[ALERT] %s: %s = %r%s" % (ev.get("kind"), ev.get("event"), ev.get("value"), rep))
+
+    # Connect to NAO server (reconnects by itself, see link.py)
+    link = ServerLink(config.HOST, config.PORT,
+                      connect_timeout=getattr(config, "LINK_CONNECT_TIMEOUT_S", 1.0),
+                      reply_timeout=getattr(config, "LINK_REPLY_TIMEOUT_S", 0.5),
+                      heartbeat_s=getattr(config, "LINK_HEARTBEAT_S", 1.0),
+                      backoff_s=(getattr(config, "LINK_BACKOFF_MIN_S", 0.05),
+                                 getattr(config, "LINK_BACKOFF_MAX_S", 2.0)),
+                      on_connect=restore_session,
+                      on_event=on_event)
+    if not link.ensure():
+        print("[GAMEPAD] server %s:%d not reachable (%s), retrying..." %
+              (config.HOST, config.PORT, link.last_error))
+
+    # Same host: motion/head frames go through shared memory, TCP keeps
+    # the control commands (deadman, clock sync, heartbeat).
+    shm_out = None
+    if getattr(config, "LOCAL_SHM_PATH", None):
+        shm_out = shm.ShmWriter(config.LOCAL_SHM_PATH)
+        print("[GAMEPAD] motion frames via shared memory %s" % config.LOCAL_SHM_PATH)
+    # seq + max_age_s let the server drop frames replayed after a link stall
+    seq = 0
+    max_age = getattr(config, "CMD_MAX_AGE_S", None)
+
+    # Per-tick values come from a snapshot, swapped when config.py is edited
+    cs = ControllerSettings.from_config(config)
+    watcher = ConfigWatcher(config, interval_s=getattr(config, "CONFIG_WATCH_S", 1.0))
 
     print("[GAMEPAD] inputs backend (mode=%s) streaming to %s:%d at %.1f Hz" %
-          (config.AXIS_MODE, config.HOST, config.PORT, config.LOOP_HZ))
-    dt = 1.0 / float(config.LOOP_HZ)
+          (config.AXIS_MODE, config.HOST, config.PORT, cs.loop_hz))
+    dt = cs.dt
     last_print = 0.0
 
+    # Optional per-tick session log for offline analysis (analyze.py)
+    trace = None
+    if getattr(config, "TELEOP_LOG_DIR", None):
+        trace = tracelog.TraceWriter(tracelog.session_path(config.TELEOP_LOG_DIR))
+        print("[GAMEPAD] logging session to %s" % trace.path)
+
     try:
         while True:
             t0 = time.time()
+            new = watcher.poll()
+            if new is not None:
+                cs = new
+                dt = cs.dt
+            if not link.ensure() and shm_out is None:
+                # down: wait for the next backoff slot, nothing is queued
+                time.sleep(dt)
+                continue
+            if sync_every > 0.0 and clock.due(sync_every):
+                try:
+                    clock.sync_with(link.call)
+                    if getattr(config, "CLOCK_SYNC_PRINT", False):
+                        est = clock.estimate()
+                        print("[CLOCK] offset={:+.1f} ms rtt={:.1f} ms reply={:.1f} ms".format(
+                            est["offset_s"] * 1000.0, (est["rtt_s"] or 0.0) * 1000.0, last_rep_lat * 1000.0))
+                except Exception:
+                    pass
             st = pad.snapshot()
-            vx, vy, vw = map_state_to_vel(st, params)
+            vx, vy, vw = map_state_to_vel(st, cs.map_params)
 
             # --- Head control (right stick) ---
             rx = st["axes"].get("RX", 0.0)
             ry = st["axes"].get("RY", 0.0)
 
             # Deadzone
-            if abs(rx) < config.STICK_DEADZONE: rx = 0.0
-            if abs(ry) < config.STICK_DEADZONE: ry = 0.0
+            if abs(rx) < cs.deadzone: rx = 0.0
+            if abs(ry) < cs.deadzone: ry = 0.0
             # invert Y so up = look up
-            ry = -ry if config.INVERT_Y else ry
+            ry = -ry if cs.invert_y else ry
 
-            rx *= getattr(config, "HEAD_YAW_SCALE", 1.0)
-            ry *= getattr(config, "HEAD_PITCH_SCALE", 1.0)
+            rx *= cs.head_yaw_scale
+            ry *= cs.head_pitch_scale
 
 
             # Debug readout (throttled)
@@ -151,21 +208,38 @@ def run_controller():
                 ))
                 last_print = time.time()
 
-            send_json_line(sock, {"cmd":"set_target", "args":{"vx_n":vx, "vy_n":vy, "vw_n":vw}})
-            try: _ = recv_json_line(sock)
-            except Exception: pass
-
-
-
-
-
-
-            
-            try:
-                send_json_line(sock, {"cmd": "set_head", "args": {"yaw_n": rx, "pitch_n": ry}})
-                _ = recv_json_line(sock)
-            except Exception:
-                pass
+            if trace is not None:
+                now = time.time()
+                ax = st["axes"]; btn = st["buttons"]
+                trace.record(clock.to_server(now) if clock.synced() else float("nan"), now,
+                             ax.get("LX", 0.0), ax.get("LY", 0.0),
+                             float(btn.get("LB", False)), float(btn.get("RB", False)),
+                             vx, vy, vw, rx, ry)
+
+            if shm_out is not None:
+                shm_out.publish(vx, vy, vw, rx, ry)
+                link.heartbeat()
+                sleep_t = dt - (time.time() - t0)
+                if sleep_t > 0: time.sleep(sleep_t)
+                continue
+
+            t_send = time.time()
+            seq += 1
+            msg = {"cmd":"set_target", "seq": seq, "args":{"vx_n":vx, "vy_n":vy, "vw_n":vw}}
+            if clock.synced():
+                msg["ts"] = clock.to_server(t_send)
+                if max_age:
+                    msg["max_age_s"] = max_age
+            if link.request(msg) is not None:
+                last_rep_lat = time.time() - t_send
+
+            msg = {"cmd": "set_head", "seq": seq, "args": {"yaw_n": rx, "pitch_n": ry}}
+            if clock.synced():
+                msg["ts"] = clock.now_server()
+                if max_age:
+                    msg["max_age_s"] = max_age
+            link.request(msg)
+            link.heartbeat()
 
 
 
@@ -174,11 +248,15 @@ def run_controller():
     except KeyboardInterrupt:
         print("\n[GAMEPAD] stopping...")
         stop_evt.set()
-        try:
-            send_json_line(sock, {"cmd":"stop"}); _ = recv_json_line(sock)
-        except Exception: pass
+        if shm_out is not None:
+            shm_out.command(shm.CMD_STOP)
+        if link.connected():
+            link.request({"cmd":"stop"})
     finally:
-        try: sock.close()
-        except Exception: pass
+        link.close()
+        if trace is not None:
+            trace.close()
+        if shm_out is not None:
+            shm_out.close()
         try: t.join(1.0)
         except Exception: pass
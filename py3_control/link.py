@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+link.py
+Request/reply connection to the Py2.6 server that survives server restarts
+and Wi-Fi drops. A send error, a reply timeout or a missed heartbeat closes
+the socket; the next request reconnects with jittered exponential backoff,
+replays the session state through on_connect and carries on. Nothing is
+queued while the link is down, so no backlog of stale commands is flushed
+after a reconnect.
+
+Event frames the server pushes between replies ({"event": ...}, after a
+'subscribe_events') are handed to on_event while waiting for a reply.
+"""
+
+import random
+import socket
+import time
+from typing import Any, Callable, Dict, Optional
+
+from net import connect, send_json_line, recv_json_line
+
+
+class LinkDown(ConnectionError):
+    pass
+
+
+class ServerLink(object):
+    def __init__(self, host: str, port: int,
+                 connect_timeout: float = 1.0,
+                 reply_timeout: float = 0.5,
+                 heartbeat_s: float = 1.0,
+                 backoff_s=(0.05, 2.0),
+                 on_connect: Optional[Callable[["ServerLink"], None]] = None,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.reply_timeout = reply_timeout
+        self.heartbeat_s = heartbeat_s
+        self.backoff_min, self.backoff_max = float(backoff_s[0]), float(backoff_s[1])
+        self.on_connect = on_connect
+        self.on_event = on_event
+
+        self.sock = None  # type: Optional[socket.socket]
+        self._next_try = 0.0
+        self._delay = self.backoff_min
+        self._down_since = None  # type: Optional[float]
+        self._last_rx = 0.0
+        self.connects = 0
+        self.last_outage_s = None  # type: Optional[float]
+        self.last_error = None  # type: Optional[str]
+
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def ensure(self) -> bool:
+        """Connect if down and the backoff allows it. Returns True when up."""
+        if self.sock is not None:
+            return True
+        now = time.time()
+        if now < self._next_try:
+            return False
+        if self._down_since is None:
+            self._down_since = now
+        try:
+            s = connect(self.host, self.port, timeout=self.connect_timeout)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            s.settimeout(self.reply_timeout)
+            self.sock = s
+            self._last_rx = time.time()
+            if self.on_connect is not None:
+                self.on_connect(self)  # restore session state
+        except LinkDown:
+            return False  # already dropped by call()
+        except Exception as e:
+            self._drop(e)
+            return False
+        self.last_outage_s = time.time() - self._down_since
+        if self.connects:
+            print("[LINK] reconnected to %s:%d in %.0f ms" %
+                  (self.host, self.port, self.last_outage_s * 1000.0))
+        self.connects += 1
+        self._down_since = None
+        self._delay = self.backoff_min
+        return True
+
+    def call(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Send msg, wait for its reply. Raises LinkDown (and drops the link) on failure."""
+        if self.sock is None:
+            raise LinkDown("not connected")
+        try:
+            send_json_line(self.sock, msg)
+            rep = recv_json_line(self.sock)
+            while rep is not None and "event" in rep:
+                if self.on_event is not None:
+                    self.on_event(rep)
+                rep = recv_json_line(self.sock)
+        except Exception as e:
+            self._drop(e)
+            raise LinkDown(str(e))
+        if rep is None:
+            self._drop("connection closed by server")
+            raise LinkDown("connection closed by server")
+        self._last_rx = time.time()
+        return rep
+
+    def request(self, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Like call(), but reconnects first and returns None instead of raising."""
+        if not self.ensure():
+            return None
+        try:
+            return self.call(msg)
+        except LinkDown:
+            return None
+
+    def heartbeat(self) -> None:
+        """Ping if nothing was received for heartbeat_s, to notice a silent link."""
+        if self.sock is not None and self.heartbeat_s > 0.0 and \
+                time.time() - self._last_rx > self.heartbeat_s:
+            self.request({"cmd": "ping"})
+
+    def _drop(self, err) -> None:
+        if self.sock is not None:
+            print("[LINK] connection lost: %s" % (err,))
+            try: self.sock.close()
+            except Exception: pass
+        self.sock = None
+        self.last_error = str(err)
+        if self._down_since is None:
+            self._down_since = time.time()
+        self._next_try = time.time() + self._delay * random.uniform(0.5, 1.5)
+        self._delay = min(self._delay * 2.0, self.backoff_max)
+
+    def close(self) -> None:
+        if self.sock is not None:
+            try: self.sock.close()
+            except Exception: pass
+        self.sock = None
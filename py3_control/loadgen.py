@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+loadgen.py
+Multi-client load / soak test for the Py2.6 server. Opens N connections,
+each sending a weighted mix of commands at a fixed rate for a fixed time,
+then reports throughput, reply-latency percentiles, errors, connection
+failures and (if the server exposes it) control-loop timing from 'metrics'.
+
+Without a robot, run the server on simulated NAOqi:
+    python2 ../py26_naoqi/server.py --sim
+    python3 loadgen.py --clients 8 --rate 40 --duration 30
+or let loadgen start it:  python3 loadgen.py --spawn python2 ...
+Compare control-loop jitter with the two-process server:
+    python3 loadgen.py --spawn python2 --server-args=--split ...
+"""
+
+import argparse
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import config
+from net import connect, send_json_line, recv_json_line
+
+DEFAULT_MIX = "set_target=10,set_head=10,ping=1,posture=0.05"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        name = name.strip()
+        if name:
+            try:
+                weight = float(w) if w else 1.0
+            except ValueError:
+                raise ValueError("bad weight for %s: %r" % (name, w))
+            if not math.isfinite(weight) or weight < 0.0:
+                raise ValueError("weight for %s must be a finite number >= 0: %r" % (name, w))
+            mix[name] = weight
+    if not mix or sum(mix.values()) <= 0.0:
+        raise ValueError("empty command mix: %r" % spec)
+    return mix
+
+
+def make_msg(cmd: str, seq: int, rng: random.Random) -> Dict:
+    if cmd == "set_target":
+        return {"cmd": cmd, "seq": seq, "args": {"vx_n": rng.uniform(-1, 1) * 0.2,
+                                                 "vy_n": rng.uniform(-1, 1) * 0.2,
+                                                 "vw_n": rng.uniform(-1, 1) * 0.2}}
+    if cmd == "set_head":
+        return {"cmd": cmd, "seq": seq, "args": {"yaw_n": rng.uniform(-1, 1),
+                                                 "pitch_n": rng.uniform(-1, 1)}}
+    if cmd == "posture":
+        return {"cmd": cmd, "args": {"name": rng.choice(["StandInit", "Crouch"]), "speed": 0.5}}
+    return {"cmd": cmd}
+
+
+class ClientStats(object):
+    def __init__(self):
+        self.lat = {}  # type: Dict[str, List[float]]
+        self.sent = 0
+        self.errors = 0
+        self.conn_failures = 0
+
+
+def client_worker(idx: int, host: str, port: int, mix: Dict[str, float], rate: float,
+                  t_end: float, reply_timeout: float, st: ClientStats) -> None:
+    rng = random.Random(idx)
+    names = list(mix.keys())
+    weights = [mix[n] for n in names]
+    period = 1.0 / rate if rate > 0 else 0.0
+    sock = None  # type: Optional[socket.socket]
+    seq = 0
+    next_t = time.time() + rng.uniform(0.0, period)  # spread clients over the period
+    while time.time() < t_end:
+        if sock is None:
+            try:
+                sock = connect(host, port, timeout=2.0)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.settimeout(reply_timeout)
+            except Exception:
+                st.conn_failures += 1
+                time.sleep(0.2)
+                continue
+        seq += 1
+        cmd = rng.choices(names, weights)[0]
+        t0 = time.time()
+        try:
+            send_json_line(sock, make_msg(cmd, seq, rng))
+            rep = recv_json_line(sock)
+        except Exception:
+            rep = None
+        st.sent += 1
+        if rep is None:
+            st.conn_failures += 1
+            try: sock.close()
+            except Exception: pass
+            sock = None
+            continue
+        st.lat.setdefault(cmd, []).append(time.time() - t0)
+        if not rep.get("ok"):
+            st.errors += 1
+        if period:
+            next_t += period
+            wait = next_t - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                next_t = time.time()  # fell behind: don't burst to catch up
+    if sock is not None:
+        try: sock.close()
+        except Exception: pass
+
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, int(q * len(sorted_vals)))
+    return sorted_vals[i]
+
+
+def fetch_metrics(host: str, port: int) -> Optional[Dict]:
+    try:
+        s = connect(host, port, timeout=2.0)
+        s.settimeout(5.0)
+        try:
+            send_json_line(s, {"cmd": "metrics"})
+            rep = recv_json_line(s)
+        finally:
+            s.close()
+        return rep.get("data") if rep and rep.get("ok") else None
+    except Exception:
+        return None
+
+
+def report(stats: List[ClientStats], elapsed: float, host: str, port: int) -> None:
+    lat = {}  # type: Dict[str, List[float]]
+    sent = errors = conn_fail = 0
+    for st in stats:
+        sent += st.sent
+        errors += st.errors
+        conn_fail += st.conn_failures
+        for k, v in st.lat.items():
+            lat.setdefault(k, []).extend(v)
+    replies = sum(len(v) for v in lat.values())
+    print("\n== load: %d clients, %.1fs ==" % (len(stats), elapsed))
+    print("sent %d, replies %d (%.1f msg/s), errors %d, connection failures %d" %
+          (sent, replies, replies / elapsed if elapsed else 0.0, errors, conn_fail))
+    print("%-12s %8s %9s %9s %9s %9s" % ("cmd", "n", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for k in sorted(lat):
+        v = sorted(lat[k])
+        print("%-12s %8d %9.2f %9.2f %9.2f %9.2f" % (
+            k, len(v), _pct(v, 0.5) * 1e3, _pct(v, 0.9) * 1e3, _pct(v, 0.99) * 1e3, v[-1] * 1e3))
+
+    m = fetch_metrics(host, port)
+    loop = (m or {}).get("loop")
+    if not loop:
+        print("(server loop timing not available)")
+        return
+    print("\n== server control loop ==")
+    for k in sorted(loop):
+        h = loop[k]
+        print("%-10s n=%d mean=%.2f ms p99<=%s ms max=%.2f ms" % (
+            k, h["count"], h["mean_s"] * 1e3,
+            "%.1f" % (h["p99_s"] * 1e3) if h["p99_s"] is not None else "-", h["max_s"] * 1e3))
+
+
+def spawn_server(python2: str, host: str, port: int, extra: List[str]) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    srv = os.path.join(here, os.pardir, "py26_naoqi", "server.py")
+    p = subprocess.Popen([python2, srv, "--sim"] + extra, cwd=os.path.dirname(srv))
+    t_end = time.time() + 10.0
+    while time.time() < t_end:
+        try:
+            connect(host, port, timeout=0.5).close()
+            return p
+        except Exception:
+            time.sleep(0.1)
+    p.terminate()
+    raise RuntimeError("simulated server did not come up on %s:%d" % (host, port))
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Multi-client load generator for the NAO Py2.6 server")
+    ap.add_argument("--host", default=config.HOST)
+    ap.add_argument("--port", type=int, default=config.PORT)
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--rate", type=float, default=20.0, help="messages/s per client (0 = as fast as possible)")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="weighted command mix, e.g. '%s'" % DEFAULT_MIX)
+    ap.add_argument("--reply-timeout", type=float, default=5.0)
+    ap.add_argument("--spawn", metavar="PYTHON2", help="start server.py --sim with this interpreter")
+    ap.add_argument("--server-args", default="", help="extra server.py arguments for --spawn, e.g. --split")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(2)
+
+    srv = spawn_server(args.spawn, args.host, args.port, args.server_args.split()) if args.spawn else None
+    try:
+        # reset server-side histograms so the report only covers this run
+        try:
+            s = connect(args.host, args.port, timeout=2.0)
+            send_json_line(s, {"cmd": "metrics", "args": {"reset": True}})
+            recv_json_line(s)
+            s.close()
+        except Exception:
+            pass
+
+        stats = [ClientStats() for _ in range(args.clients)]
+        t_start = time.time()
+        t_end = t_start + args.duration
+        threads = []
+        for i in range(args.clients):
+            th = threading.Thread(target=client_worker,
+                                  args=(i, args.host, args.port, mix, args.rate, t_end,
+                                        args.reply_timeout, stats[i]))
+            th.daemon = True
+            th.start()
+            threads.append(th)
+        print("[LOAD] %d clients x %.1f msg/s for %.1fs, mix %s" %
+              (args.clients, args.rate, args.duration, mix))
+        for th in threads:
+            th.join(args.duration + args.reply_timeout + 5.0)
+        report(stats, time.time() - t_start, args.host, args.port)
+    finally:
+        if srv is not None:
+            srv.terminate()
+            try: srv.wait(5.0)
+            except Exception: srv.kill()
+
+
+if __name__ == "__main__":
+    main()
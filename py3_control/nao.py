@@ -3,6 +3,8 @@
 import argparse
 import json
 import sys
+import threading
+import time
 
 import config
 from net import connect, send_json_line, recv_json_line
@@ -49,15 +51,124 @@ def repl(host: str, port: int) -> None:
     finally:
         s.close()
 
+def _script_steps(path: str):
+    """Yields (line_no, msg) from an NDJSON script; '#' comments and blanks skipped."""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                msg = json.loads(line)
+            except Exception as e:
+                raise ValueError("line %d: invalid JSON: %s" % (n, e))
+            if not isinstance(msg, dict):
+                raise ValueError("line %d: expected a JSON object, got %s" % (n, type(msg).__name__))
+            if "cmd" not in msg and "wait" not in msg:
+                raise ValueError("line %d: needs \"cmd\" or \"wait\"" % n)
+            if "cmd" not in msg:
+                try:
+                    msg["wait"] = float(msg["wait"])
+                except (TypeError, ValueError):
+                    raise ValueError("line %d: \"wait\" must be a number of seconds" % n)
+            yield n, msg
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def run_script(host: str, port: int, path: str, inflight: int = 8) -> int:
+    """
+    Streams an NDJSON script over one connection. Commands are pipelined (up
+    to 'inflight' unanswered, matched back by rid); {"wait": seconds} waits
+    for all pending replies, then sleeps. Replies are printed in script order
+    with their latency. Returns the number of failed commands.
+    """
+    s = connect(host, port)
+    window = threading.Semaphore(max(1, inflight))
+    lock = threading.Lock()
+    drained = threading.Condition(lock)
+    pending = {}   # rid -> (idx, t_send, user_rid)
+    done = {}      # idx -> line to print
+    state = {"next": 0, "errors": 0, "closed": False}
+
+    def flush():
+        while state["next"] in done:
+            print(done.pop(state["next"]), flush=True)
+            state["next"] += 1
+
+    def reader():
+        while True:
+            try:
+                rep = recv_json_line(s)
+            except Exception:
+                rep = None
+            t = time.time()
+            with lock:
+                if rep is None:
+                    state["closed"] = True
+                    drained.notify_all()
+                    # wake the sender if it is waiting for a free slot
+                    for _ in range(max(1, inflight)):
+                        window.release()
+                    return
+                ent = pending.pop(rep.get("rid"), None)
+                if ent is None:
+                    continue
+                idx, t_send, user_rid = ent
+                rep["rid"] = user_rid
+                if not rep.get("ok"):
+                    state["errors"] += 1
+                done[idx] = "%4d %8.2f ms %s" % (idx, (t - t_send) * 1000.0, json.dumps(rep))
+                flush()
+                drained.notify_all()
+            window.release()
+
+    th = threading.Thread(target=reader)
+    th.daemon = True
+    th.start()
+
+    t_start = time.time()
+    idx = 0
+    try:
+        for line_no, msg in _script_steps(path):
+            if "wait" in msg and "cmd" not in msg:
+                with lock:
+                    while pending and not state["closed"]:
+                        drained.wait()
+                time.sleep(float(msg["wait"]))
+                continue
+            window.acquire()
+            with lock:
+                if state["closed"]:
+                    print("! connection closed by server at line %d" % line_no, file=sys.stderr)
+                    break
+                pending[idx] = (idx, time.time(), msg.get("rid"))
+            msg["rid"] = idx
+            send_json_line(s, msg)
+            idx += 1
+        with lock:
+            while pending and not state["closed"]:
+                drained.wait()
+            lost = len(pending)
+    finally:
+        s.close()
+    elapsed = time.time() - t_start
+    print("[SCRIPT] %d commands in %.2fs (%.1f/s), %d errors, %d unanswered" %
+          (idx, elapsed, idx / elapsed if elapsed else 0.0, state["errors"], lost), file=sys.stderr)
+    return state["errors"] + lost
+
 def parse_args():
     ap = argparse.ArgumentParser(description="NDJSON client for NAO Py2.6 server")
     ap.add_argument("--host", default=config.HOST)
     ap.add_argument("--port", type=int, default=config.PORT)
     g = ap.add_mutually_exclusive_group(required=True)
-    g.add_argument("--preset", help="ping | wake | rest | stop | stand | crouch | deadman:on|off | target")
+    g.add_argument("--preset", help="ping | wake | rest | stop | metrics | reload_config | stand | crouch | deadman:on|off | target")
     g.add_argument("--json", help='Raw JSON string, e.g. \'{"cmd":"get_state"}\'')
     g.add_argument("--repl", action="store_true", help="Interactive mode")
     g.add_argument("--gamepad", action="store_true", help="Run Xbox controller loop (inputs backend)")
+    g.add_argument("--script", metavar="FILE", help="NDJSON commands over one connection ('-' = stdin)")
+    ap.add_argument("--inflight", type=int, default=8, help="for --script: max unanswered commands")
     ap.add_argument("--vx", type=float, help="for preset=target")
     ap.add_argument("--vy", type=float, help="for preset=target")
     ap.add_argument("--vw", type=float, help="for preset=target")
@@ -75,6 +186,14 @@ def main():
         repl(args.host, args.port)
         return
 
+    if args.script:
+        try:
+            failed = run_script(args.host, args.port, args.script, args.inflight)
+        except (OSError, ValueError) as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(2)
+        sys.exit(1 if failed else 0)
+
     if args.json:
         try:
             msg = json.loads(args.json)
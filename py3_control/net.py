@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
-import json
 import socket
 from typing import Optional, Dict, Any
 
+from codec import dumps_bytes, loads
+
 def connect(host: str, port: int, timeout: float = 3.0) -> socket.socket:
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.settimeout(timeout)
@@ -11,10 +12,7 @@ def connect(host: str, port: int, timeout: float = 3.0) -> socket.socket:
     return s
 
 def send_json_line(sock: socket.socket, obj: Dict[str, Any]) -> None:
-    line = json.dumps(obj)
-    if not line.endswith("\n"):
-        line += "\n"
-    _send_all(sock, line.encode("utf-8"))
+    _send_all(sock, dumps_bytes(obj) + b"\n")
 
 def recv_json_line(sock: socket.socket) -> Optional[Dict[str, Any]]:
     buf = bytearray()
@@ -23,15 +21,15 @@ def recv_json_line(sock: socket.socket) -> Optional[Dict[str, Any]]:
         if not b:
             if buf:
                 try:
-                    return json.loads(buf.decode("utf-8"))
+                    return loads(bytes(buf))
                 except Exception:
                     return None
             return None
         if b == b"\n":
-            line = buf.decode("utf-8").strip()
+            line = bytes(buf).strip()
             if not line:
                 return None
-            return json.loads(line)
+            return loads(line)
         buf += b
 
 def _send_all(sock: socket.socket, data: bytes) -> None:
@@ -14,7 +14,7 @@ def build(preset: str,
 
     if p == "ping":
         return {"cmd": "ping"}
-    if p in ("wake", "rest", "stop"):
+    if p in ("wake", "rest", "stop", "metrics", "reload_config"):
         return {"cmd": p}
     if p == "stand":
         return {"cmd": "posture",
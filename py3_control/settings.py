@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+settings.py
+Validated snapshot of the config values the gamepad loop reads every tick,
+plus a watcher that rebuilds it when config.py changes on disk. The loop
+swaps snapshots between ticks, so a reload never lands mid-tick and never
+drops the session.
+"""
+
+import importlib
+import os
+import time
+from typing import Optional
+
+from mapping import MapParams
+
+
+class ControllerSettings(object):
+    __slots__ = ("loop_hz", "dt", "deadzone", "invert_y",
+                 "head_yaw_scale", "head_pitch_scale", "map_params")
+
+    @classmethod
+    def from_config(cls, cfg) -> "ControllerSettings":
+        """Raises ValueError on invalid values."""
+        s = cls()
+        s.loop_hz = float(cfg.LOOP_HZ)
+        if s.loop_hz <= 0.0:
+            raise ValueError("LOOP_HZ must be > 0")
+        s.dt = 1.0 / s.loop_hz
+        s.deadzone = float(cfg.STICK_DEADZONE)
+        if not 0.0 <= s.deadzone < 1.0:
+            raise ValueError("STICK_DEADZONE must be in [0, 1)")
+        s.invert_y = bool(cfg.INVERT_Y)
+        s.head_yaw_scale = float(getattr(cfg, "HEAD_YAW_SCALE", 1.0))
+        s.head_pitch_scale = float(getattr(cfg, "HEAD_PITCH_SCALE", 1.0))
+        s.map_params = MapParams(
+            deadzone=s.deadzone,
+            max_vx=float(cfg.MAX_VX_NORM),
+            max_vy=float(cfg.MAX_VY_NORM),
+            hold_vw=float(cfg.HOLD_VW_NORM),
+            invert_y=s.invert_y,
+            debug=bool(cfg.MAPPING_DEBUG)
+        )
+        return s
+
+
+class ConfigWatcher(object):
+    """Polls the config module's file mtime; poll() returns a new snapshot after an edit."""
+    def __init__(self, cfg, interval_s: float = 1.0):
+        self.cfg = cfg
+        self.interval_s = interval_s
+        self._path = getattr(cfg, "__file__", None)
+        self._mtime = self._stat()
+        self._next = time.time() + interval_s
+
+    def _stat(self) -> float:
+        try:
+            return os.path.getmtime(self._path) if self._path else 0.0
+        except OSError:
+            return 0.0
+
+    def poll(self) -> Optional[ControllerSettings]:
+        now = time.time()
+        if self.interval_s <= 0.0 or now < self._next:
+            return None
+        self._next = now + self.interval_s
+        m = self._stat()
+        if m == self._mtime:
+            return None
+        self._mtime = m
+        try:
+            importlib.reload(self.cfg)
+            new = ControllerSettings.from_config(self.cfg)
+        except Exception as e:
+            print("[CONFIG] reload rejected, keeping previous settings: %s" % e)
+            return None
+        print("[CONFIG] reloaded %s" % self._path)
+        return new
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+shm.py
+Writer side of the same-host shared-memory transport. The layout is
+documented in py26_naoqi/shm.py and must stay identical.
+"""
+
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"NAOSHM1\0"
+VERSION = 1
+RING_SLOTS = 64
+SLOT_SIZE = 48
+
+_HDR = struct.Struct("<8sIIII")
+_SEQ = struct.Struct("<Q")
+_LATEST_DATA = struct.Struct("<6d")
+_SLOT_DATA = struct.Struct("<IIddd")
+OFF_LATEST = 64
+OFF_HEAD = 128
+OFF_RING = 192
+SIZE = OFF_RING + RING_SLOTS * SLOT_SIZE
+
+CMD_SET_DEADMAN = 1
+CMD_CENTER_HEAD = 2
+CMD_STOP = 3
+
+
+def open_map(path: str) -> mmap.mmap:
+    if not os.path.exists(path) or os.path.getsize(path) < SIZE:
+        with open(path, "wb") as f:
+            f.write(b"\0" * SIZE)
+    with open(path, "r+b") as f:
+        mm = mmap.mmap(f.fileno(), SIZE)
+    magic, version, slots, slot_size, _ = _HDR.unpack_from(mm, 0)
+    if magic != MAGIC:
+        mm[0:SIZE] = b"\0" * SIZE
+        _HDR.pack_into(mm, 0, MAGIC, VERSION, RING_SLOTS, SLOT_SIZE, 0)
+    elif version != VERSION or slots != RING_SLOTS or slot_size != SLOT_SIZE:
+        mm.close()
+        raise RuntimeError("shm layout mismatch in %s (v%d, %d x %d)" % (path, version, slots, slot_size))
+    return mm
+
+
+class ShmWriter(object):
+    """Publishes the latest motion/head frame and appends ring commands."""
+    def __init__(self, path: str):
+        self.path = path
+        self._mm = open_map(path)
+        self._seq = _SEQ.unpack_from(self._mm, OFF_LATEST)[0] & ~1
+        self._head = _SEQ.unpack_from(self._mm, OFF_HEAD)[0]
+
+    def publish(self, vx: float, vy: float, vw: float, yaw_n: float, pitch_n: float,
+                ts: float = None) -> None:
+        mm = self._mm
+        self._seq += 1                      # odd: write in progress
+        _SEQ.pack_into(mm, OFF_LATEST, self._seq)
+        _LATEST_DATA.pack_into(mm, OFF_LATEST + 8, time.time() if ts is None else ts,
+                               vx, vy, vw, yaw_n, pitch_n)
+        self._seq += 1                      # even: stable
+        _SEQ.pack_into(mm, OFF_LATEST, self._seq)
+
+    def command(self, code: int, a: float = 0.0, b: float = 0.0, c: float = 0.0) -> None:
+        mm = self._mm
+        k = self._head + 1
+        off = OFF_RING + (k % RING_SLOTS) * SLOT_SIZE
+        _SEQ.pack_into(mm, off, 0)          # invalidate while rewriting
+        _SLOT_DATA.pack_into(mm, off + 8, int(code), 0, a, b, c)
+        _SEQ.pack_into(mm, off, k)
+        self._head = k
+        _SEQ.pack_into(mm, OFF_HEAD, k)
+
+    def close(self) -> None:
+        try: self._mm.close()
+        except Exception: pass
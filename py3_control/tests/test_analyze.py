@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import analyze
+from analyze import np
+from mapping import MapParams, map_state_to_vel
+from tracelog import TraceWriter
+
+
+def _server_motion():
+    # py26_naoqi/motion.py: the limiter slew_replay re-implements
+    path = os.path.join(HERE, "..", "..", "py26_naoqi", "motion.py")
+    spec = importlib.util.spec_from_file_location("server_motion", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class AnalyzeTest(unittest.TestCase):
+    def test_map_vel_matches_mapping(self):
+        rng = random.Random(1)
+        p = MapParams(deadzone=0.15, max_vx=0.8, max_vy=0.6, hold_vw=0.5, invert_y=True)
+        rows = [(rng.uniform(-1.2, 1.2), rng.uniform(-1.2, 1.2), rng.random() < 0.3, rng.random() < 0.3)
+                for _ in range(200)]
+        lx, ly, lb, rb = (np.array([r[i] for r in rows], dtype=float) for i in range(4))
+        vx, vy, vw = analyze.map_vel(lx, ly, lb, rb, p)
+        for i, (x, y, l, r) in enumerate(rows):
+            want = map_state_to_vel({"axes": {"LX": x, "LY": y}, "buttons": {"LB": l, "RB": r}}, p)
+            self.assertAlmostEqual(vx[i], want[0])
+            self.assertAlmostEqual(vy[i], want[1])
+            self.assertAlmostEqual(vw[i], want[2])
+
+    def test_slew_replay_matches_server_limiter(self):
+        motion = _server_motion()
+        rng = random.Random(2)
+        n = 300
+        tgt = np.array([[rng.choice((-1.0, 0.0, 0.4, 1.0)) for _ in range(n)] for _ in range(3)])
+        dt = np.array([rng.uniform(0.015, 0.03) for _ in range(n)])
+        acc = (1.5, 1.5, 3.0)
+        out = analyze.slew_replay(tgt, dt, acc)
+        for axis in range(3):
+            lim = motion.SlewRateLimiter(acc[axis])
+            ref = [lim.step(tgt[axis, k], dt[k]) for k in range(n)]
+            np.testing.assert_allclose(out[axis], ref)
+
+    def test_xcorr_lag_finds_delay(self):
+        # stick-like steps: a sharp correlation peak, unlike a few sines
+        rng = np.random.RandomState(3)
+        t = np.arange(0.0, 20.0, 0.02)
+        a = np.repeat(rng.uniform(-1.0, 1.0, len(t) // 25), 25)
+        lag = analyze.xcorr_lag(t, a[None, :], t + 0.12, a[None, :])
+        self.assertAlmostEqual(lag, 0.12, delta=0.002)
+
+    def test_sample_at_zero_order_hold(self):
+        out = analyze.sample_at(np.array([1.0, 2.0, 3.0]), np.array([10.0, 20.0, 30.0]),
+                                np.array([0.5, 1.0, 2.5, 9.0]))
+        self.assertEqual(list(out), [0.0, 10.0, 20.0, 30.0])
+
+    def test_load_trace_complete_and_cut_short(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "t.bin")
+            w = TraceWriter(path, fields=("ts", "x"), flush_every=1)
+            for i in range(5):
+                w.record(float(i), float(i) * 2)
+            w.close()
+            tr = analyze.load_trace(path)
+            self.assertEqual(list(tr["x"]), [0.0, 2.0, 4.0, 6.0, 8.0])
+            del tr
+            # crash: n_records still 0, last record half written
+            w = TraceWriter(os.path.join(d, "cut.bin"), fields=("ts", "x"), flush_every=1)
+            for i in range(3):
+                w.record(float(i), 1.0)
+            w._f.write(b"\0" * 4)
+            w._f.flush()
+            tr = analyze.load_trace(w.path)
+            self.assertEqual(list(tr["ts"]), [0.0, 1.0, 2.0])
+            del tr
+            w._f.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
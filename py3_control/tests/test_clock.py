@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Run from py3_control/:  python -m unittest discover -s tests   (or pytest tests)
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clock import ClockSync
+
+
+class ClockSyncTest(unittest.TestCase):
+    def test_symmetric_exchange(self):
+        c = ClockSync()
+        self.assertFalse(c.synced())
+        # server is 10 s ahead, 5 ms each way, 1 ms in the server
+        c.add_sample(100.000, 110.005, 110.006, 100.011)
+        self.assertTrue(c.synced())
+        self.assertAlmostEqual(c.offset, 10.0)
+        self.assertAlmostEqual(c.rtt, 0.010)
+        self.assertAlmostEqual(c.to_server(100.5), 110.5)
+
+    def test_lowest_rtt_sample_wins(self):
+        c = ClockSync(window=4)
+        c.add_sample(0.0, 10.005, 10.005, 0.010)    # rtt 10 ms, offset 10
+        c.add_sample(1.0, 11.050, 11.050, 1.060)    # queued on the way out: rtt 60 ms
+        self.assertAlmostEqual(c.offset, 10.0)
+        self.assertAlmostEqual(c.rtt, 0.010)
+
+    def test_window_forgets_old_samples(self):
+        c = ClockSync(window=2)
+        c.add_sample(0.0, 10.001, 10.001, 0.002)    # best, but will slide out
+        c.add_sample(1.0, 12.010, 12.010, 1.020)
+        c.add_sample(2.0, 13.010, 13.010, 2.020)
+        self.assertAlmostEqual(c.offset, 11.0)
+        self.assertAlmostEqual(c.rtt, 0.020)
+
+    def test_rtt_never_negative(self):
+        c = ClockSync()
+        c.add_sample(0.0, 5.0, 5.5, 0.1)            # server time longer than the round trip
+        self.assertEqual(c.rtt, 0.0)
+
+    def test_sync_with_uses_pong_and_t1(self):
+        c = ClockSync()
+        sent = []
+
+        def request(msg):
+            sent.append(msg)
+            t0 = msg["args"]["t0"]
+            return {"ok": True, "data": {"t1": t0 + 3.0, "pong": t0 + 3.0}}
+        c.sync_with(request, n=3)
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(sent[0]["cmd"], "ping")
+        self.assertTrue(abs(c.offset - 3.0) < 0.05)
+
+    def test_sync_with_skips_bad_replies(self):
+        c = ClockSync()
+        c.sync_with(lambda msg: None, n=2)
+        c.sync_with(lambda msg: {"ok": False, "error": "x"}, n=1)
+        self.assertFalse(c.synced())
+        self.assertEqual(c.offset, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+
+
+class CodecTest(unittest.TestCase):
+    def test_every_codec_round_trips(self):
+        msg = {"cmd": "set_target", "seq": 12, "ts": 1700000000.123456,
+               "args": {"vx_n": 0.4321, "vy_n": -0.1234, "vw_n": 0.0}}
+        for name, dumps, loads in codec.available():
+            out = dumps(msg)
+            self.assertIsInstance(out, bytes, name)
+            self.assertEqual(loads(out), msg, name)
+            self.assertEqual(json.loads(out), msg, name)
+
+    def test_non_finite_is_null(self):
+        msg = {"a": float("nan"), "b": [1.0, float("inf")], "c": {"d": float("-inf")}}
+        out = codec.dumps_bytes(msg)
+        self.assertEqual(json.loads(out), {"a": None, "b": [1.0, None], "c": {"d": None}})
+        self.assertNotIn(b"NaN", out)
+        self.assertNotIn(b"Infinity", out)
+
+    def test_non_finite_fallback_on_strict_codecs(self):
+        # stdlib (and ujson) refuse NaN; dumps_bytes must still produce null
+        saved = codec._dumps_bytes
+        try:
+            codec._dumps_bytes = codec._stdlib()[1]
+            self.assertEqual(json.loads(codec.dumps_bytes({"a": float("nan")})), {"a": None})
+        finally:
+            codec._dumps_bytes = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
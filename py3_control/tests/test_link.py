@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from link import ServerLink, LinkDown
+
+
+class FakeServer(object):
+    """
+    NDJSON server on 127.0.0.1; handler(conn_no, msg) returns the frames to
+    send back (dicts, or a float to sleep first), or None to hang up.
+    """
+    def __init__(self, handler, port=0):
+        self.handler = handler
+        self.srv = socket.socket()
+        self.srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.srv.bind(("127.0.0.1", port))
+        self.srv.listen(4)
+        self.port = self.srv.getsockname()[1]
+        self.received = []  # (conn_no, msg)
+        self.conns = 0
+        th = threading.Thread(target=self._accept, daemon=True)
+        th.start()
+
+    def _accept(self):
+        while True:
+            try:
+                c, _ = self.srv.accept()
+            except OSError:
+                return
+            self.conns += 1
+            threading.Thread(target=self._serve, args=(c, self.conns), daemon=True).start()
+
+    def _serve(self, c, no):
+        f = c.makefile("rb")
+        try:
+            for line in f:
+                msg = json.loads(line)
+                self.received.append((no, msg))
+                out = self.handler(no, msg)
+                if out is None:
+                    break
+                for frame in out:
+                    if isinstance(frame, float):
+                        time.sleep(frame)
+                    else:
+                        c.sendall((json.dumps(frame) + "\n").encode())
+        except OSError:
+            pass
+        finally:
+            f.close()
+            c.close()
+
+    def close(self):
+        self.srv.close()
+
+
+def _echo(no, msg):
+    return [{"ok": True, "rid": msg.get("rid"), "conn": no}]
+
+
+def _free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class ServerLinkTest(unittest.TestCase):
+    def setUp(self):
+        self.out = StringIO()
+        self._redirect = redirect_stdout(self.out)
+        self._redirect.__enter__()
+        self.servers = []
+
+    def tearDown(self):
+        self._redirect.__exit__(None, None, None)
+        for s in self.servers:
+            s.close()
+
+    def _server(self, handler, port=0):
+        s = FakeServer(handler, port)
+        self.servers.append(s)
+        return s
+
+    def _link(self, port, **kw):
+        kw.setdefault("reply_timeout", 0.3)
+        lk = ServerLink("127.0.0.1", port, connect_timeout=0.5, **kw)
+        self.addCleanup(lk.close)
+        return lk
+
+    def test_backoff_then_reconnect(self):
+        port = _free_port()
+        lk = self._link(port, backoff_s=(0.05, 0.15))
+        self.assertFalse(lk.ensure())
+        self.assertFalse(lk.ensure())          # inside the backoff slot: no new attempt
+        delays = [lk._delay]
+        for _ in range(3):
+            lk._next_try = 0.0
+            self.assertFalse(lk.ensure())
+            delays.append(lk._delay)
+        self.assertEqual(delays, [0.1, 0.15, 0.15, 0.15])
+        self.assertTrue(lk._next_try > time.time())
+        self._server(_echo, port)
+        lk._next_try = 0.0
+        self.assertTrue(lk.ensure())
+        self.assertEqual((lk.connects, lk._delay), (1, 0.05))
+        self.assertTrue(lk.last_outage_s > 0.0)
+        self.assertEqual(lk.request({"cmd": "ping", "rid": 1})["rid"], 1)
+
+    def test_reply_timeout_drops_pending_request(self):
+        def slow_first(no, msg):
+            if msg["rid"] == 1:
+                return [0.6, {"ok": True, "rid": 1}]  # answers after the client gave up
+            return _echo(no, msg)
+        srv = self._server(slow_first)
+        lk = self._link(srv.port, backoff_s=(0.01, 0.01))
+        self.assertEqual(lk.request({"cmd": "ping", "rid": 1}), None)
+        self.assertFalse(lk.connected())
+        time.sleep(0.05)
+        rep = lk.request({"cmd": "ping", "rid": 2})
+        # the late answer to rid 1 went down with the old socket
+        self.assertEqual((rep["rid"], rep["conn"]), (2, 2))
+
+    def test_events_between_replies(self):
+        def with_events(no, msg):
+            return [{"event": "robotHasFallen", "kind": "fall", "value": 1},
+                    {"event": "BatteryChargeChanged", "kind": "battery", "value": 20},
+                    {"ok": True, "rid": msg["rid"]}]
+        srv = self._server(with_events)
+        events = []
+        lk = self._link(srv.port, on_event=events.append)
+        self.assertTrue(lk.ensure())
+        self.assertEqual(lk.call({"cmd": "ping", "rid": 7}), {"ok": True, "rid": 7})
+        self.assertEqual([e["kind"] for e in events], ["fall", "battery"])
+
+    def test_session_restored_on_every_connect(self):
+        def hang_up_on_move(no, msg):
+            if msg["cmd"] == "set_target" and no == 1:
+                return None
+            return _echo(no, msg)
+        srv = self._server(hang_up_on_move)
+
+        def restore(lk):
+            lk.call({"cmd": "set_deadman", "args": {"enabled": True}})
+            lk.call({"cmd": "subscribe_events"})
+        lk = self._link(srv.port, backoff_s=(0.01, 0.01), on_connect=restore)
+        self.assertTrue(lk.ensure())
+        self.assertEqual(lk.request({"cmd": "set_target", "rid": 1}), None)
+        self.assertTrue("closed by server" in lk.last_error)
+        time.sleep(0.05)
+        self.assertEqual(lk.request({"cmd": "set_target", "rid": 2})["conn"], 2)
+        self.assertEqual(lk.connects, 2)
+        per_conn = [(no, m["cmd"]) for no, m in srv.received]
+        self.assertEqual(per_conn, [(1, "set_deadman"), (1, "subscribe_events"), (1, "set_target"),
+                                    (2, "set_deadman"), (2, "subscribe_events"), (2, "set_target")])
+        self.assertTrue("reconnected" in self.out.getvalue())
+
+    def test_failed_restore_counts_as_down(self):
+        srv = self._server(lambda no, msg: None)   # hangs up on anything
+        lk = self._link(srv.port, on_connect=lambda lk: lk.call({"cmd": "subscribe_events"}))
+        self.assertFalse(lk.ensure())
+        self.assertFalse(lk.connected())
+        self.assertRaises(LinkDown, lk.call, {"cmd": "ping"})
+
+
+if __name__ == "__main__":
+    unittest.main()
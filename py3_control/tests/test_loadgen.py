@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import loadgen
+
+
+class ParseMixTest(unittest.TestCase):
+    def test_weights(self):
+        self.assertEqual(loadgen.parse_mix(" set_target=10, ping ,posture=0.05,"),
+                         {"set_target": 10.0, "ping": 1.0, "posture": 0.05})
+        self.assertEqual(loadgen.parse_mix("ping=0,set_head=2"), {"ping": 0.0, "set_head": 2.0})
+        self.assertEqual(set(loadgen.parse_mix(loadgen.DEFAULT_MIX)),
+                         {"set_target", "set_head", "ping", "posture"})
+
+    def test_malformed(self):
+        for bad in ("", ",,", "=3", "ping=0", "ping=fast", "ping=1=2", "ping=-1,set_head=5",
+                    "ping=nan", "ping=inf"):
+            with self.assertRaises(ValueError, msg=bad):
+                loadgen.parse_mix(bad)
+
+
+class HelpersTest(unittest.TestCase):
+    def test_pct(self):
+        self.assertEqual(loadgen._pct([], 0.5), 0.0)
+        self.assertEqual(loadgen._pct([3.0], 0.99), 3.0)
+        vals = [float(i) for i in range(100)]
+        self.assertEqual(loadgen._pct(vals, 0.0), 0.0)
+        self.assertEqual(loadgen._pct(vals, 0.5), 50.0)
+        self.assertEqual(loadgen._pct(vals, 0.99), 99.0)
+        self.assertEqual(loadgen._pct(vals, 1.0), 99.0)
+
+    def test_make_msg(self):
+        rng = random.Random(0)
+        m = loadgen.make_msg("set_target", 7, rng)
+        self.assertEqual((m["cmd"], m["seq"]), ("set_target", 7))
+        self.assertTrue(all(abs(m["args"][k]) <= 0.2 for k in ("vx_n", "vy_n", "vw_n")))
+        m = loadgen.make_msg("set_head", 8, rng)
+        self.assertTrue(all(abs(m["args"][k]) <= 1.0 for k in ("yaw_n", "pitch_n")))
+        self.assertIn(loadgen.make_msg("posture", 0, rng)["args"]["name"], ("StandInit", "Crouch"))
+        self.assertEqual(loadgen.make_msg("ping", 0, rng), {"cmd": "ping"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nao
+
+
+class ScriptParseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _script(self, text):
+        path = os.path.join(self.tmp.name, "s.ndjson")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_steps_with_line_numbers(self):
+        path = self._script('# warm up\n{"cmd":"ping"}\n\n{"wait": 0.5}\n{"cmd":"set_target","args":{"vx_n":0.2}}\n')
+        self.assertEqual(list(nao._script_steps(path)),
+                         [(2, {"cmd": "ping"}), (4, {"wait": 0.5}),
+                          (5, {"cmd": "set_target", "args": {"vx_n": 0.2}})])
+
+    def test_wait_coerced_to_float(self):
+        path = self._script('{"wait": "1"}\n')
+        self.assertEqual(list(nao._script_steps(path)), [(1, {"wait": 1.0})])
+
+    def test_rejected_lines_report_line_no(self):
+        for bad in ('{"cmd":', '[1]', '"x"', '3', 'null', '{"args":{}}', '{"wait":"soon"}', '{"wait":null}'):
+            path = self._script('{"cmd":"ping"}\n' + bad + '\n')
+            with self.assertRaises(ValueError) as cm:
+                list(nao._script_steps(path))
+            self.assertTrue(str(cm.exception).startswith("line 2:"), (bad, str(cm.exception)))
+
+
+class RunScriptTest(unittest.TestCase):
+    def test_server_close_with_full_window(self):
+        # server answers nothing and hangs up: the sender must not block on the window
+        srv = socket.socket()
+        srv.bind(("127.0.0.1", 0))
+        srv.listen(1)
+        port = srv.getsockname()[1]
+
+        def serve():
+            c, _ = srv.accept()
+            c.recv(4096)
+            c.close()
+        th = threading.Thread(target=serve, daemon=True)
+        th.start()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "s.ndjson")
+            with open(path, "w") as f:
+                for _ in range(5):
+                    f.write(json.dumps({"cmd": "ping"}) + "\n")
+            err = io.StringIO()
+            result = {}
+
+            def run():
+                with redirect_stdout(io.StringIO()), redirect_stderr(err):
+                    result["failed"] = nao.run_script("127.0.0.1", port, path, inflight=1)
+            t = threading.Thread(target=run, daemon=True)
+            t.start()
+            t.join(5.0)
+        srv.close()
+        self.assertFalse(t.is_alive(), "run_script blocked after the server closed")
+        self.assertIn("connection closed by server", err.getvalue())
+        self.assertGreaterEqual(result["failed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
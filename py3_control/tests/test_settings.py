@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import ConfigWatcher, ControllerSettings
+
+
+def _cfg(**kw):
+    c = types.SimpleNamespace(LOOP_HZ=20.0, STICK_DEADZONE=0.12, INVERT_Y=True,
+                              MAX_VX_NORM=1.0, MAX_VY_NORM=0.8, HOLD_VW_NORM=0.6,
+                              MAPPING_DEBUG=False)
+    for k, v in kw.items():
+        setattr(c, k, v)
+    return c
+
+
+class ControllerSettingsTest(unittest.TestCase):
+    def test_from_config(self):
+        s = ControllerSettings.from_config(_cfg(HEAD_YAW_SCALE=0.5))
+        self.assertAlmostEqual(s.dt, 0.05)
+        self.assertEqual(s.head_yaw_scale, 0.5)
+        self.assertEqual(s.head_pitch_scale, 1.0)
+        self.assertEqual(s.map_params.max_vy, 0.8)
+        self.assertEqual(s.map_params.deadzone, 0.12)
+
+    def test_rejected(self):
+        for bad in ({"LOOP_HZ": 0}, {"LOOP_HZ": -5}, {"LOOP_HZ": "x"},
+                    {"STICK_DEADZONE": 1.0}, {"STICK_DEADZONE": -0.1},
+                    {"MAX_VX_NORM": "fast"}):
+            self.assertRaises(ValueError, ControllerSettings.from_config, _cfg(**bad))
+
+
+class ConfigWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "watched_cfg.py")
+        self._write(20.0)
+        sys.path.insert(0, self.tmp.name)
+        import watched_cfg
+        self.cfg = watched_cfg
+
+    def tearDown(self):
+        sys.path.remove(self.tmp.name)
+        sys.modules.pop("watched_cfg", None)
+        self.tmp.cleanup()
+
+    def _write(self, hz):
+        with open(self.path, "w") as f:
+            f.write("LOOP_HZ = %r\nSTICK_DEADZONE = 0.1\nINVERT_Y = True\nMAX_VX_NORM = 1.0\n"
+                    "MAX_VY_NORM = 1.0\nHOLD_VW_NORM = 0.6\nMAPPING_DEBUG = False\n" % (hz,))
+        # distinct mtime even on coarse-grained filesystems
+        t = time.time() + (1.0 if hz != 20.0 else 0.0)
+        os.utime(self.path, (t, t))
+
+    def test_reload_after_edit(self):
+        w = ConfigWatcher(self.cfg, interval_s=0.001)
+        time.sleep(0.002)
+        self.assertIsNone(w.poll())          # unchanged
+        self._write(40.0)
+        time.sleep(0.002)
+        s = w.poll()
+        self.assertIsNotNone(s)
+        self.assertEqual(s.loop_hz, 40.0)
+
+    def test_invalid_edit_keeps_previous(self):
+        w = ConfigWatcher(self.cfg, interval_s=0.001)
+        self._write(-1.0)
+        time.sleep(0.002)
+        self.assertIsNone(w.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
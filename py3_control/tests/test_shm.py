@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import shm
+
+
+def _server_shm():
+    # py26_naoqi/shm.py (same module name) as the reading side
+    path = os.path.join(HERE, "..", "..", "py26_naoqi", "shm.py")
+    spec = importlib.util.spec_from_file_location("server_shm", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class ShmLayoutTest(unittest.TestCase):
+    """The Py3 writer and the Py2.6 server reader must agree on the layout."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "nao.shm")
+        self.srv = _server_shm()
+        self.reader = self.srv.ShmReader(self.path)
+        self.writer = shm.ShmWriter(self.path)
+
+    def tearDown(self):
+        self.writer.close()
+        self.reader.close()
+        self.tmp.cleanup()
+
+    def test_constants_match(self):
+        for name in ("MAGIC", "VERSION", "RING_SLOTS", "SLOT_SIZE", "SIZE",
+                     "OFF_LATEST", "OFF_HEAD", "OFF_RING",
+                     "CMD_SET_DEADMAN", "CMD_CENTER_HEAD", "CMD_STOP"):
+            self.assertEqual(getattr(shm, name), getattr(self.srv, name), name)
+
+    def test_latest_frame(self):
+        self.writer.publish(0.5, -0.25, 0.125, 0.75, -1.0, ts=1234.5)
+        self.assertEqual(self.reader.read_latest(), (1234.5, 0.5, -0.25, 0.125, 0.75, -1.0))
+        self.assertIsNone(self.reader.read_latest())
+
+    def test_commands(self):
+        self.writer.command(shm.CMD_SET_DEADMAN, 1.0)
+        self.writer.command(shm.CMD_CENTER_HEAD)
+        self.assertEqual(self.reader.poll_commands(),
+                         [(shm.CMD_SET_DEADMAN, 1.0, 0.0, 0.0), (shm.CMD_CENTER_HEAD, 0.0, 0.0, 0.0)])
+
+    def test_writer_restart_continues_seq(self):
+        self.writer.publish(0.1, 0.0, 0.0, 0.0, 0.0, ts=1.0)
+        self.assertIsNotNone(self.reader.read_latest())
+        self.writer.close()
+        self.writer = shm.ShmWriter(self.path)
+        self.writer.publish(0.2, 0.0, 0.0, 0.0, 0.0, ts=2.0)
+        self.assertEqual(self.reader.read_latest()[:2], (2.0, 0.2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+tracelog.py
+Per-tick teleop session log, in the server flight recorder's dump format
+(py26_naoqi/recorder.py) so analyze.py reads both the same way:
+
+  "<8sIII"  magic "NAOREC1\\0", version, n_fields, n_records
+  n_fields  NUL-padded 16-byte field names
+  records   float64 little-endian, oldest first
+
+Records are appended as they come; n_records is written on close(), and
+a log cut short (crash, power loss) has n_records == 0 and is read up to
+its last complete record.
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Sequence
+
+MAGIC = b"NAOREC1\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIII")
+
+# ts_srv: send time on the server clock (NaN until the clock is synced)
+TELEOP_FIELDS = ("ts_srv", "ts", "lx", "ly", "lb", "rb",
+                 "vx", "vy", "vw", "yaw_n", "pitch_n")
+
+
+class TraceWriter(object):
+    def __init__(self, path: str, fields: Sequence[str] = TELEOP_FIELDS, flush_every: int = 64):
+        self.path = path
+        self.fields = tuple(fields)
+        self.count = 0
+        self._flush_every = max(1, int(flush_every))
+        self._pending = array("d")
+        self._f = open(path, "wb")
+        self._f.write(HEADER.pack(MAGIC, VERSION, len(self.fields), 0))
+        for name in self.fields:
+            self._f.write(struct.pack("16s", name.encode("ascii")))
+
+    def record(self, *values: float) -> None:
+        if len(values) != len(self.fields):
+            raise ValueError("expected %d values, got %d" % (len(self.fields), len(values)))
+        self._pending.extend(values)
+        self.count += 1
+        if len(self._pending) >= self._flush_every * len(self.fields):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            if sys.byteorder != "little":
+                self._pending.byteswap()
+            self._pending.tofile(self._f)
+            self._pending = array("d")
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.seek(0)
+        self._f.write(HEADER.pack(MAGIC, VERSION, len(self.fields), self.count))
+        self._f.close()
+
+
+def session_path(out_dir: str) -> str:
+    return os.path.join(out_dir, "teleop_%s.bin" % time.strftime("%Y%m%d_%H%M%S"))
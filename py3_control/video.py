@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+video.py
+Receiver for the server's camera stream (VIDEO_PORT). Frames arrive as a
+fixed header plus raw image bytes; each payload is read with recv_into()
+straight into a reused buffer. The server only ever sends its latest
+frame, so a gap in 'seq' means frames were skipped, not delayed.
+
+    python3 video.py              # print fps / age / skipped frames
+    python3 video.py --show       # display with OpenCV, if installed
+"""
+
+import argparse
+import socket
+import struct
+import sys
+import time
+from typing import Iterator, Optional
+
+import config
+from net import connect
+
+MAGIC = b"NVF1"
+HEADER = struct.Struct("<4sIdHHBBHI")  # magic, seq, ts, w, h, layers, colorspace, 0, size
+
+
+class Frame(object):
+    __slots__ = ("seq", "ts", "width", "height", "layers", "colorspace", "data")
+
+    def __init__(self, seq, ts, width, height, layers, colorspace, data):
+        self.seq, self.ts = seq, ts
+        self.width, self.height, self.layers, self.colorspace = width, height, layers, colorspace
+        self.data = data  # memoryview into the receiver's buffer, valid until the next frame
+
+
+class VideoReceiver(object):
+    def __init__(self, host: str, port: int, timeout: float = 3.0):
+        self.sock = connect(host, port, timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._hdr = bytearray(HEADER.size)
+        self._buf = bytearray()
+        self.received = 0
+        self.skipped = 0
+        self._last_seq = 0
+
+    def _read_into(self, view: memoryview) -> bool:
+        got, n = 0, len(view)
+        while got < n:
+            k = self.sock.recv_into(view[got:], n - got)
+            if k == 0:
+                return False
+            got += k
+        return True
+
+    def recv(self) -> Optional[Frame]:
+        """Next frame, or None when the server closes the stream."""
+        if not self._read_into(memoryview(self._hdr)):
+            return None
+        magic, seq, ts, w, h, layers, cs, _, size = HEADER.unpack(self._hdr)
+        if magic != MAGIC:
+            raise ValueError("bad frame header %r" % bytes(self._hdr[:4]))
+        if len(self._buf) < size:
+            self._buf = bytearray(size)
+        view = memoryview(self._buf)[:size]
+        if not self._read_into(view):
+            return None
+        if self._last_seq:
+            self.skipped += max(0, seq - self._last_seq - 1)
+        self._last_seq = seq
+        self.received += 1
+        return Frame(seq, ts, w, h, layers, cs, view)
+
+    def frames(self) -> Iterator[Frame]:
+        while True:
+            f = self.recv()
+            if f is None:
+                return
+            yield f
+
+    def close(self) -> None:
+        try: self.sock.close()
+        except Exception: pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Receive the NAO camera stream")
+    ap.add_argument("--host", default=config.HOST)
+    ap.add_argument("--port", type=int, default=getattr(config, "VIDEO_PORT", 40101))
+    ap.add_argument("--show", action="store_true", help="display frames (needs opencv-python + numpy)")
+    ap.add_argument("--count", type=int, default=0, help="stop after N frames (0 = run until Ctrl+C)")
+    args = ap.parse_args()
+
+    cv2 = np = None
+    if args.show:
+        try:
+            import cv2
+            import numpy as np
+        except ImportError:
+            print("--show needs OpenCV: pip install opencv-python numpy", file=sys.stderr)
+            sys.exit(2)
+
+    rx = VideoReceiver(args.host, args.port)
+    print("[VIDEO] connected to %s:%d" % (args.host, args.port))
+    t_rep = time.time() + 1.0
+    n_rep, age_sum = 0, 0.0
+    try:
+        for f in rx.frames():
+            # ts is the server's clock; on another host this includes clock offset
+            age_sum += time.time() - f.ts
+            n_rep += 1
+            if cv2 is not None:
+                img = np.frombuffer(f.data, dtype=np.uint8).reshape(f.height, f.width, f.layers)
+                if f.colorspace == 11:  # RGB -> OpenCV's BGR
+                    img = img[:, :, ::-1]
+                cv2.imshow("NAO", img)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
+            now = time.time()
+            if now >= t_rep:
+                print("[VIDEO] %dx%dx%d  %.1f fps  age %.1f ms  skipped %d" % (
+                    f.width, f.height, f.layers, n_rep / (now - t_rep + 1.0),
+                    age_sum / n_rep * 1e3, rx.skipped))
+                t_rep, n_rep, age_sum = now + 1.0, 0, 0.0
+            if args.count and rx.received >= args.count:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rx.close()
+    print("[VIDEO] received %d frames, skipped %d" % (rx.received, rx.skipped))
+
+
+if __name__ == "__main__":
+    main()